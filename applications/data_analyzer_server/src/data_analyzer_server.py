@@ -9,6 +9,9 @@ from pydantic import BaseModel
 from loguru import logger
 import httpx
 from components.data_analyzers.src.weather_aqi_analyzer import WeatherAQIAnalyzer
+from components.data_analyzers.src.aqi_calculator import AQICalculator
+from components.data_analyzers.src.analyzer_result_cache import AnalyzerResultCache
+from components.data_analyzers.src.sport_profiles import get_sport_profiles
 import os
 
 # API URLs for the data collector servers
@@ -24,17 +27,45 @@ ANALYZER_QUEUE_NAME = os.getenv("ANALYZER_QUEUE_NAME", "data_analyzer_queue")
 
 rabbitmq_connection = None  # Global connection pool
 
+# Directory of the memory-mapped AQI lookup tables, shared by all workers
+AQI_LOOKUP_TABLE_DIR = os.getenv("AQI_LOOKUP_TABLE_DIR")
+
+# Ranking engine of the analyzer, "numpy" and "pandas" give identical results
+ANALYZER_ENGINE = os.getenv("ANALYZER_ENGINE", "numpy")
+
+aqi_calculator = AQICalculator(
+    use_lookup_table=AQI_LOOKUP_TABLE_DIR is not None,
+    lookup_table_directory=AQI_LOOKUP_TABLE_DIR,
+)
+
+# Rankings of identical forecasts, shared by HTTP and RabbitMQ requests
+ANALYZER_CACHE_SIZE = int(os.getenv("ANALYZER_CACHE_SIZE", "1024"))
+ANALYZER_CACHE_TTL = float(os.getenv("ANALYZER_CACHE_TTL", "3600"))
+
+result_cache = AnalyzerResultCache(maxsize=ANALYZER_CACHE_SIZE, ttl=ANALYZER_CACHE_TTL)
+
 
 # Input schema
 class RequestData(BaseModel):
     latitude: float | None = None
     longitude: float | None = None
     city: str | None = None
+    # Number of best days to return, all days if not set
+    top_k: int | None = None
+    # Sport profile to rank the days with, e.g. "running"
+    sport: str | None = None
 
     # Validation to ensure either city or lat/long is provided
     def validate(self):
         if not self.city and (self.latitude is None or self.longitude is None):
             raise ValueError("Either 'city' or 'latitude/longitude' must be provided.")
+        if self.top_k is not None and self.top_k < 1:
+            raise ValueError("'top_k' must be at least 1.")
+        if self.sport is not None and self.sport not in get_sport_profiles():
+            raise ValueError(
+                f"Unknown sport '{self.sport}'. "
+                f"Use one of {tuple(get_sport_profiles())}."
+            )
 
 
 async def get_rabbitmq_connection():
@@ -52,7 +83,7 @@ async def get_rabbitmq_connection():
 
 
 def get_analyzer():
-    return WeatherAQIAnalyzer()
+    return WeatherAQIAnalyzer(aqi_calculator=aqi_calculator, result_cache=result_cache)
 
 
 @asynccontextmanager
@@ -130,7 +161,9 @@ async def _analyze(data: RequestData, analyzer: WeatherAQIAnalyzer = None):
     logger.info("Starting analysis...")
     logger.debug(f"Weather data: {analyzer.get_weather_forecast()}")
     logger.debug(f"AQI data: {analyzer.get_air_quality_forecast()}")
-    result = analyzer.predict_best_outdoor_sports_day()
+    result = analyzer.predict_best_outdoor_sports_day(
+        engine=ANALYZER_ENGINE, top_k=data.top_k, sport=data.sport
+    )
 
     logger.debug(f"Returning results: {result}")
 
@@ -150,6 +183,11 @@ async def analyze(
     return JSONResponse(status_code=response["status_code"], content=response["data"])
 
 
+@app.get("/cache-stats")
+def cache_stats():
+    return result_cache.stats()
+
+
 async def process_rabbitmq_message(message: aio_pika.IncomingMessage):
     try:
         data = json.loads(message.body)
@@ -7,9 +7,15 @@ import pickle
 from applications.data_analyzer_server.src.data_analyzer_server import (
     get_analyzer,
     analyze,
+    cache_stats,
     RequestData,
 )
+from components.data_collectors.src.air_quality_data_collector import (
+    AirQualityDataCollector,
+)
+from fastapi.encoders import jsonable_encoder
 from loguru import logger
+import time
 
 # Integration tests
 
@@ -94,6 +100,51 @@ async def test_analyze(httpx_mock):
 
     assert mock_results[0]["date"] == str(content[0]["date"])
 
+    # The analyzers of all requests share one result cache
+    assert cache_stats()["size"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_analyze_recollected_forecast_hits_cache(httpx_mock):
+    aqicn_response_path = os.path.join(
+        root_dir,
+        "components",
+        "data_collectors",
+        "tests",
+        "test_aqicn_json_response.json",
+    )
+    with open(aqicn_response_path, "r") as file:
+        aqicn_response = json.load(file)
+
+    # The same AQICN data collected twice, as the collector server sends it
+    first = jsonable_encoder(AirQualityDataCollector._process_data(aqicn_response))
+    time.sleep(0.001)
+    second = jsonable_encoder(AirQualityDataCollector._process_data(aqicn_response))
+
+    assert first["datetime"] != second["datetime"]
+
+    for air_quality_data in [first, second]:
+        httpx_mock.add_response(
+            method="POST", url=WEATHER_API_URL, json=mock_weather_data
+        )
+        httpx_mock.add_response(
+            method="POST", url=AIR_QUALITY_API_URL, json=air_quality_data
+        )
+
+    params = RequestData(city="Shanghai", top_k=3)
+
+    responses = []
+
+    for _ in range(2):
+        analyzer_instance = get_analyzer()
+        analyzer_instance._get_today = MagicMock(return_value=date(2024, 12, 20))
+
+        hits = cache_stats()["hits"]
+        responses.append(await analyze(params, analyzer=analyzer_instance))
+
+    assert cache_stats()["hits"] == hits + 1
+    assert responses[0].body == responses[1].body
+
 
 # Unit tests
 def test_RequestData_valid():
@@ -115,3 +166,17 @@ def test_RequestData_invalid():
         ValueError, match="Either 'city' or 'latitude/longitude' must be provided."
     ):
         long_data.validate()
+
+
+def test_RequestData_invalid_top_k():
+    data = RequestData(city="Berlin", top_k=0)
+
+    with pytest.raises(ValueError, match="'top_k' must be at least 1."):
+        data.validate()
+
+
+def test_RequestData_sport():
+    RequestData(city="Berlin", sport="running").validate()
+
+    with pytest.raises(ValueError, match="Unknown sport 'curling'"):
+        RequestData(city="Berlin", sport="curling").validate()
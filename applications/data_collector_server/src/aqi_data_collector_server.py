@@ -1,32 +1,134 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from loguru import logger
+from typing import List
+import httpx
+import json
 import os
 from sqlalchemy.exc import IntegrityError
 from components.data_collectors.src.air_quality_data_collector import (
+    AirQualityData,
     AirQualityDataCollector,
 )
 from components.data_collectors.src.coordinates_collector import CoordinatesCollector
+from components.data_collectors.src.rate_limiter import TokenBucket
+from components.data_collectors.src.station_index import load_station_index
 from components.data_gateways.src.air_quality_data_gateway import AirQualityDataGateway
+from components.data_gateways.src.geocoding_gateway import GeocodingGateway
+from components.data_gateways.src.station_resolution_gateway import (
+    StationResolutionGateway,
+)
+from applications.data_collector_server.src.singleflight import (
+    SingleFlight,
+    location_key,
+)
+
+# For docker, read database path from environment
+SQLITE_AQI_DB_PATH = os.getenv("SQLITE_AQI_DB_PATH", "sqlite:///aqi.db")
+
+# How long cities are remembered with their AQICN station, and cities AQICN
+# answers "Unknown station" for
+AQICN_STATION_TTL_HOURS = float(os.getenv("AQICN_STATION_TTL_HOURS", "168"))
+AQICN_UNKNOWN_STATION_TTL_HOURS = float(
+    os.getenv("AQICN_UNKNOWN_STATION_TTL_HOURS", "24")
+)
+
+station_resolution_gateway = StationResolutionGateway(
+    db_path=SQLITE_AQI_DB_PATH,
+    ttl=AQICN_STATION_TTL_HOURS * 3600,
+    negative_ttl=AQICN_UNKNOWN_STATION_TTL_HOURS * 3600,
+)
+
+# How long coordinates of cities are kept, and cities the geocoder does not know
+GEOCODING_TTL_HOURS = float(os.getenv("GEOCODING_TTL_HOURS", "720"))
+GEOCODING_NOT_FOUND_TTL_HOURS = float(os.getenv("GEOCODING_NOT_FOUND_TTL_HOURS", "24"))
+
+geocoding_gateway = GeocodingGateway(
+    db_path=SQLITE_AQI_DB_PATH,
+    ttl=GEOCODING_TTL_HOURS * 3600,
+    negative_ttl=GEOCODING_NOT_FOUND_TTL_HOURS * 3600,
+)
+
+# Bounding box "south,west,north,east" of the local index of AQICN stations.
+# Without it every coordinate lookup asks AQICN for the nearest station.
+AQICN_STATION_INDEX_BOUNDS = os.getenv("AQICN_STATION_INDEX_BOUNDS")
+AQICN_STATION_INDEX_PATH = os.getenv(
+    "AQICN_STATION_INDEX_PATH", "aqicn_station_index.json"
+)
+AQICN_STATION_INDEX_MAX_AGE_HOURS = float(
+    os.getenv("AQICN_STATION_INDEX_MAX_AGE_HOURS", "24")
+)
+
+# AQICN quota: requests per second, the largest burst of requests, and the
+# requests in flight at once, shared by all requests to this server
+AQICN_REQUESTS_PER_SECOND = float(os.getenv("AQICN_REQUESTS_PER_SECOND", "10"))
+AQICN_BURST = float(os.getenv("AQICN_BURST", "10"))
+AQICN_MAX_CONCURRENCY = int(os.getenv("AQICN_MAX_CONCURRENCY", "10"))
+
+# Geocode cities while the city feed is still pending, trading quota for latency
+AQICN_HEDGED_LOOKUPS = os.getenv("AQICN_HEDGED_LOOKUPS", "false").lower() == "true"
+
+rate_limiter = TokenBucket(rate=AQICN_REQUESTS_PER_SECOND, capacity=AQICN_BURST)
+
+# One collector for all requests, so they share its connection pool
+collector = AirQualityDataCollector(
+    station_resolutions=station_resolution_gateway,
+    client=httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(
+            max_connections=AQICN_MAX_CONCURRENCY,
+            max_keepalive_connections=AQICN_MAX_CONCURRENCY,
+        ),
+    ),
+    rate_limiter=rate_limiter,
+    max_concurrency=AQICN_MAX_CONCURRENCY,
+    hedged_lookups=AQICN_HEDGED_LOOKUPS,
+)
 
 
 def get_collector():
-    return AirQualityDataCollector()
+    # Ensuring the station resolution table exists
+    station_resolution_gateway.create()
+
+    return collector
 
 
 def get_coordinates_collector():
-    return CoordinatesCollector()
+    # Ensuring the geocoding table exists
+    geocoding_gateway.create()
 
-
-# For docker, read database path from environment
-SQLITE_AQI_DB_PATH = os.getenv("SQLITE_AQI_DB_PATH", "sqlite:///aqi.db")
+    return CoordinatesCollector(cache=geocoding_gateway)
 
 
 def get_aqi_data_gateway():
     return AirQualityDataGateway(db_path=SQLITE_AQI_DB_PATH)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AQICN_STATION_INDEX_BOUNDS:
+        bounds = tuple(float(value) for value in AQICN_STATION_INDEX_BOUNDS.split(","))
+
+        try:
+            collector.station_index = await load_station_index(
+                AQICN_STATION_INDEX_PATH,
+                bounds,
+                collector.AQICN_TOKEN,
+                max_age=AQICN_STATION_INDEX_MAX_AGE_HOURS * 3600,
+            )
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Running without a station index: {e}")
+
+    yield
+    await collector.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+singleflight = SingleFlight()
 
 
 # Input schema
@@ -41,6 +143,17 @@ class RequestData(BaseModel):
             raise ValueError("Either 'city' or 'latitude/longitude' must be provided.")
 
 
+class BatchRequestData(BaseModel):
+    locations: List[RequestData]
+
+    def validate(self):
+        if not self.locations:
+            raise ValueError("At least one location must be provided.")
+
+        for location in self.locations:
+            location.validate()
+
+
 @app.post("/collect")
 async def collect(
     data: RequestData,
@@ -61,18 +174,87 @@ async def collect(
 
     logger.info("Making request...")
 
-    if data.city is not None:
-        result = await collector.get_air_quality_data(data.city)
+    # Concurrent requests for the same location share one upstream call and insert
+    result = await singleflight.do(
+        location_key("collect", data.city, data.latitude, data.longitude),
+        lambda: _collect(data, collector, coordinates_collector, aqi_data_gateway),
+    )
 
-        if result is None:
-            coords = await coordinates_collector.get_coordinates(data.city)
+    if result is None:
+        return Response(status_code=204)
 
-            if not coords:
-                return Response(status_code=204)
+    logger.info("Returning data...")
+    return result
+
+
+@app.post("/collect/batch")
+async def collect_batch(
+    data: BatchRequestData,
+    collector: AirQualityDataCollector = Depends(get_collector),
+    coordinates_collector: CoordinatesCollector = Depends(get_coordinates_collector),
+    aqi_data_gateway: AirQualityDataGateway = Depends(get_aqi_data_gateway),
+):
+    """
+    Collects the air quality of many locations as fast as the AQICN quota
+    allows. Results stream back as newline delimited JSON in the order they
+    complete, one {"index", "data", "error"} object per location, where index
+    is the position of the location in the request and data is None for
+    unknown cities.
+    """
+    logger.info(f"Batch request received with {len(data.locations)} locations")
+
+    try:
+        data.validate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    locations = [
+        (
+            location.city
+            if location.city is not None
+            else (location.latitude, location.longitude)
+        )
+        for location in data.locations
+    ]
+
+    # Ensuring database exists
+    aqi_data_gateway.create()
+
+    async def stream_results():
+        async for result in collector.get_air_quality_data_many(
+            locations, coordinates_collector
+        ):
+            if result["data"]:
+                _store(result["data"], aqi_data_gateway)
 
-            latitude, longitude = coords
+            yield json.dumps(jsonable_encoder(result)) + "\n"
 
-            result = await collector.get_air_quality_data_by_coords(latitude, longitude)
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@app.get("/singleflight-stats")
+def singleflight_stats():
+    return singleflight.stats()
+
+
+@app.get("/rate-limit-stats")
+def rate_limit_stats():
+    return rate_limiter.stats()
+
+
+async def _collect(
+    data: RequestData,
+    collector: AirQualityDataCollector,
+    coordinates_collector: CoordinatesCollector,
+    aqi_data_gateway: AirQualityDataGateway,
+):
+    if data.city is not None:
+        result = await collector.get_air_quality_data_for_city(
+            data.city, coordinates_collector
+        )
+
+        if result is None:
+            return None
     else:
         result = await collector.get_air_quality_data_by_coords(
             data.latitude, data.longitude
@@ -83,22 +265,20 @@ async def collect(
 
     # Storing data if it does not yet exist
     if result:
-        try:
-            city = result["city"]
-            latitude = result["latitude"]
-            longitude = result["longitude"]
-            aqi = result["aqi"]
-            dominentpol = result["dominentpol"]
-
-            aqi_data_gateway.insert_air_quality_data(
-                city=city,
-                latitude=latitude,
-                longitude=longitude,
-                aqi=aqi,
-                dominantpol=dominentpol,
-            )
-        except IntegrityError:
-            pass
+        _store(result, aqi_data_gateway)
 
-    logger.info("Returning data...")
     return result
+
+
+def _store(result: AirQualityData, aqi_data_gateway: AirQualityDataGateway):
+    try:
+        aqi_data_gateway.insert_air_quality_data(
+            city=result["city"],
+            latitude=result["latitude"],
+            longitude=result["longitude"],
+            aqi=result["aqi"],
+            dominantpol=result["dominentpol"],
+        )
+    except (IntegrityError, ValueError):
+        # The gateway reports duplicates as ValueError
+        pass
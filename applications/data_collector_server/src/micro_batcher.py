@@ -0,0 +1,147 @@
+from typing import (
+    Awaitable,
+    Callable,
+    Generic,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+    TypeVar,
+)
+import asyncio
+from loguru import logger
+
+T = TypeVar("T")
+
+Coordinates = Tuple[float, float]
+
+
+class MicroBatchStats(TypedDict):
+    window_ms: float
+    max_batch_size: int
+    requests: int
+    batches: int
+    size_flushes: int
+    window_flushes: int
+    largest_batch: int
+    mean_batch_size: float
+    pending: int
+
+
+class MicroBatcher(Generic[T]):
+    """
+    Gathers single-location fetches that arrive within window seconds into one
+    multi-location fetch. A batch is sent when the window of its first location
+    has passed or when it reaches max_batch_size locations, so no request waits
+    longer than the window for its batch to leave.
+
+    Every waiting request gets the result of its own location. If the batch
+    raises ValueError, its locations are fetched one by one, so an invalid
+    location does not fail the others.
+    """
+
+    def __init__(
+        self,
+        fetch_many: Callable[[List[Coordinates]], Awaitable[List[T]]],
+        window: float = 0.01,
+        max_batch_size: int = 50,
+    ):
+        if window < 0:
+            raise ValueError("window must not be negative.")
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._fetch_many = fetch_many
+
+        self._pending: List[Tuple[Coordinates, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # References to the running batches, so they are not garbage collected
+        self._batches: Set[asyncio.Task] = set()
+
+        self._requests = 0
+        self._batch_count = 0
+        self._size_flushes = 0
+        self._window_flushes = 0
+        self._largest_batch = 0
+
+    async def submit(self, latitude: float, longitude: float) -> T:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        self._pending.append(((latitude, longitude), future))
+        self._requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._size_flushes += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_window)
+
+        return await future
+
+    def stats(self) -> MicroBatchStats:
+        batched = self._requests - len(self._pending)
+
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "requests": self._requests,
+            "batches": self._batch_count,
+            "size_flushes": self._size_flushes,
+            "window_flushes": self._window_flushes,
+            "largest_batch": self._largest_batch,
+            "mean_batch_size": (
+                batched / self._batch_count if self._batch_count else 0.0
+            ),
+            "pending": len(self._pending),
+        }
+
+    def _flush_window(self):
+        self._timer = None
+        self._window_flushes += 1
+        self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+
+        self._batch_count += 1
+        self._largest_batch = max(self._largest_batch, len(batch))
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _run(self, batch: List[Tuple[Coordinates, asyncio.Future]]):
+        logger.debug(f"Fetching a batch of {len(batch)} locations")
+
+        try:
+            results = await self._fetch_many([coords for coords, _ in batch])
+        except ValueError as e:
+            if len(batch) == 1:
+                self._set_exception(batch[0][1], e)
+                return
+
+            await asyncio.gather(*[self._run([entry]) for entry in batch])
+            return
+        except Exception as e:
+            for _, future in batch:
+                self._set_exception(future, e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Requests that were cancelled while waiting have no one to tell
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _set_exception(future: asyncio.Future, exception: Exception):
+        if not future.done():
+            future.set_exception(exception)
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, TypedDict, TypeVar
+import asyncio
+
+T = TypeVar("T")
+
+
+class KeyStats(TypedDict):
+    calls: int
+    executions: int
+    shared: int
+
+
+class SingleFlightStats(TypedDict):
+    calls: int
+    executions: int
+    shared: int
+    in_flight: int
+    keys: Dict[str, KeyStats]
+
+
+def location_key(
+    endpoint: str,
+    city: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+) -> str:
+    """
+    Key of a collect request. Cities are compared case-insensitively and
+    coordinates to 4 decimals, about 11 m, which no upstream API resolves.
+    """
+    if city is not None:
+        return f"{endpoint}:city:{' '.join(city.split()).casefold()}"
+
+    return f"{endpoint}:coords:{latitude:.4f},{longitude:.4f}"
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution, all
+    callers get its result or its exception. A call that arrives after the
+    execution finished starts a new one, nothing is cached.
+
+    The execution runs as its own task, so it completes even if the caller that
+    started it is cancelled. Stats are kept for the max_keys most recently used
+    keys.
+    """
+
+    def __init__(self, max_keys: int = 1024):
+        self.max_keys = max_keys
+
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._keys: OrderedDict[str, KeyStats] = OrderedDict()
+
+        self._calls = 0
+        self._executions = 0
+        self._shared = 0
+
+    async def do(self, key: str, function: Callable[[], Awaitable[T]]) -> T:
+        key_stats = self._key_stats(key)
+        key_stats["calls"] += 1
+        self._calls += 1
+
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(function())
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self._in_flight[key] = task
+
+            key_stats["executions"] += 1
+            self._executions += 1
+        else:
+            key_stats["shared"] += 1
+            self._shared += 1
+
+        # A cancelled caller must not cancel the execution of the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> SingleFlightStats:
+        return {
+            "calls": self._calls,
+            "executions": self._executions,
+            "shared": self._shared,
+            "in_flight": len(self._in_flight),
+            "keys": {key: dict(key_stats) for key, key_stats in self._keys.items()},
+        }
+
+    def _key_stats(self, key: str) -> KeyStats:
+        key_stats = self._keys.get(key)
+
+        if key_stats is None:
+            key_stats = {"calls": 0, "executions": 0, "shared": 0}
+            self._keys[key] = key_stats
+
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(key)
+
+        return key_stats
@@ -1,30 +1,114 @@
 from fastapi import FastAPI, HTTPException, Depends, Response
 from pydantic import BaseModel
 from loguru import logger
+from contextlib import asynccontextmanager
+from typing import List
+import asyncio
 import os
 from sqlalchemy.exc import IntegrityError
-from components.data_collectors.src.weather_data_collector import WeatherDataCollector
+from components.data_collectors.src.async_weather_data_collector import (
+    AsyncWeatherDataCollector,
+)
+from components.data_collectors.src.grid_forecast_cache import GridForecastCache
+from components.data_collectors.src.response_cache import make_response_cache
 from components.data_collectors.src.coordinates_collector import CoordinatesCollector
+from components.data_gateways.src.geocoding_gateway import GeocodingGateway
 from components.data_gateways.src.weather_data_gateway import WeatherDataGateway
+from applications.data_collector_server.src.singleflight import (
+    SingleFlight,
+    location_key,
+)
+from applications.data_collector_server.src.micro_batcher import MicroBatcher
+
+# Grid cell size in degrees and model run interval in hours of the forecast cache
+WEATHER_GRID_RESOLUTION = float(os.getenv("WEATHER_GRID_RESOLUTION", "0.1"))
+WEATHER_MODEL_UPDATE_HOURS = float(os.getenv("WEATHER_MODEL_UPDATE_HOURS", "6"))
+# Hours from the start of a model run until Open-Meteo serves it
+WEATHER_MODEL_UPDATE_DELAY_HOURS = float(
+    os.getenv("WEATHER_MODEL_UPDATE_DELAY_HOURS", "4")
+)
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "4096"))
+
+forecast_cache = GridForecastCache(
+    resolution=WEATHER_GRID_RESOLUTION,
+    update_interval=WEATHER_MODEL_UPDATE_HOURS * 3600,
+    update_delay=WEATHER_MODEL_UPDATE_DELAY_HOURS * 3600,
+    maxsize=WEATHER_CACHE_SIZE,
+)
+
+# Raw response cache: "memory", "disk" (sharded directory) or "mmap" (file)
+WEATHER_RESPONSE_CACHE = os.getenv("WEATHER_RESPONSE_CACHE", "memory")
+WEATHER_RESPONSE_CACHE_BYTES = int(
+    os.getenv("WEATHER_RESPONSE_CACHE_BYTES", str(64 * 2**20))
+)
+WEATHER_RESPONSE_CACHE_PATH = os.getenv("WEATHER_RESPONSE_CACHE_PATH")
+
+response_cache = make_response_cache(
+    WEATHER_RESPONSE_CACHE,
+    max_bytes=WEATHER_RESPONSE_CACHE_BYTES,
+    path=WEATHER_RESPONSE_CACHE_PATH,
+)
+
+# One collector per process, so its connection pool and caches are shared
+collector = AsyncWeatherDataCollector(
+    forecast_cache=forecast_cache, response_cache=response_cache
+)
 
 
 def get_collector():
-    return WeatherDataCollector()
+    return collector
 
 
-def get_coordinates_collector():
-    return CoordinatesCollector()
+# /collect requests arriving within the window share one Open-Meteo request
+WEATHER_BATCH_WINDOW_MS = float(os.getenv("WEATHER_BATCH_WINDOW_MS", "10"))
+WEATHER_BATCH_MAX_SIZE = int(os.getenv("WEATHER_BATCH_MAX_SIZE", "50"))
+
+batcher = MicroBatcher(
+    collector.get_weather_data_many,
+    window=WEATHER_BATCH_WINDOW_MS / 1000,
+    max_batch_size=WEATHER_BATCH_MAX_SIZE,
+)
+
+
+def get_batcher():
+    return batcher
 
 
 # For docker, read database path from environment
 SQLITE_WEATHER_DB_PATH = os.getenv("SQLITE_WEATHER_DB_PATH", "sqlite:///weather.db")
 
+# How long coordinates of cities are kept, and cities the geocoder does not know
+GEOCODING_TTL_HOURS = float(os.getenv("GEOCODING_TTL_HOURS", "720"))
+GEOCODING_NOT_FOUND_TTL_HOURS = float(os.getenv("GEOCODING_NOT_FOUND_TTL_HOURS", "24"))
+
+geocoding_gateway = GeocodingGateway(
+    db_path=SQLITE_WEATHER_DB_PATH,
+    ttl=GEOCODING_TTL_HOURS * 3600,
+    negative_ttl=GEOCODING_NOT_FOUND_TTL_HOURS * 3600,
+)
+
+
+def get_coordinates_collector():
+    # Ensuring the geocoding table exists
+    geocoding_gateway.create()
+
+    return CoordinatesCollector(cache=geocoding_gateway)
+
 
 def get_weather_data_gateway():
     return WeatherDataGateway(db_path=SQLITE_WEATHER_DB_PATH)
 
 
-app = FastAPI()
+singleflight = SingleFlight()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await collector.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 # Input schema
@@ -39,10 +123,21 @@ class RequestData(BaseModel):
             raise ValueError("Either 'city' or 'latitude/longitude' must be provided.")
 
 
+class BatchRequestData(BaseModel):
+    locations: List[RequestData]
+
+    def validate(self):
+        if not self.locations:
+            raise ValueError("At least one location must be provided.")
+
+        for location in self.locations:
+            location.validate()
+
+
 @app.post("/collect")
 async def collect(
     data: RequestData,
-    collector: WeatherDataCollector = Depends(get_collector),
+    batcher: MicroBatcher = Depends(get_batcher),
     coordinates_collector: CoordinatesCollector = Depends(get_coordinates_collector),
     weather_data_gateway: WeatherDataGateway = Depends(get_weather_data_gateway),
 ):
@@ -58,50 +153,182 @@ async def collect(
 
     logger.info("Making request...")
 
+    # Concurrent requests for the same location share one upstream call and insert
+    result = await singleflight.do(
+        location_key("collect", data.city, data.latitude, data.longitude),
+        lambda: _collect(data, batcher, coordinates_collector, weather_data_gateway),
+    )
+
+    if result is None:
+        return Response(status_code=204)
+
+    logger.info("Returning data...")
+    return result
+
+
+async def _collect(
+    data: RequestData,
+    batcher: MicroBatcher,
+    coordinates_collector: CoordinatesCollector,
+    weather_data_gateway: WeatherDataGateway,
+):
     if data.city is not None:
         coords = await coordinates_collector.get_coordinates(data.city)
 
         if not coords:
-            return Response(status_code=204)
+            return None
 
         latitude, longitude = coords
-
-        result = collector.get_weather_data(latitude, longitude)
     else:
-        result = collector.get_weather_data(data.latitude, data.longitude)
+        latitude, longitude = data.latitude, data.longitude
+
+    result = await batcher.submit(latitude, longitude)
 
     # Ensuring database exists
     weather_data_gateway.create()
 
     # Storing data if it does not yet exist
     if result:
-        temperature = result[0]["temperature_2m_max"]
-
         try:
-            if data.city is not None:
-                coords = await coordinates_collector.get_coordinates(data.city)
-
-                if not coords:
-                    return Response(status_code=204)
-
-                latitude, longitude = coords
-
-                city = data.city
-
-                weather_data_gateway.insert_weather_data(
-                    city=city,
-                    latitude=latitude,
-                    longitude=longitude,
-                    temperature=temperature,
-                )
-            else:
-                weather_data_gateway.insert_weather_data(
-                    latitude=data.latitude,
-                    longitude=data.longitude,
-                    temperature=temperature,
-                )
+            weather_data_gateway.insert_weather_data(
+                city=data.city,
+                latitude=latitude,
+                longitude=longitude,
+                temperature=result[0]["temperature_2m_max"],
+            )
         except IntegrityError:
             pass
 
-    logger.info("Returning data...")
     return result
+
+
+@app.post("/collect/hourly")
+async def collect_hourly(
+    data: RequestData,
+    collector: AsyncWeatherDataCollector = Depends(get_collector),
+    coordinates_collector: CoordinatesCollector = Depends(get_coordinates_collector),
+):
+    logger.info(
+        f"Hourly request received with city: {data.city}, "
+        f"latitude: {str(data.latitude)} and "
+        f"longitude: {str(data.longitude)}"
+    )
+    try:
+        data.validate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = await singleflight.do(
+        location_key("collect/hourly", data.city, data.latitude, data.longitude),
+        lambda: _collect_hourly(data, collector, coordinates_collector),
+    )
+
+    if result is None:
+        return Response(status_code=204)
+
+    logger.info("Returning hourly data...")
+    return result
+
+
+@app.post("/collect/batch")
+async def collect_batch(
+    data: BatchRequestData,
+    collector: AsyncWeatherDataCollector = Depends(get_collector),
+    coordinates_collector: CoordinatesCollector = Depends(get_coordinates_collector),
+    weather_data_gateway: WeatherDataGateway = Depends(get_weather_data_gateway),
+):
+    """
+    Collects the forecasts of many locations with as few Open-Meteo requests as
+    possible. Returns one forecast per location, None for unknown cities.
+    """
+    logger.info(f"Batch request received with {len(data.locations)} locations")
+
+    try:
+        data.validate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    coords = await asyncio.gather(
+        *[
+            _get_location_coordinates(location, coordinates_collector)
+            for location in data.locations
+        ]
+    )
+
+    resolved = [index for index, location in enumerate(coords) if location]
+
+    logger.info(f"Making batch request for {len(resolved)} locations...")
+
+    forecasts = await collector.get_weather_data_many(
+        [coords[index] for index in resolved]
+    )
+
+    results = [None] * len(data.locations)
+
+    for index, forecast in zip(resolved, forecasts):
+        results[index] = forecast
+
+    # Ensuring database exists
+    weather_data_gateway.create()
+
+    for index in resolved:
+        if not results[index]:
+            continue
+
+        latitude, longitude = coords[index]
+
+        try:
+            weather_data_gateway.insert_weather_data(
+                city=data.locations[index].city,
+                latitude=latitude,
+                longitude=longitude,
+                temperature=results[index][0]["temperature_2m_max"],
+            )
+        except (IntegrityError, ValueError):
+            # The gateway reports duplicate entries as ValueError
+            pass
+
+    logger.info("Returning batch data...")
+    return results
+
+
+@app.get("/singleflight-stats")
+def singleflight_stats():
+    return singleflight.stats()
+
+
+@app.get("/batch-stats")
+def batch_stats():
+    return batcher.stats()
+
+
+@app.get("/cache-stats")
+def cache_stats():
+    return {"forecast": forecast_cache.stats(), "response": response_cache.stats()}
+
+
+async def _collect_hourly(
+    data: RequestData,
+    collector: AsyncWeatherDataCollector,
+    coordinates_collector: CoordinatesCollector,
+):
+    if data.city is not None:
+        coords = await coordinates_collector.get_coordinates(data.city)
+
+        if not coords:
+            return None
+
+        latitude, longitude = coords
+    else:
+        latitude, longitude = data.latitude, data.longitude
+
+    return await collector.get_hourly_weather_data(latitude, longitude)
+
+
+async def _get_location_coordinates(
+    location: RequestData, coordinates_collector: CoordinatesCollector
+):
+    if location.city is not None:
+        return await coordinates_collector.get_coordinates(location.city)
+
+    return location.latitude, location.longitude
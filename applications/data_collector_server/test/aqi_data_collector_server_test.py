@@ -1,5 +1,16 @@
+import asyncio
+import json
 import pytest
-from applications.data_collector_server.src.aqi_data_collector_server import RequestData
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, MagicMock
+from applications.data_collector_server.src.aqi_data_collector_server import (
+    BatchRequestData,
+    RequestData,
+    collect,
+    collect_batch,
+    singleflight,
+    singleflight_stats,
+)
 
 
 def test_RequestData_valid():
@@ -21,3 +32,113 @@ def test_RequestData_invalid():
         ValueError, match="Either 'city' or 'latitude/longitude' must be provided."
     ):
         long_data.validate()
+
+
+@pytest.mark.asyncio
+async def test_collect_coalesced():
+    result = {
+        "city": "Bogota",
+        "latitude": 4.6,
+        "longitude": -74.1,
+        "aqi": 42,
+        "dominentpol": "pm25",
+    }
+
+    async def get_air_quality_data_by_coords(latitude, longitude):
+        await asyncio.sleep(0.01)
+        return result
+
+    collector = MagicMock()
+    collector.get_air_quality_data_by_coords = AsyncMock(
+        side_effect=get_air_quality_data_by_coords
+    )
+
+    aqi_data_gateway = MagicMock()
+
+    results = await asyncio.gather(
+        *[
+            collect(
+                RequestData(latitude=4.6, longitude=-74.1),
+                collector=collector,
+                coordinates_collector=MagicMock(),
+                aqi_data_gateway=aqi_data_gateway,
+            )
+            for _ in range(4)
+        ]
+    )
+
+    assert results == [result] * 4
+    collector.get_air_quality_data_by_coords.assert_awaited_once()
+    aqi_data_gateway.insert_air_quality_data.assert_called_once()
+
+    key_stats = singleflight_stats()["keys"]["collect:coords:4.6000,-74.1000"]
+    assert key_stats == {"calls": 4, "executions": 1, "shared": 3}
+    assert singleflight.stats()["in_flight"] == 0
+
+
+def test_BatchRequestData_invalid():
+    with pytest.raises(ValueError, match="At least one location must be provided."):
+        BatchRequestData(locations=[]).validate()
+
+    with pytest.raises(ValueError):
+        BatchRequestData(locations=[RequestData(latitude=1)]).validate()
+
+
+@pytest.mark.asyncio
+async def test_collect_batch():
+    result = {
+        "city": "Bogota",
+        "latitude": 4.6,
+        "longitude": -74.1,
+        "aqi": 42,
+        "dominentpol": "pm25",
+    }
+
+    async def get_air_quality_data_many(locations, coordinates_collector):
+        assert locations == ["Bogota", (4.6, -74.1), "Atlantis"]
+
+        yield {"index": 1, "data": result, "error": None}
+        yield {"index": 0, "data": result, "error": None}
+        yield {"index": 2, "data": None, "error": None}
+
+    collector = MagicMock()
+    collector.get_air_quality_data_many = get_air_quality_data_many
+
+    aqi_data_gateway = MagicMock()
+
+    response = await collect_batch(
+        BatchRequestData(
+            locations=[
+                RequestData(city="Bogota"),
+                RequestData(latitude=4.6, longitude=-74.1),
+                RequestData(city="Atlantis"),
+            ]
+        ),
+        collector=collector,
+        coordinates_collector=MagicMock(),
+        aqi_data_gateway=aqi_data_gateway,
+    )
+
+    assert response.media_type == "application/x-ndjson"
+
+    lines = [json.loads(line) async for line in response.body_iterator]
+
+    # One line per location, in the order they completed
+    assert [line["index"] for line in lines] == [1, 0, 2]
+    assert lines[0]["data"] == result
+    assert lines[2]["data"] is None
+
+    assert aqi_data_gateway.insert_air_quality_data.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_collect_batch_invalid():
+    with pytest.raises(HTTPException) as e:
+        await collect_batch(
+            BatchRequestData(locations=[]),
+            collector=MagicMock(),
+            coordinates_collector=MagicMock(),
+            aqi_data_gateway=MagicMock(),
+        )
+
+    assert e.value.status_code == 400
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from applications.data_collector_server.src.micro_batcher import MicroBatcher
+
+
+class FakeCollector:
+
+    def __init__(self):
+        self.batches = []
+
+    async def get_weather_data_many(self, coords):
+        self.batches.append(list(coords))
+
+        for latitude, _ in coords:
+            if latitude > 90:
+                raise ValueError("Latitude must be a float between -90 and 90.")
+
+        await asyncio.sleep(0.001)
+
+        return [f"forecast {latitude}" for latitude, _ in coords]
+
+
+@pytest.mark.asyncio
+async def test_window_flush():
+    collector = FakeCollector()
+    batcher = MicroBatcher(collector.get_weather_data_many, window=0.01)
+
+    results = await asyncio.gather(
+        *[batcher.submit(float(latitude), 0.0) for latitude in range(3)]
+    )
+
+    assert results == ["forecast 0.0", "forecast 1.0", "forecast 2.0"]
+    assert collector.batches == [[(0.0, 0.0), (1.0, 0.0), (2.0, 0.0)]]
+
+    stats = batcher.stats()
+
+    assert stats["batches"] == 1
+    assert stats["window_flushes"] == 1
+    assert stats["mean_batch_size"] == 3
+    assert stats["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_size_flush():
+    collector = FakeCollector()
+    batcher = MicroBatcher(collector.get_weather_data_many, window=10, max_batch_size=2)
+
+    # A full batch leaves right away instead of waiting for the window
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            *[batcher.submit(float(latitude), 0.0) for latitude in range(4)]
+        ),
+        timeout=1,
+    )
+
+    assert len(results) == 4
+    assert [len(batch) for batch in collector.batches] == [2, 2]
+    assert batcher.stats()["size_flushes"] == 2
+    assert batcher.stats()["largest_batch"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_location_fails_alone():
+    collector = FakeCollector()
+    batcher = MicroBatcher(collector.get_weather_data_many, window=0.01)
+
+    results = await asyncio.gather(
+        batcher.submit(1.0, 0.0),
+        batcher.submit(91.0, 0.0),
+        batcher.submit(2.0, 0.0),
+        return_exceptions=True,
+    )
+
+    assert results[0] == "forecast 1.0"
+    assert isinstance(results[1], ValueError)
+    assert results[2] == "forecast 2.0"
+
+
+@pytest.mark.asyncio
+async def test_upstream_error_fails_batch():
+    async def fetch_many(coords):
+        raise ConnectionError("Open-Meteo is down")
+
+    batcher = MicroBatcher(fetch_many, window=0.001)
+
+    results = await asyncio.gather(
+        batcher.submit(1.0, 0.0), batcher.submit(2.0, 0.0), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        MicroBatcher(FakeCollector().get_weather_data_many, max_batch_size=0)
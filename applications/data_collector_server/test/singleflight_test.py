@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from applications.data_collector_server.src.singleflight import (
+    SingleFlight,
+    location_key,
+)
+
+
+def test_location_key():
+    assert location_key("collect", city=" New  York ") == location_key(
+        "collect", city="new york"
+    )
+    assert location_key("collect", latitude=4.60971, longitude=-74.08170) == (
+        location_key("collect", latitude=4.60968, longitude=-74.0817)
+    )
+    assert location_key("collect", city="Bogota") != location_key(
+        "collect/hourly", city="Bogota"
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_execution():
+    singleflight = SingleFlight()
+    executions = []
+
+    async def fetch(value):
+        executions.append(value)
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    results = await asyncio.gather(
+        *[singleflight.do("a", lambda: fetch("a")) for _ in range(5)],
+        singleflight.do("b", lambda: fetch("b")),
+    )
+
+    assert executions == ["a", "b"]
+    assert results[:5] == [{"value": "a"}] * 5
+    assert results[5] == {"value": "b"}
+
+    stats = singleflight.stats()
+
+    assert stats["calls"] == 6
+    assert stats["executions"] == 2
+    assert stats["shared"] == 4
+    assert stats["in_flight"] == 0
+    assert stats["keys"]["a"] == {"calls": 5, "executions": 1, "shared": 4}
+
+
+@pytest.mark.asyncio
+async def test_later_call_executes_again():
+    singleflight = SingleFlight()
+
+    async def fetch():
+        return 1
+
+    await singleflight.do("a", fetch)
+    await singleflight.do("a", fetch)
+
+    assert singleflight.stats()["executions"] == 2
+
+
+@pytest.mark.asyncio
+async def test_exception_shared():
+    singleflight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("Upstream failed")
+
+    results = await asyncio.gather(
+        singleflight.do("a", fail), singleflight.do("a", fail), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert singleflight.stats()["executions"] == 1
+    assert singleflight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller():
+    singleflight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 1
+
+    first = asyncio.ensure_future(singleflight.do("a", fetch))
+    second = asyncio.ensure_future(singleflight.do("a", fetch))
+
+    await asyncio.sleep(0)
+    first.cancel()
+
+    # The caller that started the execution is gone, the other still gets it
+    assert await second == 1
+
+
+def test_max_keys():
+    singleflight = SingleFlight(max_keys=2)
+
+    for key in ["a", "b", "c"]:
+        singleflight._key_stats(key)
+
+    assert list(singleflight.stats()["keys"]) == ["b", "c"]
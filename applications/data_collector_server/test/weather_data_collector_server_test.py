@@ -1,6 +1,15 @@
+import asyncio
 import pytest
+from unittest.mock import AsyncMock, MagicMock
+from applications.data_collector_server.src.micro_batcher import MicroBatcher
 from applications.data_collector_server.src.weather_data_collector_server import (
+    BatchRequestData,
     RequestData,
+    batch_stats,
+    cache_stats,
+    collect,
+    collect_batch,
+    singleflight,
 )
 
 
@@ -23,3 +32,139 @@ def test_RequestData_invalid():
         ValueError, match="Either 'city' or 'latitude/longitude' must be provided."
     ):
         long_data.validate()
+
+
+def test_BatchRequestData_invalid():
+    with pytest.raises(ValueError, match="At least one location must be provided."):
+        BatchRequestData(locations=[]).validate()
+
+    with pytest.raises(
+        ValueError, match="Either 'city' or 'latitude/longitude' must be provided."
+    ):
+        BatchRequestData(
+            locations=[RequestData(city="Bogota"), RequestData(latitude=1)]
+        ).validate()
+
+
+@pytest.mark.asyncio
+async def test_collect_batch():
+    collector = MagicMock()
+    collector.get_weather_data_many = AsyncMock()
+    collector.get_weather_data_many.side_effect = lambda coords: [
+        [{"temperature_2m_max": latitude}] for latitude, _ in coords
+    ]
+
+    coordinates_collector = MagicMock()
+    coordinates_collector.get_coordinates = AsyncMock(
+        side_effect=lambda city: (4.6, -74.1) if city == "Bogota" else None
+    )
+
+    data = BatchRequestData(
+        locations=[
+            RequestData(city="Bogota"),
+            RequestData(city="Atlantis"),
+            RequestData(latitude=52.5, longitude=13.4),
+        ]
+    )
+
+    result = await collect_batch(
+        data,
+        collector=collector,
+        coordinates_collector=coordinates_collector,
+        weather_data_gateway=MagicMock(),
+    )
+
+    # All resolved locations are fetched with one call
+    collector.get_weather_data_many.assert_awaited_once_with(
+        [(4.6, -74.1), (52.5, 13.4)]
+    )
+    assert result == [
+        [{"temperature_2m_max": 4.6}],
+        None,
+        [{"temperature_2m_max": 52.5}],
+    ]
+
+
+def test_cache_stats():
+    stats = cache_stats()
+
+    assert set(stats["forecast"]) == {"hits", "misses", "evictions", "size", "maxsize"}
+    assert set(stats["response"]) == {
+        "hits",
+        "misses",
+        "evictions",
+        "entries",
+        "bytes",
+        "max_bytes",
+    }
+
+
+@pytest.mark.asyncio
+async def test_collect_coalesced():
+    async def get_weather_data_many(coords):
+        await asyncio.sleep(0.01)
+        return [[{"temperature_2m_max": 18.8}] for _ in coords]
+
+    collector = MagicMock()
+    collector.get_weather_data_many = AsyncMock(side_effect=get_weather_data_many)
+
+    coordinates_collector = MagicMock()
+    coordinates_collector.get_coordinates = AsyncMock(return_value=(4.6, -74.1))
+
+    weather_data_gateway = MagicMock()
+
+    results = await asyncio.gather(
+        *[
+            collect(
+                RequestData(city=city),
+                batcher=MicroBatcher(collector.get_weather_data_many),
+                coordinates_collector=coordinates_collector,
+                weather_data_gateway=weather_data_gateway,
+            )
+            for city in ["Bogota", "bogota", "BOGOTA "]
+        ]
+    )
+
+    # One geocoding, one upstream call and one insert for all three requests
+    assert results == [[{"temperature_2m_max": 18.8}]] * 3
+    coordinates_collector.get_coordinates.assert_awaited_once()
+    collector.get_weather_data_many.assert_awaited_once_with([(4.6, -74.1)])
+    weather_data_gateway.insert_weather_data.assert_called_once_with(
+        city="Bogota", latitude=4.6, longitude=-74.1, temperature=18.8
+    )
+
+    assert singleflight.stats()["keys"]["collect:city:bogota"]["shared"] == 2
+
+
+@pytest.mark.asyncio
+async def test_collect_batched():
+    collector = MagicMock()
+    collector.get_weather_data_many = AsyncMock(
+        side_effect=lambda coords: [
+            [{"temperature_2m_max": latitude}] for latitude, _ in coords
+        ]
+    )
+
+    batcher = MicroBatcher(collector.get_weather_data_many, window=0.01)
+
+    results = await asyncio.gather(
+        *[
+            collect(
+                RequestData(latitude=latitude, longitude=-74.1),
+                batcher=batcher,
+                coordinates_collector=MagicMock(),
+                weather_data_gateway=MagicMock(),
+            )
+            for latitude in [1.0, 2.0, 3.0]
+        ]
+    )
+
+    # Distinct locations arriving together go upstream in one request
+    collector.get_weather_data_many.assert_awaited_once_with(
+        [(1.0, -74.1), (2.0, -74.1), (3.0, -74.1)]
+    )
+    assert results == [[{"temperature_2m_max": latitude}] for latitude in [1, 2, 3]]
+
+
+def test_batch_stats():
+    assert batch_stats()["window_ms"] == 10
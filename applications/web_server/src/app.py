@@ -2,6 +2,7 @@ import aio_pika
 import json
 import asyncio
 import uuid
+from typing import Annotated
 from fastapi import FastAPI, Form, HTTPException, Request
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
@@ -87,13 +88,22 @@ async def main(request: Request):
 
 
 @app.post("/best_outdoor_sports_day", response_class=HTMLResponse)
-async def best_outdoor_sports_day(request: Request, user_input: str = Form(...)):
+async def best_outdoor_sports_day(
+    request: Request,
+    user_input: str = Form(...),
+    sport: Annotated[str | None, Form()] = None,
+):
     user_input = user_input.capitalize()
 
     logger.info(f"Request received with {user_input}")
 
     params = {}
     params["city"] = user_input
+    # Only the best day is shown
+    params["top_k"] = 1
+
+    if sport:
+        params["sport"] = sport
 
     if USE_RABBITMQ:
         logger.info(f"Fetching best sports day via RabbitMQ with params: {params}")
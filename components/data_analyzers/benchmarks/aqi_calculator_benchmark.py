@@ -0,0 +1,60 @@
+"""
+Throughput of the scalar AQICalculator.calculate_aqi path against the vectorized
+AQICalculator.calculate_many path.
+
+Run from the root directory with
+    python -m components.data_analyzers.benchmarks.aqi_calculator_benchmark
+"""
+
+from components.data_analyzers.src.aqi_calculator import AQICalculator
+import numpy as np
+import time
+
+SAMPLE_SIZES = [1_000, 100_000, 10_000_000]
+
+# Scoring 1e7 samples one by one takes minutes, so the scalar path stops here
+MAX_SCALAR_SAMPLES = 100_000
+
+
+def _scalar(pm25: np.ndarray, pm10: np.ndarray) -> float:
+    start = time.perf_counter()
+    for pm25_value, pm10_value in zip(pm25.tolist(), pm10.tolist()):
+        AQICalculator(pm25=pm25_value, pm10=pm10_value).calculate_aqi()
+    return time.perf_counter() - start
+
+
+def _vectorized(pm25: np.ndarray, pm10: np.ndarray) -> float:
+    aqi_calculator = AQICalculator()
+    start = time.perf_counter()
+    aqi_calculator.calculate_many(pm25=pm25, pm10=pm10)
+    return time.perf_counter() - start
+
+
+def main():
+    rng = np.random.default_rng(42)
+
+    print(f"{'samples':>12} {'scalar/s':>14} {'vectorized/s':>14} {'speedup':>9}")
+
+    for sample_size in SAMPLE_SIZES:
+        pm25 = rng.uniform(0, 300, sample_size)
+        pm10 = rng.uniform(0, 500, sample_size)
+
+        vectorized_seconds = _vectorized(pm25, pm10)
+        vectorized_throughput = sample_size / vectorized_seconds
+
+        if sample_size <= MAX_SCALAR_SAMPLES:
+            scalar_throughput = sample_size / _scalar(pm25, pm10)
+            scalar_column = f"{scalar_throughput:>14,.0f}"
+            speedup_column = f"{vectorized_throughput / scalar_throughput:>8.0f}x"
+        else:
+            scalar_column = f"{'-':>14}"
+            speedup_column = f"{'-':>9}"
+
+        print(
+            f"{sample_size:>12,} {scalar_column} "
+            f"{vectorized_throughput:>14,.0f} {speedup_column}"
+        )
+
+
+if __name__ == "__main__":
+    main()
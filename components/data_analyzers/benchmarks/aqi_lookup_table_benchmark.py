@@ -0,0 +1,76 @@
+"""
+Memory and latency of the memory-mapped AQI lookup tables against the
+interpolation formula of the compiled breakpoint tables.
+
+Run from the root directory with
+    python -m components.data_analyzers.benchmarks.aqi_lookup_table_benchmark
+"""
+
+from components.data_analyzers.src.aqi_calculator import AQICalculator
+import numpy as np
+import tempfile
+import timeit
+import time
+
+SCALAR_CALLS = 200_000
+BATCH_SIZE = 1_000_000
+
+
+def _breakpoint_nbytes(aqi_calculator: AQICalculator) -> int:
+    tables = aqi_calculator._pollutant_breakpoints.tables.values()
+    return sum(
+        table.range_low.nbytes
+        + table.range_high.nbytes
+        + table.aqi_low.nbytes
+        + table.aqi_high.nbytes
+        for table in tables
+    )
+
+
+def main():
+    lookup_table_directory = tempfile.mkdtemp()
+
+    start = time.perf_counter()
+    lookup_aqi_calculator = AQICalculator(
+        use_lookup_table=True, lookup_table_directory=lookup_table_directory
+    )
+    lookup_table = lookup_aqi_calculator.__get_lookup_table__()
+    build_seconds = time.perf_counter() - start
+
+    interpolation_aqi_calculator = AQICalculator()
+
+    print("Memory")
+    breakpoint_nbytes = _breakpoint_nbytes(lookup_aqi_calculator)
+
+    print(f"  compiled breakpoints per process: {breakpoint_nbytes:>8,} B")
+    print(f"  lookup tables, shared memory map: {lookup_table.nbytes():>8,} B")
+    print(f"  build and validation (first use): {build_seconds * 1e3:>8.1f} ms")
+
+    rng = np.random.default_rng(42)
+    pm25 = np.round(rng.uniform(0, 300, BATCH_SIZE), 1)
+    pm10 = np.trunc(rng.uniform(0, 500, BATCH_SIZE))
+
+    print("Latency")
+
+    for name, aqi_calculator in [
+        ("interpolation", interpolation_aqi_calculator),
+        ("lookup table", lookup_aqi_calculator),
+    ]:
+        aqi_calculator._pm25 = 24.3
+        aqi_calculator._pm10 = 123
+
+        scalar_seconds = timeit.timeit(
+            aqi_calculator.calculate_aqi, number=SCALAR_CALLS
+        )
+        batch_seconds = timeit.timeit(
+            lambda: aqi_calculator.calculate_many(pm25=pm25, pm10=pm10), number=5
+        )
+
+        print(
+            f"  {name:<14} scalar {scalar_seconds / SCALAR_CALLS * 1e9:>7.0f} ns/call"
+            f"   batch {batch_seconds / 5 / BATCH_SIZE * 1e9:>6.1f} ns/sample"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+CPU per refresh of many tracked locations when only one of their forecasts
+changes: ranking from scratch against the per-location state of
+WeatherAQIAnalyzer.update_location.
+
+Run from the root directory with
+    python -m components.data_analyzers.benchmarks.incremental_ranking_benchmark
+"""
+
+from components.data_analyzers.benchmarks.weather_aqi_analyzer_benchmark import (
+    TODAY,
+    make_forecasts,
+)
+from components.data_analyzers.src.weather_aqi_analyzer import WeatherAQIAnalyzer
+from loguru import logger
+import time
+
+LOCATIONS = 2_000
+FORECAST_DAYS = 7
+
+
+def main():
+    logger.remove()
+
+    forecasts = [
+        make_forecasts(FORECAST_DAYS, seed=location) for location in range(LOCATIONS)
+    ]
+    # Refreshed forecasts with a new PM2.5 value on one of the days
+    refreshed_air_quality_forecasts = [
+        {
+            **air_quality_forecast,
+            "pm25_forecast": [
+                {**forecast, "avg": forecast["avg"] + (day == 3)}
+                for day, forecast in enumerate(air_quality_forecast["pm25_forecast"])
+            ],
+        }
+        for _, air_quality_forecast in forecasts
+    ]
+
+    analyzer = WeatherAQIAnalyzer()
+    analyzer._get_today = lambda: TODAY
+
+    for location, (weather_forecast, air_quality_forecast) in enumerate(forecasts):
+        analyzer.update_location(str(location), weather_forecast, air_quality_forecast)
+        analyzer.predict_location(str(location))
+
+    print(f"{'refresh':<12} {'from scratch/ms':>16} {'incremental/ms':>15}")
+
+    for refresh in ["weather", "air quality"]:
+        start = time.perf_counter()
+
+        for location, (weather_forecast, air_quality_forecast) in enumerate(forecasts):
+            if refresh == "air quality":
+                air_quality_forecast = refreshed_air_quality_forecasts[location]
+
+            location_analyzer = WeatherAQIAnalyzer(
+                weather_forecast=weather_forecast,
+                air_quality_forecast=air_quality_forecast,
+            )
+            location_analyzer._get_today = lambda: TODAY
+            location_analyzer.predict_best_outdoor_sports_day(engine="numpy")
+
+        scratch_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+
+        for location, (weather_forecast, _) in enumerate(forecasts):
+            if refresh == "weather":
+                analyzer.update_location(
+                    str(location), weather_forecast=weather_forecast
+                )
+            else:
+                analyzer.update_location(
+                    str(location),
+                    air_quality_forecast=refreshed_air_quality_forecasts[location],
+                )
+
+            analyzer.predict_location(str(location))
+
+        incremental_seconds = time.perf_counter() - start
+
+        print(
+            f"{refresh:<12} {scratch_seconds * 1e3:>16.1f} "
+            f"{incremental_seconds * 1e3:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Latency of the best N-hour window search over 7 day hourly forecasts (168
+hours) for growing numbers of locations.
+
+Run from the root directory with
+    python -m components.data_analyzers.benchmarks.time_windows_benchmark
+"""
+
+from components.data_analyzers.src.weather_aqi_analyzer import WeatherAQIAnalyzer
+from datetime import date, datetime, timedelta, timezone
+from loguru import logger
+import random
+import time
+
+HOURS = 168
+LOCATIONS = [1, 100, 1_000]
+WINDOW_HOURS = [2, 6]
+
+TODAY = date(2024, 12, 20)
+
+
+def make_hourly_forecast(seed: int) -> list:
+    rng = random.Random(seed)
+    start = datetime(2024, 12, 20, tzinfo=timezone(timedelta(hours=-5)))
+
+    return [
+        {
+            "date": start + timedelta(hours=hour),
+            "temperature_2m": rng.uniform(5, 30),
+            "precipitation": rng.choice([0.0, 0.0, 0.0, 0.2, 1.5]),
+            "pm2_5": rng.uniform(0, 80),
+            "pm10": rng.uniform(0, 150),
+        }
+        for hour in range(HOURS)
+    ]
+
+
+def main():
+    logger.remove()
+
+    analyzer = WeatherAQIAnalyzer()
+    analyzer._get_today = lambda: TODAY
+
+    print(f"{'locations':>10} {'window':>7} {'total/ms':>9} {'per location/ms':>16}")
+
+    for locations in LOCATIONS:
+        hourly_forecasts = [make_hourly_forecast(seed) for seed in range(locations)]
+
+        for window_hours in WINDOW_HOURS:
+            start = time.perf_counter()
+            analyzer.predict_best_time_windows_batch(hourly_forecasts, window_hours)
+            seconds = time.perf_counter() - start
+
+            print(
+                f"{locations:>10} {window_hours:>7} {seconds * 1e3:>9.1f} "
+                f"{seconds / locations * 1e3:>16.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Latency of WeatherAQIAnalyzer.predict_best_outdoor_sports_day with the pandas and
+the numpy ranking engine for 7 to 10 day forecasts, with the default ranking and
+with a compiled sport profile.
+
+Run from the root directory with
+    python -m components.data_analyzers.benchmarks.weather_aqi_analyzer_benchmark
+"""
+
+from components.data_analyzers.src.weather_aqi_analyzer import WeatherAQIAnalyzer
+from datetime import date, datetime, timedelta, timezone
+from loguru import logger
+import random
+import timeit
+
+FORECAST_DAYS = [7, 10]
+SPORTS = [None, "running"]
+REPETITIONS = 500
+
+TODAY = date(2024, 12, 20)
+
+
+def make_forecasts(forecast_days: int, seed: int = 42):
+    rng = random.Random(seed)
+    start = datetime(2024, 12, 20)
+
+    air_quality_forecast = {
+        "city": "Benchmark",
+        "pm25_forecast": [
+            {"avg": rng.randint(0, 200), "date": start + timedelta(days=day)}
+            for day in range(forecast_days)
+        ],
+        "pm10_forecast": [
+            {"avg": rng.randint(0, 300), "date": start + timedelta(days=day)}
+            for day in range(forecast_days)
+        ],
+    }
+
+    weather_start = datetime(2024, 12, 20, 5, tzinfo=timezone.utc)
+
+    weather_forecast = [
+        {
+            "date": weather_start + timedelta(days=day),
+            "weather_code": float(rng.choice([0, 3, 45, 61, 95])),
+            "temperature_2m_max": rng.uniform(5, 30),
+            "sunshine_duration": rng.uniform(0, 40000),
+            "precipitation_hours": float(rng.randint(0, 12)),
+        }
+        for day in range(forecast_days)
+    ]
+
+    return weather_forecast, air_quality_forecast
+
+
+def main():
+    # Debug logs of the analyzer would dominate the measurement
+    logger.remove()
+
+    print(f"{'sport':>8} {'days':>5} {'pandas/ms':>10} {'numpy/ms':>10} {'speedup':>8}")
+
+    for sport in SPORTS:
+        for forecast_days in FORECAST_DAYS:
+            weather_forecast, air_quality_forecast = make_forecasts(forecast_days)
+
+            analyzer = WeatherAQIAnalyzer(
+                weather_forecast=weather_forecast,
+                air_quality_forecast=air_quality_forecast,
+            )
+            analyzer._get_today = lambda: TODAY
+
+            latencies = {}
+
+            for engine in WeatherAQIAnalyzer.engines:
+                seconds = timeit.timeit(
+                    lambda: analyzer.predict_best_outdoor_sports_day(
+                        engine=engine, sport=sport
+                    ),
+                    number=REPETITIONS,
+                )
+                latencies[engine] = seconds / REPETITIONS * 1e3
+
+            print(
+                f"{sport or '-':>8} {forecast_days:>5} {latencies['pandas']:>10.3f} "
+                f"{latencies['numpy']:>10.3f} "
+                f"{latencies['pandas'] / latencies['numpy']:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
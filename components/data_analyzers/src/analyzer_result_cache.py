@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple, TypedDict
+from datetime import date, datetime
+import threading
+import hashlib
+import time
+import json
+import numpy as np
+
+
+class CacheStats(TypedDict):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class AnalyzerResultCache:
+    """
+    Size-bounded LRU cache of analyzer results with a time to live. Keys are
+    content hashes of the normalized inputs, so identical forecasts share an
+    entry no matter which request delivered them.
+
+    Entries are not invalidated when sport profiles change on disk, they expire
+    with the TTL instead.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+
+        # Key -> (expiry time, result), least recently used first
+        self._entries: OrderedDict[str, Tuple[float, Tuple[dict, ...]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(*inputs) -> str:
+        """Content hash of JSON-like inputs, with dates and numpy values."""
+        content = json.dumps(inputs, sort_keys=True, default=_normalize)
+
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+
+        # Callers get their own records, so they cannot change the cached ones
+        return [dict(record) for record in entry[1]]
+
+    def put(self, key: str, result: List[dict]):
+        entry = (
+            self._clock() + self.ttl,
+            tuple(dict(record) for record in result),
+        )
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _normalize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+
+    return str(value)
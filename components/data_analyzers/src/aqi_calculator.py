@@ -1,7 +1,17 @@
 from typing import Optional
+from components.data_analyzers.src.breakpoint_registry import (
+    BreakpointSet,
+    BreakpointTable,
+    breakpoint_registry,
+    round_like_python,
+)
+from components.data_analyzers.src.aqi_lookup_table import (
+    AQILookupTable,
+    get_lookup_table,
+)
 import math
 import os
-import json
+import numpy as np
 
 
 class AQICalculator:
@@ -13,40 +23,39 @@ class AQICalculator:
         _current_dir, "pollutant_breakpoints.json"
     )
 
-    with open(_pollutant_breakpoints_path, "r") as file:
-        pollutant_breakpoints = json.load(file)
-
-    _pm25_breakpoints = pollutant_breakpoints["pm25_breakpoints"]
-    _pm10_breakpoints = pollutant_breakpoints["pm10_breakpoints"]
-    # o3_breakpoints = pollutant_breakpoints['o3_breakpoints']
-
     def __init__(
         self,
         dominantpol: Optional[str] = None,
         pm25: Optional[float] = None,
         pm10: Optional[float] = None,
         pollutant_breakpoints_path: Optional[str] = None,
+        use_lookup_table: bool = False,
+        lookup_table_directory: Optional[str] = None,
     ):
         if dominantpol:
             self._dominantpol = dominantpol
-        if pm25:
+        if pm25 is not None:
             self._pm25 = round(pm25, 1)
-        if pm10:
+        if pm10 is not None:
             self._pm10 = math.trunc(pm10)
         # In case o3 should be later added
         # if o3:
         # self.o3 = round(o3, 3)
 
         # Uses data from the US EPA
-        # Determine the path to the JSON file
-        if pollutant_breakpoints_path is not None:
-            # Load the pollutant breakpoints
-            with open(pollutant_breakpoints_path, "r") as file:
-                pollutant_breakpoints = json.load(file)
+        # Breakpoint files are compiled once and shared through the registry
+        if pollutant_breakpoints_path is None:
+            pollutant_breakpoints_path = self._pollutant_breakpoints_path
 
-            self._pm25_breakpoints = pollutant_breakpoints["pm25_breakpoints"]
-            self._pm10_breakpoints = pollutant_breakpoints["pm10_breakpoints"]
-            # self._o3_breakpoints = pollutant_breakpoints['o3_breakpoints']
+        self._pollutant_breakpoints = breakpoint_registry.get(
+            pollutant_breakpoints_path
+        )
+
+        # Optional O(1) scoring through precomputed, memory-mapped lookup tables
+        self._use_lookup_table = use_lookup_table
+        self._lookup_table_directory = lookup_table_directory
+        self._lookup_table: Optional[AQILookupTable] = None
+        self._lookup_table_mtime_ns: Optional[int] = None
 
     def calculate_aqi(self) -> float:
 
@@ -68,6 +77,10 @@ class AQICalculator:
         for pollutant in self._pollutants_list:
             pollutant_concentration = getattr(self, pollutant, None)
 
+            # Only one of the pollutants might be forecasted for a given day
+            if pollutant_concentration is None:
+                continue
+
             pollutant_aqi = self.__calculate_pollutant_aqi__(
                 pollutant, pollutant_concentration
             )
@@ -77,43 +90,105 @@ class AQICalculator:
 
         return aqi
 
+    def calculate_pollutant_aqi(self, pollutant: str, concentration: float) -> float:
+        """
+        :pollutant: "pm25" or "pm10"
+        :return: The AQI of a single concentration, which is taken as already
+        rounded or truncated like a reported concentration.
+        """
+        return self.__calculate_pollutant_aqi__(f"_{pollutant}", concentration)
+
     def __calculate_pollutant_aqi__(
         self, pollutant: str, pollutant_concentration: float
     ) -> float:
-        breakpoints = getattr(self, f"{pollutant}_breakpoints", None)
-        if breakpoints is None:
+        lookup_table = self.__get_lookup_table__()
+
+        if lookup_table is not None:
+            pollutant_aqi = lookup_table.calculate_aqi(
+                f"{pollutant.lstrip('_')}_breakpoints", pollutant_concentration
+            )
+
+            # Concentrations off the quantization grid are interpolated
+            if pollutant_aqi is not None:
+                return pollutant_aqi
+
+        return self.__get_breakpoint_table__(pollutant).calculate_aqi(
+            pollutant_concentration
+        )
+
+    def __calculate_pollutant_aqi_many__(
+        self, pollutant: str, pollutant_concentrations: np.ndarray
+    ) -> np.ndarray:
+        lookup_table = self.__get_lookup_table__()
+
+        if lookup_table is not None:
+            pollutant_aqi = lookup_table.calculate_aqi_many(
+                f"{pollutant.lstrip('_')}_breakpoints", pollutant_concentrations
+            )
+
+            if pollutant_aqi is not None:
+                return pollutant_aqi
+
+        return self.__get_breakpoint_table__(pollutant).calculate_aqi_many(
+            pollutant_concentrations
+        )
+
+    def __get_lookup_table__(self) -> Optional[AQILookupTable]:
+        if not self._use_lookup_table:
+            return None
+
+        # Breakpoint files are reloaded in place, so the table follows their mtime
+        if (
+            self._lookup_table is None
+            or self._lookup_table_mtime_ns != self._pollutant_breakpoints.mtime_ns
+        ):
+            self._lookup_table = get_lookup_table(
+                self._pollutant_breakpoints, self._lookup_table_directory
+            )
+            self._lookup_table_mtime_ns = self._pollutant_breakpoints.mtime_ns
+
+        return self._lookup_table
+
+    def __get_breakpoint_table__(self, pollutant: str) -> BreakpointTable:
+        table_name = f"{pollutant.lstrip('_')}_breakpoints"
+
+        if table_name not in self._pollutant_breakpoints:
             raise AttributeError(f"No breakpoints found for pollutant: {pollutant}")
 
-        for aqi_level in breakpoints:
-            lower_bound = breakpoints[aqi_level]["Range"][0]
-            upper_bound = breakpoints[aqi_level]["Range"][1]
+        return self._pollutant_breakpoints[table_name]
 
-            if upper_bound is None:
-                breakpoint_low = lower_bound
-                breakpoint_high = upper_bound
+    def calculate_many(
+        self, pm25: Optional[np.ndarray] = None, pm10: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        :return: np.ndarray with one AQI per sample
 
-                aqi_low = breakpoints[aqi_level]["AQI"][0]
-                aqi_high = breakpoints[aqi_level]["AQI"][1]
-            else:
-                if (
-                    pollutant_concentration <= upper_bound
-                    and pollutant_concentration >= lower_bound
-                ):
-                    breakpoint_low = lower_bound
-                    breakpoint_high = upper_bound
+        Vectorized counterpart of calculate_aqi for arrays of concentrations. The
+        same US EPA rules apply: PM2.5 is rounded to 0.1, PM10 is truncated, the
+        open-ended band is capped at 301 and the AQI is the maximum over the
+        pollutants. Missing concentrations are passed as NaN and samples without
+        any pollutant yield NaN instead of raising.
+        """
+        if pm25 is None and pm10 is None:
+            raise ValueError(
+                "No pollutants provided. "
+                "You need to provide at least one of "
+                "PM25, PM10, O3 or UVI."
+            )
 
-                    aqi_low = breakpoints[aqi_level]["AQI"][0]
-                    aqi_high = breakpoints[aqi_level]["AQI"][1]
-                    break
+        aqi = None
 
-        if breakpoint_high is None:
-            return 301
+        if pm25 is not None:
+            pm25 = round_like_python(np.asarray(pm25, dtype=np.float64), 1)
+            aqi = self.__calculate_pollutant_aqi_many__("_pm25", pm25)
 
-        pollutant_aqi = ((aqi_high - aqi_low) / (breakpoint_high - breakpoint_low)) * (
-            pollutant_concentration - breakpoint_low
-        ) + aqi_low
+        if pm10 is not None:
+            pm10 = np.trunc(np.asarray(pm10, dtype=np.float64))
+            pm10_aqi = self.__calculate_pollutant_aqi_many__("_pm10", pm10)
+            # fmax ignores NaN, so a missing pollutant does not hide the other one
+            aqi = pm10_aqi if aqi is None else np.fmax(aqi, pm10_aqi)
 
-        return round(pollutant_aqi, 2)
+        return aqi
 
     def set_pm25(self, pm25: float):
         self._pm25 = pm25
@@ -128,13 +203,24 @@ class AQICalculator:
         return self._pm10
 
     def set_pm25_breakpoints(self, pm25_breakpoints: dict):
-        self._pm25_breakpoints = pm25_breakpoints
+        self.__set_breakpoints__("pm25_breakpoints", pm25_breakpoints)
 
     def get_pm25_breakpoints(self) -> dict:
-        return self._pm25_breakpoints
+        return self._pollutant_breakpoints["pm25_breakpoints"].breakpoints
 
     def set_pm10_breakpoints(self, pm10_breakpoints: dict):
-        self._pm10_breakpoints = pm10_breakpoints
+        self.__set_breakpoints__("pm10_breakpoints", pm10_breakpoints)
 
     def get_pm10_breakpoints(self) -> dict:
-        return self._pm10_breakpoints
+        return self._pollutant_breakpoints["pm10_breakpoints"].breakpoints
+
+    def __set_breakpoints__(self, table_name: str, breakpoints: dict):
+        # Custom tables only apply to this instance, the shared set stays untouched
+        pollutant_breakpoints = {
+            name: table.breakpoints
+            for name, table in self._pollutant_breakpoints.tables.items()
+        }
+        pollutant_breakpoints[table_name] = breakpoints
+
+        self._pollutant_breakpoints = BreakpointSet(pollutant_breakpoints)
+        self._lookup_table = None
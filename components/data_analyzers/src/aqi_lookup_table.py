@@ -0,0 +1,180 @@
+from components.data_analyzers.src.breakpoint_registry import (
+    BreakpointSet,
+    BreakpointTable,
+)
+from typing import Dict, Optional
+import threading
+import tempfile
+import hashlib
+import json
+import math
+import os
+import numpy as np
+
+
+class AQILookupTable:
+    """
+    Dense AQI values for every quantized concentration of a pollutant. PM2.5 is
+    rounded to 0.1 and PM10 is truncated before scoring, so the AQI of every
+    possible input up to the open-ended band can be precomputed once.
+
+    The tables are written to .npy files and opened as read-only memory maps, so
+    all processes on a host (uvicorn workers, analyzer replicas sharing a volume)
+    share one physical copy through the page cache.
+    """
+
+    # Number of lookup table entries per concentration unit
+    _resolutions = {"pm25_breakpoints": 10, "pm10_breakpoints": 1}
+
+    _format_version = 1
+
+    def __init__(self, tables: Dict[str, np.ndarray]):
+        self._tables = tables
+
+    @classmethod
+    def build(
+        cls, breakpoint_set: BreakpointSet, directory: Optional[str] = None
+    ) -> "AQILookupTable":
+        """
+        Opens the lookup tables for the given breakpoints, writing and validating
+        them first if no other process did so yet.
+        """
+        if directory is None:
+            directory = tempfile.gettempdir()
+
+        os.makedirs(directory, exist_ok=True)
+
+        digest = cls._digest(breakpoint_set)
+        tables = {}
+
+        for table_name, resolution in cls._resolutions.items():
+            path = os.path.join(directory, f"aqi_lookup_{digest}_{table_name}.npy")
+
+            if not os.path.exists(path):
+                values = cls._compute(breakpoint_set[table_name], resolution)
+                cls._validate(breakpoint_set[table_name], values, resolution)
+                cls._write(path, values)
+
+            tables[table_name] = np.load(path, mmap_mode="r")
+
+        return cls(tables)
+
+    def calculate_aqi(
+        self, table_name: str, pollutant_concentration: float
+    ) -> Optional[float]:
+        """
+        :return: The AQI of the concentration, or None if the concentration is not
+        on the quantization grid and has to be interpolated instead.
+        """
+        # NaN and infinity are not on the grid, and can not be rounded to an index
+        if not math.isfinite(pollutant_concentration):
+            return None
+
+        resolution = self._resolutions[table_name]
+        index = round(pollutant_concentration * resolution)
+
+        if index / resolution != pollutant_concentration:
+            return None
+
+        table = self._tables[table_name]
+
+        # Negative concentrations and the open-ended band are hazardous
+        if index < 0 or index >= len(table):
+            return 301
+
+        return float(table[index])
+
+    def calculate_aqi_many(
+        self, table_name: str, pollutant_concentrations: np.ndarray
+    ) -> Optional[np.ndarray]:
+        """
+        :return: The AQI of every concentration, or None if any of them is not on
+        the quantization grid and the batch has to be interpolated instead.
+        """
+        resolution = self._resolutions[table_name]
+        table = self._tables[table_name]
+
+        missing = np.isnan(pollutant_concentrations)
+        index = np.rint(np.where(missing, 0, pollutant_concentrations) * resolution)
+
+        if not np.array_equal(
+            index[~missing] / resolution, pollutant_concentrations[~missing]
+        ):
+            return None
+
+        in_table = (index >= 0) & (index < len(table))
+        index = np.where(in_table, index, 0).astype(np.intp)
+
+        pollutant_aqi = np.where(in_table, table[index], 301.0)
+
+        return np.where(missing, np.nan, pollutant_aqi)
+
+    def nbytes(self) -> int:
+        return sum(table.nbytes for table in self._tables.values())
+
+    @classmethod
+    def _digest(cls, breakpoint_set: BreakpointSet) -> str:
+        breakpoints = {
+            table_name: breakpoint_set[table_name].breakpoints
+            for table_name in cls._resolutions
+        }
+        content = json.dumps(
+            {"version": cls._format_version, "breakpoints": breakpoints},
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def _compute(table: BreakpointTable, resolution: int) -> np.ndarray:
+        # Everything above the highest closed band is hazardous, so the table ends
+        # there and lookups past the end return 301.
+        highest_bound = table.range_high[np.isfinite(table.range_high)].max()
+        size = round(highest_bound * resolution) + 1
+
+        concentrations = np.arange(size) / resolution
+
+        return table.calculate_aqi_many(concentrations)
+
+    @staticmethod
+    def _validate(table: BreakpointTable, values: np.ndarray, resolution: int):
+        for index, value in enumerate(values.tolist()):
+            expected = table.calculate_aqi(index / resolution)
+
+            if value != expected:
+                raise ValueError(
+                    f"Lookup table entry {index / resolution} is {value}, "
+                    f"but the interpolation formula gives {expected}."
+                )
+
+    @staticmethod
+    def _write(path: str, values: np.ndarray):
+        # Written next to the target and renamed, so concurrent workers either see
+        # no file or a complete one.
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".npy"
+        )
+
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.save(file, values)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+_lookup_tables: Dict[tuple, AQILookupTable] = {}
+_lookup_tables_lock = threading.Lock()
+
+
+def get_lookup_table(
+    breakpoint_set: BreakpointSet, directory: Optional[str] = None
+) -> AQILookupTable:
+    """Returns the lookup table of a breakpoint set, opening it once per process."""
+    key = (AQILookupTable._digest(breakpoint_set), directory)
+
+    with _lookup_tables_lock:
+        if key not in _lookup_tables:
+            _lookup_tables[key] = AQILookupTable.build(breakpoint_set, directory)
+
+        return _lookup_tables[key]
@@ -0,0 +1,188 @@
+from typing import Dict, Optional
+from bisect import bisect_right
+import threading
+import json
+import os
+import numpy as np
+
+
+class BreakpointTable:
+    """
+    Breakpoints of one pollutant compiled into contiguous arrays, sorted by the
+    lower bound of each range. Open-ended bounds are stored as infinity.
+    """
+
+    def __init__(self, breakpoints: dict):
+        self.breakpoints = breakpoints
+
+        levels = sorted(breakpoints.values(), key=lambda level: level["Range"][0])
+
+        self._range_low = [level["Range"][0] for level in levels]
+        self._range_high = [_bound(level["Range"][1]) for level in levels]
+        self._aqi_low = [level["AQI"][0] for level in levels]
+        self._aqi_high = [_bound(level["AQI"][1]) for level in levels]
+
+        self.range_low = np.array(self._range_low, dtype=np.float64)
+        self.range_high = np.array(self._range_high, dtype=np.float64)
+        self.aqi_low = np.array(self._aqi_low, dtype=np.float64)
+        self.aqi_high = np.array(self._aqi_high, dtype=np.float64)
+
+    def calculate_aqi(self, pollutant_concentration: float) -> float:
+        level = bisect_right(self._range_low, pollutant_concentration) - 1
+
+        # Concentrations in the open-ended band, below the first band or in a gap
+        # between two bands are reported as hazardous.
+        if (
+            level < 0
+            or pollutant_concentration > self._range_high[level]
+            or self._range_high[level] == np.inf
+        ):
+            return 301
+
+        breakpoint_low = self._range_low[level]
+        breakpoint_high = self._range_high[level]
+        aqi_low = self._aqi_low[level]
+        aqi_high = self._aqi_high[level]
+
+        pollutant_aqi = ((aqi_high - aqi_low) / (breakpoint_high - breakpoint_low)) * (
+            pollutant_concentration - breakpoint_low
+        ) + aqi_low
+
+        return round(pollutant_aqi, 2)
+
+    def calculate_aqi_many(self, pollutant_concentrations: np.ndarray) -> np.ndarray:
+        level = np.searchsorted(self.range_low, pollutant_concentrations, side="right")
+        level = np.clip(level - 1, 0, len(self.range_low) - 1)
+
+        breakpoint_low = self.range_low[level]
+        breakpoint_high = self.range_high[level]
+
+        in_band = (
+            (pollutant_concentrations >= breakpoint_low)
+            & (pollutant_concentrations <= breakpoint_high)
+            & np.isfinite(breakpoint_high)
+        )
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pollutant_aqi = (
+                (self.aqi_high[level] - self.aqi_low[level])
+                / (breakpoint_high - breakpoint_low)
+            ) * (pollutant_concentrations - breakpoint_low) + self.aqi_low[level]
+
+        pollutant_aqi = np.where(in_band, round_like_python(pollutant_aqi, 2), 301.0)
+
+        return np.where(np.isnan(pollutant_concentrations), np.nan, pollutant_aqi)
+
+
+class BreakpointSet:
+    """
+    All pollutant tables compiled from one breakpoint file. Reloading replaces the
+    tables in place, so every calculator holding this set sees the new values.
+    """
+
+    def __init__(
+        self,
+        pollutant_breakpoints: dict,
+        path: Optional[str] = None,
+        mtime_ns: Optional[int] = None,
+    ):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.tables: Dict[str, BreakpointTable] = {}
+
+        self._compile(pollutant_breakpoints)
+
+    @classmethod
+    def from_file(cls, path: str) -> "BreakpointSet":
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        with open(path, "r") as file:
+            pollutant_breakpoints = json.load(file)
+
+        return cls(pollutant_breakpoints, path=path, mtime_ns=mtime_ns)
+
+    def reload(self):
+        if self.path is None:
+            raise ValueError(
+                "Cannot reload breakpoints that were not loaded from a file."
+            )
+
+        reloaded = BreakpointSet.from_file(self.path)
+
+        self.tables = reloaded.tables
+        self.mtime_ns = reloaded.mtime_ns
+
+    def __getitem__(self, name: str) -> BreakpointTable:
+        return self.tables[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tables
+
+    def _compile(self, pollutant_breakpoints: dict):
+        for name, breakpoints in pollutant_breakpoints.items():
+            self.tables[name] = BreakpointTable(breakpoints)
+
+
+class BreakpointRegistry:
+    """
+    Compiles every breakpoint file once and shares it across all calculators.
+    Entries are keyed by absolute path and are reloaded in place when the file's
+    modification time changes.
+    """
+
+    def __init__(self):
+        self._breakpoint_sets: Dict[str, BreakpointSet] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> BreakpointSet:
+        path = os.path.abspath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            breakpoint_set = self._breakpoint_sets.get(path)
+
+            if breakpoint_set is None:
+                breakpoint_set = BreakpointSet.from_file(path)
+                self._breakpoint_sets[path] = breakpoint_set
+            elif breakpoint_set.mtime_ns != mtime_ns:
+                breakpoint_set.reload()
+
+            return breakpoint_set
+
+    def refresh(self):
+        """Reloads every registered file that changed since it was compiled."""
+        for path in list(self._breakpoint_sets.keys()):
+            self.get(path)
+
+    def clear(self):
+        with self._lock:
+            self._breakpoint_sets.clear()
+
+    def __len__(self) -> int:
+        return len(self._breakpoint_sets)
+
+
+def round_like_python(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    np.round scales by 10**ndigits before rounding, which can tip values that are
+    (almost) exactly halfway to the other side. Those few values are rounded with
+    the built-in round so the result matches the scalar path bit for bit.
+    """
+    rounded = np.round(values, ndigits)
+
+    with np.errstate(invalid="ignore"):
+        scaled = values * 10.0**ndigits
+        halfway = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+
+    if halfway.any():
+        rounded[halfway] = [round(value, ndigits) for value in values[halfway].tolist()]
+
+    return rounded
+
+
+def _bound(value: Optional[float]) -> float:
+    return np.inf if value is None else value
+
+
+# Shared by all AQICalculator instances of a process
+breakpoint_registry = BreakpointRegistry()
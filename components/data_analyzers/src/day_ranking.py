@@ -0,0 +1,542 @@
+from components.data_analyzers.src.sport_profiles import SportProfile
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from datetime import date, datetime, timezone
+import numbers
+import numpy as np
+
+"""
+Columnar ranking of forecast days without pandas. The output is identical to the
+DataFrame pipeline of WeatherAQIAnalyzer: same rows, same order, same keys and
+the same Python types for every value.
+"""
+
+# Ranking order of the days, as (column, ascending)
+RANKING_COLUMNS = [
+    ("category", True),
+    ("precipitation_hours", True),
+    ("temperature_2m_max", False),
+    ("sunshine_duration", False),
+]
+
+_INTEGER = "integer"
+_FLOAT = "float"
+_OBJECT = "object"
+
+
+class DayTable:
+    """
+    Forecast days of one or many locations, joined from the categorized daily AQI
+    and the weather forecast by date. Every row belongs to one location, rows of a
+    location keep the order the DataFrame merge would produce.
+    """
+
+    def __init__(self):
+        self.locations: List[int] = []
+        self.dates: List[date] = []
+        self.aqi: List[Any] = []
+        self.categories: List[Any] = []
+        self.weather_rows: List[Optional[dict]] = []
+        self.weather_columns: Dict[str, None] = {}
+
+        # Output columns and their value kinds per location
+        self.location_columns: List[List[Tuple[str, str]]] = []
+        # Rows of a location are contiguous, location i spans offsets i to i + 1
+        self.location_offsets: List[int] = [0]
+        # Rows of every date per location
+        self.location_rows: List[Dict[date, List[int]]] = []
+
+        # Numeric columns, built on first use
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def add_location(
+        self,
+        aqi_categorized: List[dict],
+        weather_forecast: Union[List[dict], "WeatherDays"],
+        today: date,
+    ) -> int:
+        """
+        Joins the days of one location and appends those from today onwards.
+
+        :weather_forecast: The weather forecast, or the WeatherDays of a forecast
+        that was already grouped by date.
+        :return: The index of the location in the table.
+        """
+        location = len(self.location_columns)
+
+        if isinstance(weather_forecast, WeatherDays):
+            weather_days = weather_forecast
+        else:
+            weather_days = WeatherDays(weather_forecast)
+
+        unmatched = False
+        merged = []
+
+        for day in aqi_categorized:
+            matches = weather_days.by_date.get(day["date"])
+
+            if matches is None:
+                unmatched = True
+                merged.append((day, None))
+            else:
+                merged.extend((day, weather) for weather in matches)
+
+        columns = [
+            ("aqi", _column_kind([day["aqi"] for day in aqi_categorized])),
+            ("category", _column_kind([day["category"] for day in aqi_categorized])),
+        ]
+
+        for column, (kind, kind_with_missing) in weather_days.columns.items():
+            # A day without weather turns the column into floats with NaN
+            columns.append((column, kind_with_missing if unmatched else kind))
+
+        self.location_columns.append(columns)
+        self.weather_columns.update(dict.fromkeys(weather_days.columns))
+        self._columns.clear()
+
+        rows: Dict[date, List[int]] = {}
+
+        for day, weather in merged:
+            if day["date"] < today:
+                continue
+
+            rows.setdefault(day["date"], []).append(len(self.dates))
+
+            self.locations.append(location)
+            self.dates.append(day["date"])
+            self.aqi.append(day["aqi"])
+            self.categories.append(day["category"])
+            self.weather_rows.append(weather)
+
+        self.location_offsets.append(len(self.dates))
+        self.location_rows.append(rows)
+
+        return location
+
+    def update_days(self, location: int, days: List[dict], aqi_categorized: List[dict]):
+        """
+        Replaces the AQI and category of days of a location in place. The dates
+        of the location and their order must not have changed, otherwise the
+        location has to be added again.
+
+        :days: The categorized days whose AQI changed
+        :aqi_categorized: All categorized days of the location
+        """
+        rows = self.location_rows[location]
+        updated = []
+
+        for day in days:
+            for row in rows.get(day["date"], ()):
+                self.aqi[row] = day["aqi"]
+                self.categories[row] = day["category"]
+                updated.append(row)
+
+        kinds = {
+            "aqi": _column_kind([day["aqi"] for day in aqi_categorized]),
+            "category": _column_kind([day["category"] for day in aqi_categorized]),
+        }
+        self.location_columns[location] = [
+            (column, kinds.get(column, kind))
+            for column, kind in self.location_columns[location]
+        ]
+
+        self._update_columns(updated, ["aqi", "category"])
+
+    def update_weather(
+        self, location: int, weather_days: "WeatherDays", dates: List[date]
+    ):
+        """
+        Replaces the weather of dates of a location in place. Every date must
+        have as many forecasts with the same column kinds as before, otherwise
+        the location has to be added again.
+        """
+        rows = self.location_rows[location]
+        updated = []
+
+        for day in dates:
+            for row, weather in zip(rows.get(day, ()), weather_days.by_date[day]):
+                self.weather_rows[row] = weather
+                updated.append(row)
+
+        self._update_columns(updated, list(weather_days.columns))
+
+    def _update_columns(self, rows: List[int], names: List[str]):
+        # Numeric columns that were built already only get the rows updated
+        for name in names:
+            if name in self._columns and rows:
+                self._columns[name][rows] = self._build_column(name, rows)
+
+    def column(self, name: str) -> np.ndarray:
+        """Numeric column as float64, missing values are NaN."""
+        if name not in self._columns:
+            self._columns[name] = self._build_column(name)
+
+        return self._columns[name]
+
+    def _build_column(self, name: str, rows: Optional[List[int]] = None) -> np.ndarray:
+        if rows is None:
+            rows = range(len(self))
+
+        if name == "aqi":
+            values = [self.aqi[row] for row in rows]
+        elif name == "category":
+            values = [self.categories[row] for row in rows]
+        else:
+            if name not in self.weather_columns:
+                raise KeyError(name)
+
+            values = [
+                None if weather is None else weather.get(name)
+                for weather in (self.weather_rows[row] for row in rows)
+            ]
+
+        return np.array(
+            [np.nan if value is None else value for value in values], dtype=np.float64
+        )
+
+    def score(self, profile: SportProfile) -> Tuple[np.ndarray, np.ndarray]:
+        """:return: (scores, suitable) of every row under a sport profile."""
+        columns = {}
+        absent = {}
+
+        locations = np.array(self.locations, dtype=np.intp)
+
+        for name in profile.columns:
+            if name in ("aqi", "category"):
+                columns[name] = self.column(name)
+            elif name in self.weather_columns:
+                columns[name] = self.column(name)
+
+                # Locations whose forecast has no such column at all
+                has_column = np.array(
+                    [
+                        any(column == name for column, _ in location_columns)
+                        for location_columns in self.location_columns
+                    ],
+                    dtype=bool,
+                )
+                absent[name] = ~has_column[locations]
+
+        return profile.score(columns, len(self), absent)
+
+    def rank(
+        self,
+        top_k: Optional[int] = None,
+        scores: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> np.ndarray:
+        """
+        :return: Row indices ordered by location and then by RANKING_COLUMNS.
+        Missing values are ranked last and ties keep the merge order, like a
+        DataFrame.sort_values over the same columns.
+
+        :top_k: Only return the k best rows of every location. They are found by
+        partial selection instead of sorting all rows.
+        :scores: (scores, suitable) of a sport profile. Suitable rows are ranked
+        first, then by descending score instead of RANKING_COLUMNS.
+        """
+        keys = self._keys(scores)
+
+        if top_k is None:
+            return np.lexsort(keys)
+
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1.")
+
+        # The location is the last key, within a location it is constant
+        keys = keys[:-1]
+        order = []
+
+        for start, end in zip(self.location_offsets, self.location_offsets[1:]):
+            location_keys = [key[start:end] for key in keys]
+            order.append(select_top_k(location_keys, top_k) + start)
+
+        if not order:
+            return np.array([], dtype=np.intp)
+
+        return np.concatenate(order)
+
+    def row_keys(
+        self, scores: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> List[tuple]:
+        """
+        :return: The ranking key of every row as a tuple, most significant value
+        first. Smaller keys rank first, and keys of different locations compare
+        like keys of the same location.
+        """
+        # The location is the most significant key of np.lexsort
+        keys = self._keys(scores)[:-1]
+
+        return list(zip(*[key.tolist() for key in reversed(keys)]))
+
+    def _keys(
+        self, scores: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> List[np.ndarray]:
+        if scores is None:
+            return self._ranking_keys()
+
+        return self._score_keys(*scores)
+
+    def _ranking_keys(self) -> List[np.ndarray]:
+        keys = ranking_keys({name: self.column(name) for name, _ in RANKING_COLUMNS})
+        keys.append(np.array(self.locations, dtype=np.int64))
+
+        return keys
+
+    def _score_keys(self, scores: np.ndarray, suitable: np.ndarray) -> List[np.ndarray]:
+        keys = score_keys(scores, suitable)
+        keys.append(np.array(self.locations, dtype=np.int64))
+
+        return keys
+
+    def to_records(
+        self,
+        order: Optional[np.ndarray] = None,
+        scores: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> List[List[dict]]:
+        """
+        :return: One list of day records per location, in the given row order.
+        With the scores of a sport profile, each record has its score and whether
+        the day is suitable.
+        """
+        if order is None:
+            order = range(len(self))
+
+        records: List[List[dict]] = [[] for _ in self.location_columns]
+
+        for row in order:
+            location = self.locations[row]
+            weather = self.weather_rows[row]
+
+            record = {"date": self.dates[row].strftime("%Y-%m-%d")}
+
+            for column, kind in self.location_columns[location]:
+                if column == "aqi":
+                    value = self.aqi[row]
+                elif column == "category":
+                    value = self.categories[row]
+                else:
+                    value = None if weather is None else weather.get(column)
+
+                record[column] = _encode(value, kind)
+
+            if scores is not None:
+                record["score"] = _encode(scores[0][row], _FLOAT)
+                record["suitable"] = bool(scores[1][row])
+
+            records[location].append(record)
+
+        return records
+
+
+class WeatherDays:
+    """
+    Weather forecast of one location grouped by UTC date, with the kinds of its
+    columns. Kept per location, so the forecast is only grouped when it changes.
+    """
+
+    def __init__(self, weather_forecast: List[dict]):
+        self.by_date: Dict[date, List[dict]] = {}
+
+        for weather in weather_forecast:
+            self.by_date.setdefault(weather_date(weather["date"]), []).append(weather)
+
+        # Column -> (kind, kind if some days have no weather)
+        self.columns: Dict[str, Tuple[str, str]] = {}
+
+        names = dict.fromkeys(
+            column
+            for weather in weather_forecast
+            for column in weather
+            if column != "date"
+        )
+
+        for column in names:
+            values = [weather.get(column) for weather in weather_forecast]
+            self.columns[column] = (
+                _column_kind(values),
+                _column_kind(values, has_missing=True),
+            )
+
+
+def rank_days(
+    aqi_categorized: List[dict],
+    weather_forecast: List[dict],
+    today: date,
+    top_k: Optional[int] = None,
+    profile: Optional[SportProfile] = None,
+) -> List[dict]:
+    """Ranks the days of a single location."""
+    day_table = DayTable()
+    day_table.add_location(aqi_categorized, weather_forecast, today)
+
+    return rank_day_table(day_table, top_k, profile)[0]
+
+
+def rank_days_many(
+    forecasts: Sequence[Tuple[List[dict], List[dict]]],
+    today: date,
+    top_k: Optional[int] = None,
+    profile: Optional[SportProfile] = None,
+) -> List[List[dict]]:
+    """
+    Ranks the days of many locations with one group-wise sort over all of them.
+
+    :forecasts: (aqi_categorized, weather_forecast) per location
+    """
+    day_table = DayTable()
+
+    for aqi_categorized, weather_forecast in forecasts:
+        day_table.add_location(aqi_categorized, weather_forecast, today)
+
+    return rank_day_table(day_table, top_k, profile)
+
+
+def rank_day_table(
+    day_table: DayTable,
+    top_k: Optional[int] = None,
+    profile: Optional[SportProfile] = None,
+) -> List[List[dict]]:
+    """:return: The ranked day records of every location of a day table."""
+    scores = None if profile is None else day_table.score(profile)
+
+    return day_table.to_records(day_table.rank(top_k, scores), scores)
+
+
+def ranking_keys(columns: Dict[str, np.ndarray]) -> List[np.ndarray]:
+    """
+    :return: np.lexsort keys of the days by RANKING_COLUMNS, missing values last.
+    :columns: The RANKING_COLUMNS as float64, missing values are NaN
+    """
+    keys = []
+
+    # np.lexsort sorts by the last key first
+    for name, ascending in reversed(RANKING_COLUMNS):
+        values = columns[name]
+        missing = np.isnan(values)
+
+        keys.append(np.where(missing, 0.0, values if ascending else -values))
+        keys.append(missing)
+
+    return keys
+
+
+def score_keys(scores: np.ndarray, suitable: np.ndarray) -> List[np.ndarray]:
+    """:return: np.lexsort keys of the days by suitability and descending score."""
+    missing = np.isnan(scores)
+
+    return [np.where(missing, 0.0, -scores), missing, ~suitable]
+
+
+def select_top_k(keys: List[np.ndarray], top_k: int) -> np.ndarray:
+    """
+    :return: The indices of the top_k smallest rows, in the order of
+    np.lexsort(keys) and with ties kept in row order.
+
+    Instead of sorting all rows, every key from the most significant one on
+    splits the rows that are still tied by the value of the k-th of them with
+    np.partition. Rows below it are selected, rows above it are dropped and only
+    the rows equal to it are split by the next key. Just the selected rows are
+    sorted.
+    """
+    size = len(keys[0]) if keys else 0
+
+    if top_k >= size:
+        return np.lexsort(keys) if keys else np.arange(size, dtype=np.intp)
+
+    selected = []
+    candidates = np.arange(size, dtype=np.intp)
+    remaining = top_k
+
+    for key in reversed(keys):
+        values = key[candidates]
+        threshold = np.partition(values, remaining - 1)[remaining - 1]
+
+        below = values < threshold
+        selected.append(candidates[below])
+        remaining -= int(np.count_nonzero(below))
+
+        candidates = candidates[values == threshold]
+
+        if len(candidates) == remaining:
+            break
+
+    # Rows equal in every key keep their order
+    selected.append(candidates[:remaining])
+
+    rows = np.concatenate(selected)
+
+    return rows[np.lexsort([key[rows] for key in keys])]
+
+
+def best_possible_key(
+    aqi_categorized: List[dict], profile: Optional[SportProfile] = None
+) -> Optional[tuple]:
+    """
+    :return: A key that is not larger than the row key of any day of a location
+    whose weather is not known yet, or None without any categorized day. Only
+    the AQI and category of the days are used, the weather is assumed to be as
+    good as possible.
+    """
+    if not aqi_categorized:
+        return None
+
+    categories = np.array([day["category"] for day in aqi_categorized], dtype=float)
+
+    if profile is None:
+        # No precipitation, infinitely warm and sunny
+        return (False, categories.min(), False, 0.0, False, -np.inf, False, -np.inf)
+
+    aqi = np.array([day["aqi"] for day in aqi_categorized], dtype=np.float64)
+    best_scores = profile.best_possible_score(
+        {"aqi": aqi, "category": categories}, len(aqi_categorized)
+    )
+
+    return (False, False, -best_scores.max())
+
+
+def weather_date(value) -> date:
+    """UTC date of a weather forecast timestamp (datetime or ISO 8601 string)."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+
+    return value.date()
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _is_integer(value) -> bool:
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+
+def _column_kind(values: list, has_missing: bool = False) -> str:
+    # Mirrors the dtype pandas infers for a column of these values
+    present = [value for value in values if value is not None]
+
+    if len(present) < len(values):
+        has_missing = True
+
+    if all(_is_integer(value) for value in present) and not has_missing:
+        return _INTEGER
+    if all(_is_number(value) for value in present):
+        return _FLOAT
+
+    return _OBJECT
+
+
+def _encode(value, kind: str):
+    # NaN is the only value that is not equal to itself
+    if value is None or (_is_number(value) and value != value):
+        return None
+    if kind == _INTEGER:
+        return int(value)
+    if kind == _FLOAT:
+        return float(value)
+
+    return value
@@ -0,0 +1,213 @@
+from components.data_collectors.src.weather_data_collector import WeatherDataCollector
+from components.data_collectors.src.air_quality_data_collector import (
+    AirQualityDataCollector,
+)
+from components.data_analyzers.src.day_ranking import DayTable, best_possible_key
+from components.data_analyzers.src.sport_profiles import SportProfile
+from typing import List, Optional, Sequence, Tuple, TypedDict
+from bisect import insort
+from datetime import date
+import asyncio
+from loguru import logger
+
+
+class LocationSearchStats(TypedDict):
+    candidates: int
+    unavailable: int
+    ranked: int
+    pruned: int
+
+
+class LocationSearch:
+    """
+    Finds the best (location, day) pairs among candidate coordinates.
+
+    The air quality forecasts of all candidates are fetched first, as the AQI
+    category is the most significant part of a day's ranking. Each candidate
+    then gets the best key any of its days could reach with perfect weather.
+    Candidates are visited from the best such bound on, and a candidate whose
+    bound cannot beat the current k-th result is pruned without fetching its
+    weather forecast or ranking its days.
+    """
+
+    def __init__(
+        self,
+        analyzer,
+        weather_collector: Optional[WeatherDataCollector] = None,
+        air_quality_collector: Optional[AirQualityDataCollector] = None,
+        max_concurrency: int = 8,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        if weather_collector is None:
+            weather_collector = WeatherDataCollector()
+
+        if air_quality_collector is None:
+            air_quality_collector = AirQualityDataCollector()
+
+        self._analyzer = analyzer
+        self._weather_collector = weather_collector
+        self._air_quality_collector = air_quality_collector
+        self._max_concurrency = max_concurrency
+
+        self.stats: LocationSearchStats = {
+            "candidates": 0,
+            "unavailable": 0,
+            "ranked": 0,
+            "pruned": 0,
+        }
+
+    async def search(
+        self,
+        candidates: Sequence[Tuple[float, float]],
+        top_k: int = 5,
+        profile: Optional[SportProfile] = None,
+    ) -> List[dict]:
+        """
+        :return: The top_k best days over all candidates, best first. Each record
+        is a ranked day with the latitude and longitude of its candidate.
+
+        :candidates: (latitude, longitude) pairs
+        """
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1.")
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        today = self._analyzer._get_today()
+
+        self.stats = {
+            "candidates": len(candidates),
+            "unavailable": 0,
+            "ranked": 0,
+            "pruned": 0,
+        }
+
+        air_quality_forecasts = await asyncio.gather(
+            *[
+                self._fetch_air_quality(semaphore, latitude, longitude)
+                for latitude, longitude in candidates
+            ]
+        )
+
+        # (bound, candidate, upcoming categorized days) of every candidate
+        bounded = []
+
+        for candidate, air_quality_forecast in enumerate(air_quality_forecasts):
+            if air_quality_forecast is None:
+                self.stats["unavailable"] += 1
+                continue
+
+            aqi_categorized = self._analyzer._categorize_daily_aqi(
+                self._analyzer._calculate_daily_aqi(air_quality_forecast)
+            )
+            upcoming = [day for day in aqi_categorized if day["date"] >= today]
+            bound = best_possible_key(upcoming, profile)
+
+            if bound is None:
+                self.stats["unavailable"] += 1
+                continue
+
+            bounded.append((bound, candidate, aqi_categorized))
+
+        bounded.sort(key=lambda entry: entry[:2])
+
+        # (key, candidate, row, record) of the best days so far, best first
+        results = []
+        position = 0
+
+        while position < len(bounded):
+            batch = []
+
+            while position < len(bounded) and len(batch) < self._max_concurrency:
+                bound, candidate, aqi_categorized = bounded[position]
+                position += 1
+
+                # Ties go to the lower candidate index, so a candidate is pruned
+                # when even its bound ranks after the current k-th result
+                if len(results) == top_k and (bound, candidate) > results[-1][:2]:
+                    self.stats["pruned"] += 1
+                    continue
+
+                batch.append((candidate, aqi_categorized))
+
+            weather_forecasts = await asyncio.gather(
+                *[
+                    self._fetch_weather(semaphore, *candidates[candidate])
+                    for candidate, _ in batch
+                ]
+            )
+
+            for (candidate, aqi_categorized), weather_forecast in zip(
+                batch, weather_forecasts
+            ):
+                if weather_forecast is None:
+                    self.stats["unavailable"] += 1
+                    continue
+
+                self.stats["ranked"] += 1
+
+                for entry in self._rank(
+                    candidate, aqi_categorized, weather_forecast, today, profile
+                ):
+                    if len(results) < top_k or entry[:3] < results[-1][:3]:
+                        insort(results, entry, key=lambda result: result[:3])
+                        del results[top_k:]
+
+        logger.debug(f"Location search: {self.stats}")
+
+        return [
+            {
+                "latitude": candidates[candidate][0],
+                "longitude": candidates[candidate][1],
+                **record,
+            }
+            for _, candidate, _, record in results
+        ]
+
+    def _rank(
+        self,
+        candidate: int,
+        aqi_categorized: List[dict],
+        weather_forecast: List[dict],
+        today: date,
+        profile: Optional[SportProfile],
+    ) -> List[tuple]:
+        day_table = DayTable()
+        day_table.add_location(aqi_categorized, weather_forecast, today)
+
+        scores = None if profile is None else day_table.score(profile)
+        row_keys = day_table.row_keys(scores)
+        records = day_table.to_records(range(len(day_table)), scores)[0]
+
+        return [
+            (row_key, candidate, row, record)
+            for row, (row_key, record) in enumerate(zip(row_keys, records))
+        ]
+
+    async def _fetch_air_quality(
+        self, semaphore: asyncio.Semaphore, latitude: float, longitude: float
+    ):
+        async with semaphore:
+            try:
+                return await self._air_quality_collector.get_air_quality_data_by_coords(
+                    latitude, longitude
+                )
+            except Exception as e:
+                logger.warning(
+                    f"No air quality forecast for {latitude}, {longitude}: {e}"
+                )
+                return None
+
+    async def _fetch_weather(
+        self, semaphore: asyncio.Semaphore, latitude: float, longitude: float
+    ):
+        async with semaphore:
+            try:
+                # The Open-Meteo client is blocking
+                return await asyncio.to_thread(
+                    self._weather_collector.get_weather_data, latitude, longitude
+                )
+            except Exception as e:
+                logger.warning(f"No weather forecast for {latitude}, {longitude}: {e}")
+                return None
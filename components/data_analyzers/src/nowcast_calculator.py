@@ -0,0 +1,189 @@
+from components.data_analyzers.src.aqi_calculator import AQICalculator
+from typing import Dict, List, Optional, TypedDict
+from datetime import datetime
+import math
+
+
+class NowCast(TypedDict):
+    pm25: Optional[float]
+    pm10: Optional[float]
+    aqi: Optional[float]
+
+
+class NowCastWindow:
+    """
+    Ring buffer with the hourly concentrations of one pollutant over the last
+    12 hours. Missing hours are kept as None so gaps in the stream are respected.
+    """
+
+    size = 12
+
+    __slots__ = ("_values", "_head", "_latest_hour")
+
+    def __init__(self):
+        self._values: List[Optional[float]] = [None] * self.size
+        self._head = 0  # Slot of the latest hour
+        self._latest_hour: Optional[int] = None
+
+    def advance(self, hour: int) -> bool:
+        """
+        Moves the window forward to end at hour if hour is newer than the latest
+        one. Returns whether hour is part of the window.
+        """
+        if self._latest_hour is None:
+            self._latest_hour = hour
+        elif hour > self._latest_hour:
+            # Hours without an observation in between are cleared. Only the slots
+            # that fall out of the window are touched, never the whole history.
+            skipped_hours = min(hour - self._latest_hour, self.size)
+
+            for _ in range(skipped_hours):
+                self._head = (self._head + 1) % self.size
+                self._values[self._head] = None
+
+            self._latest_hour = hour
+        elif self._latest_hour - hour >= self.size:
+            # Too late to be part of the window
+            return False
+
+        return True
+
+    def add(self, hour: int, concentration: Optional[float]):
+        if not self.advance(hour):
+            return
+
+        slot = (self._head - (self._latest_hour - hour)) % self.size
+        self._values[slot] = concentration
+
+    def nowcast(self) -> Optional[float]:
+        """
+        :return: The NowCast concentration, or None if less than two of the three
+        most recent hours are available.
+
+        Calculations according to US EPA:
+        https://document.airnow.gov/
+        technical-assistance-document-for-the-reporting-of-daily-air-quailty.pdf
+        """
+        recent_hours = 0
+        # Most recent hour first
+        concentrations = []
+
+        for age in range(self.size):
+            concentration = self._values[(self._head - age) % self.size]
+            concentrations.append(concentration)
+
+            if age < 3 and concentration is not None:
+                recent_hours += 1
+
+        if recent_hours < 2:
+            return None
+
+        available = [value for value in concentrations if value is not None]
+        concentration_max = max(available)
+
+        if concentration_max <= 0:
+            return 0.0
+
+        # Weight factor from the scaled rate of change, at least 0.5
+        weight = max(min(available) / concentration_max, 0.5)
+
+        weighted_sum = 0.0
+        weight_sum = 0.0
+        hour_weight = 1.0
+
+        for concentration in concentrations:
+            if concentration is not None:
+                weighted_sum += hour_weight * concentration
+                weight_sum += hour_weight
+            hour_weight *= weight
+
+        return weighted_sum / weight_sum
+
+
+class NowCastCalculator:
+    """
+    Keeps a rolling 12-hour NowCast of PM2.5 and PM10 for every location of a
+    stream of hourly observations. Each new observation updates the ring buffer
+    of its location in constant time, so the NowCast AQI of thousands of
+    locations can be served without recomputing their history.
+    """
+
+    def __init__(self, aqi_calculator: Optional[AQICalculator] = None):
+        if aqi_calculator is None:
+            aqi_calculator = AQICalculator()
+
+        self._aqi_calculator = aqi_calculator
+        self._windows: Dict[str, Dict[str, NowCastWindow]] = {}
+
+    def add_observation(
+        self,
+        location: str,
+        timestamp: datetime,
+        pm25: Optional[float] = None,
+        pm10: Optional[float] = None,
+    ) -> NowCast:
+        """
+        Adds the hourly averages measured at a location and returns its updated
+        NowCast. A concentration of an hour that was already added overwrites
+        it, pollutants that are not passed keep their concentration, so feeds
+        of single pollutants can be merged.
+        """
+        if not isinstance(timestamp, datetime):
+            raise TypeError("Timestamp must be a datetime.")
+
+        hour = math.floor(timestamp.timestamp() / 3600)
+
+        windows = self._windows.get(location)
+
+        if windows is None:
+            windows = {"pm25": NowCastWindow(), "pm10": NowCastWindow()}
+            self._windows[location] = windows
+
+        for pollutant, concentration in [("pm25", pm25), ("pm10", pm10)]:
+            if concentration is None:
+                # The window still moves on, older hours age out of it
+                windows[pollutant].advance(hour)
+            else:
+                windows[pollutant].add(hour, concentration)
+
+        return self.get_nowcast(location)
+
+    def get_nowcast(self, location: str) -> NowCast:
+        windows = self._windows.get(location)
+
+        if windows is None:
+            raise KeyError(f"No observations for location: {location}")
+
+        pm25 = windows["pm25"].nowcast()
+        pm10 = windows["pm10"].nowcast()
+
+        # NowCast concentrations are truncated like reported concentrations. The
+        # rounding guards against 12.3 * 10 ending up as 122.99999999999999.
+        if pm25 is not None:
+            pm25 = math.floor(round(pm25 * 10, 6)) / 10
+        if pm10 is not None:
+            pm10 = math.trunc(pm10)
+
+        aqi = None
+
+        for pollutant, concentration in [("pm25", pm25), ("pm10", pm10)]:
+            if concentration is None:
+                continue
+
+            pollutant_aqi = self._aqi_calculator.calculate_pollutant_aqi(
+                pollutant, concentration
+            )
+
+            if aqi is None or pollutant_aqi > aqi:
+                aqi = pollutant_aqi
+
+        return {"pm25": pm25, "pm10": pm10, "aqi": aqi}
+
+    def get_aqi(self, location: str) -> Optional[float]:
+        return self.get_nowcast(location)["aqi"]
+
+    def get_locations(self) -> List[str]:
+        return list(self._windows.keys())
+
+    def remove_location(self, location: str):
+        self._windows.pop(location, None)
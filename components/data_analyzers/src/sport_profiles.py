@@ -0,0 +1,262 @@
+from typing import Dict, List, Mapping, Optional, Tuple
+import threading
+import json
+import os
+import numpy as np
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+
+SPORT_PROFILES_PATH = os.path.join(_current_dir, "sport_profiles.json")
+
+# WMO weather interpretation codes range from 0 to 99
+_WEATHER_CODES = 100
+
+# Physical range of the columns, to bound the score of days with unknown values
+_COLUMN_RANGES = {
+    "aqi": (0, 500),
+    "category": (1, 6),
+    "temperature_2m_max": (-90, 60),
+    "sunshine_duration": (0, 86400),
+    "precipitation_hours": (0, 24),
+}
+
+
+class SportProfile:
+    """
+    Weighted score and thresholds of one sport over the columns of a day table,
+    compiled into arrays so all days of all locations are scored at once.
+
+    A score term is weight * value / unit, or weight * |value - ideal| / unit
+    if the term has an ideal value. Terms with penalties map WMO weather codes
+    to a penalty first. Days outside of a threshold are not suitable and rank
+    after all suitable days.
+    """
+
+    def __init__(self, name: str, profile: dict):
+        self.name = name
+        self.profile = profile
+
+        scores = profile.get("scores", {})
+        thresholds = profile.get("thresholds", {})
+
+        if not scores:
+            raise ValueError(f"Sport profile {name} has no scores.")
+
+        # Linear terms, one entry per column
+        self._columns: List[str] = []
+        self._weights: List[float] = []
+        self._ideals: List[float] = []
+
+        # Weather code terms, as a penalty per code
+        self._penalties: List[Tuple[str, np.ndarray]] = []
+
+        for column, term in scores.items():
+            weight = term["weight"] / term.get("unit", 1)
+
+            if "penalties" in term:
+                penalties = np.zeros(_WEATHER_CODES, dtype=np.float64)
+
+                for penalty in term["penalties"]:
+                    low, high = penalty["codes"]
+                    penalties[np.arange(low, high + 1)] = penalty["penalty"]
+
+                self._penalties.append((column, weight * penalties))
+            else:
+                self._columns.append(column)
+                self._weights.append(weight)
+                self._ideals.append(term.get("ideal", np.nan))
+
+        self._weight_array = np.array(self._weights, dtype=np.float64)
+        self._ideal_array = np.array(self._ideals, dtype=np.float64)
+        self._has_ideal = ~np.isnan(self._ideal_array)
+
+        # Thresholds as (column, min, max, excluded weather codes)
+        self._thresholds: List[Tuple[str, float, float, Optional[np.ndarray]]] = []
+
+        for column, threshold in thresholds.items():
+            excluded = None
+
+            if "exclude" in threshold:
+                excluded = np.zeros(_WEATHER_CODES, dtype=bool)
+
+                for low, high in threshold["exclude"]:
+                    excluded[np.arange(low, high + 1)] = True
+
+            self._thresholds.append(
+                (
+                    column,
+                    threshold.get("min", -np.inf),
+                    threshold.get("max", np.inf),
+                    excluded,
+                )
+            )
+
+        self.columns = list(
+            dict.fromkeys(
+                self._columns
+                + [column for column, _ in self._penalties]
+                + [column for column, _, _, _ in self._thresholds]
+            )
+        )
+
+    def score(
+        self,
+        columns: Mapping[str, np.ndarray],
+        size: int,
+        absent: Optional[Mapping[str, np.ndarray]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: (scores, suitable) per row. Higher scores are better, a missing
+        value in a scored column makes the score NaN.
+
+        :columns: float64 column arrays of length size. Columns the profile uses
+        but the mapping lacks are left out of the score.
+        :absent: Rows per column whose location has no such column at all. They
+        are left out like a missing column instead of scoring NaN.
+        """
+        if absent is None:
+            absent = {}
+
+        scores = np.zeros(size, dtype=np.float64)
+        suitable = np.ones(size, dtype=bool)
+
+        linear_terms = [
+            index for index, column in enumerate(self._columns) if column in columns
+        ]
+
+        if linear_terms:
+            values = np.column_stack(
+                [columns[self._columns[index]] for index in linear_terms]
+            )
+            ideals = self._ideal_array[linear_terms]
+
+            terms = (
+                np.where(self._has_ideal[linear_terms], np.abs(values - ideals), values)
+                * self._weight_array[linear_terms]
+            )
+
+            for position, index in enumerate(linear_terms):
+                column_absent = absent.get(self._columns[index])
+
+                if column_absent is not None:
+                    terms[:, position] = np.where(
+                        column_absent, 0.0, terms[:, position]
+                    )
+
+            scores += terms.sum(axis=1)
+
+        for column, penalties in self._penalties:
+            if column not in columns:
+                continue
+
+            codes, known = _weather_codes(columns[column])
+            terms = np.where(known, penalties[codes], 0.0)
+            terms = np.where(np.isnan(columns[column]), np.nan, terms)
+
+            if column in absent:
+                terms = np.where(absent[column], 0.0, terms)
+
+            scores += terms
+
+        for column, low, high, excluded in self._thresholds:
+            if column not in columns:
+                continue
+
+            values = columns[column]
+
+            # Missing values never violate a threshold
+            suitable &= ~((values < low) | (values > high))
+
+            if excluded is not None:
+                codes, known = _weather_codes(values)
+                suitable &= ~(known & excluded[codes])
+
+        return scores, suitable
+
+    def best_possible_score(
+        self, columns: Mapping[str, np.ndarray], size: int
+    ) -> np.ndarray:
+        """
+        :return: An upper bound of the score of every row, for rows of which only
+        some columns are known. Every other column is assumed to take its best
+        value, or to be absent from the forecast.
+        """
+        scores, _ = self.score(columns, size)
+
+        for index, column in enumerate(self._columns):
+            if column not in columns:
+                scores += self._best_linear_term(index)
+
+        for column, penalties in self._penalties:
+            if column not in columns:
+                # Codes without a penalty score 0
+                scores += max(penalties.max(), 0.0)
+
+        return scores
+
+    def _best_linear_term(self, index: int) -> float:
+        column = self._columns[index]
+        weight = self._weights[index]
+        ideal = self._ideals[index]
+
+        if column not in _COLUMN_RANGES:
+            return np.inf
+
+        low, high = _COLUMN_RANGES[column]
+
+        if np.isnan(ideal):
+            best = max(weight * low, weight * high)
+        elif weight < 0 and low <= ideal <= high:
+            best = 0.0
+        else:
+            best = max(weight * abs(low - ideal), weight * abs(high - ideal))
+
+        # A column that is absent from the forecast scores 0
+        return max(best, 0.0)
+
+
+def _weather_codes(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Codes outside of the WMO table are neither penalized nor excluded
+    known = (values >= 0) & (values < _WEATHER_CODES) & (values == np.floor(values))
+
+    return np.where(known, values, 0).astype(np.intp), known
+
+
+_sport_profiles: Dict[str, Tuple[int, Dict[str, SportProfile]]] = {}
+_sport_profiles_lock = threading.Lock()
+
+
+def get_sport_profiles(path: Optional[str] = None) -> Dict[str, SportProfile]:
+    """
+    Returns the compiled profiles of a profile file. Each file is compiled once
+    per process and again only after its modification time changes.
+    """
+    path = os.path.abspath(path or SPORT_PROFILES_PATH)
+    mtime_ns = os.stat(path).st_mtime_ns
+
+    with _sport_profiles_lock:
+        cached = _sport_profiles.get(path)
+
+        if cached is None or cached[0] != mtime_ns:
+            with open(path, "r") as file:
+                profiles = json.load(file)
+
+            cached = (
+                mtime_ns,
+                {
+                    name: SportProfile(name, profile)
+                    for name, profile in profiles.items()
+                },
+            )
+            _sport_profiles[path] = cached
+
+        return cached[1]
+
+
+def get_sport_profile(sport: str, path: Optional[str] = None) -> SportProfile:
+    profiles = get_sport_profiles(path)
+
+    if sport not in profiles:
+        raise ValueError(f"Unknown sport: {sport}. Use one of {tuple(profiles)}.")
+
+    return profiles[sport]
@@ -0,0 +1,188 @@
+from components.data_analyzers.src.aqi_calculator import AQICalculator
+from typing import Callable, List, Sequence
+from datetime import date, datetime, timedelta
+import numpy as np
+
+"""
+Best contiguous N-hour window per day from hourly forecasts. All hours of all
+locations are concatenated into flat arrays, window sums come from one prefix
+sum per variable and the best window of every day is a grouped minimum over
+the day boundaries, so the search is O(n) in the number of hours regardless of
+the window length and the number of locations.
+"""
+
+# Window sums from prefix sums carry rounding noise, which must not break ties
+_SUM_DECIMALS = 6
+
+
+def best_time_windows(
+    hourly_forecasts: Sequence[List[dict]],
+    window_hours: int,
+    today: date,
+    aqi_calculator: AQICalculator,
+    categorize: Callable[[np.ndarray], list],
+) -> List[List[dict]]:
+    """
+    :return: Per location, the best window of every day from today onwards, in
+    date order. Days with fewer contiguous hours than the window are left out.
+
+    :hourly_forecasts: Hourly records per location with a date in local time,
+    temperature_2m, precipitation and, if available, pm2_5 and pm10.
+    :categorize: Maps AQIs to their category levels, "" if there is none.
+
+    Windows are ranked like days: by the category of their mean AQI, then by
+    total precipitation, then by mean temperature (higher first). Ties go to
+    the earliest window.
+    """
+    if window_hours < 1 or window_hours > 24:
+        raise ValueError("window_hours must be between 1 and 24.")
+
+    locations = []
+    dates = []
+    hours = []
+    columns = {"temperature_2m": [], "precipitation": [], "pm2_5": [], "pm10": []}
+
+    for location, hourly_forecast in enumerate(hourly_forecasts):
+        for record in hourly_forecast:
+            timestamp = record["date"]
+
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+
+            locations.append(location)
+            dates.append(timestamp)
+            hours.append(int(timestamp.timestamp() // 3600))
+
+            for column, values in columns.items():
+                value = record.get(column)
+                values.append(np.nan if value is None else value)
+
+    records: List[List[dict]] = [[] for _ in hourly_forecasts]
+
+    if len(dates) < window_hours:
+        return records
+
+    days = np.array([timestamp.toordinal() for timestamp in dates], dtype=np.int64)
+    hours = np.array(hours, dtype=np.int64)
+    locations = np.array(locations, dtype=np.int64)
+
+    # One group per location and local day
+    group_starts = np.ones(len(days), dtype=bool)
+    group_starts[1:] = (locations[1:] != locations[:-1]) | (days[1:] != days[:-1])
+    groups = np.cumsum(group_starts)
+
+    aqi = aqi_calculator.calculate_many(
+        pm25=np.array(columns["pm2_5"], dtype=np.float64),
+        pm10=np.array(columns["pm10"], dtype=np.float64),
+    )
+
+    # Windows are indexed by their first hour
+    aqi_mean = _window_sum(aqi, window_hours) / window_hours
+    precipitation = _window_sum(
+        np.array(columns["precipitation"], dtype=np.float64), window_hours
+    )
+    temperature_mean = (
+        _window_sum(np.array(columns["temperature_2m"], dtype=np.float64), window_hours)
+        / window_hours
+    )
+
+    first = np.arange(len(aqi_mean))
+    last = first + window_hours - 1
+
+    valid = (
+        (groups[first] == groups[last])
+        & (hours[last] - hours[first] == window_hours - 1)
+        & (days[first] >= today.toordinal())
+    )
+
+    # The AQI is reported as an integer, the category bounds are integers too
+    categories = categorize(np.round(aqi_mean))
+    category_levels = np.array(
+        [np.nan if category == "" else category for category in categories],
+        dtype=np.float64,
+    )
+
+    keys = []
+
+    # Most significant first, missing values rank last
+    for values, ascending in [
+        (category_levels, True),
+        (precipitation, True),
+        (temperature_mean, False),
+    ]:
+        missing = np.isnan(values)
+
+        keys.append(missing.astype(np.float64))
+        keys.append(np.where(missing, 0.0, values if ascending else -values))
+
+    best = _best_per_group(np.flatnonzero(valid), groups, keys)
+
+    for window in best.tolist():
+        start = dates[window]
+
+        records[locations[window]].append(
+            {
+                "date": start.date().strftime("%Y-%m-%d"),
+                "start": start.isoformat(),
+                "end": (start + timedelta(hours=window_hours)).isoformat(),
+                "aqi": _round(aqi_mean[window]),
+                "category": categories[window],
+                "temperature_2m": _round(temperature_mean[window]),
+                "precipitation": _round(precipitation[window]),
+            }
+        )
+
+    return records
+
+
+def _best_per_group(
+    candidates: np.ndarray, groups: np.ndarray, keys: List[np.ndarray]
+) -> np.ndarray:
+    """
+    :return: The smallest candidate of every group by keys, most significant key
+    first, ties go to the earliest candidate. Candidates are in ascending order,
+    so the candidates of a group are contiguous.
+
+    Every key keeps only the candidates equal to the minimum of their group,
+    found with one np.minimum.reduceat over the group boundaries. That is O(n)
+    per key instead of sorting all windows.
+    """
+    for key in keys:
+        if len(candidates) == 0:
+            break
+
+        starts = _group_starts(groups[candidates])
+        values = key[candidates]
+
+        minimums = np.minimum.reduceat(values, starts)
+        counts = np.diff(np.append(starts, len(candidates)))
+
+        candidates = candidates[values == np.repeat(minimums, counts)]
+
+    return candidates[_group_starts(groups[candidates])]
+
+
+def _group_starts(groups: np.ndarray) -> np.ndarray:
+    starts = np.ones(len(groups), dtype=bool)
+    starts[1:] = groups[1:] != groups[:-1]
+
+    return np.flatnonzero(starts)
+
+
+def _window_sum(values: np.ndarray, window_hours: int) -> np.ndarray:
+    """Sums of every window_hours consecutive values, NaN if one is missing."""
+    missing = np.isnan(values)
+
+    sums = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, values))))
+    missing_counts = np.concatenate(([0], np.cumsum(missing)))
+
+    window_sums = np.round(sums[window_hours:] - sums[:-window_hours], _SUM_DECIMALS)
+    has_missing = missing_counts[window_hours:] - missing_counts[:-window_hours] > 0
+
+    return np.where(has_missing, np.nan, window_sums)
+
+
+def _round(value: float):
+    value = float(value)
+
+    return None if value != value else round(value, 2)
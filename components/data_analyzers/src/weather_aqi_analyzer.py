@@ -1,9 +1,34 @@
-from components.data_collectors.src.weather_data_collector import WeatherForecast
-from components.data_collectors.src.air_quality_data_collector import AirQualityData
+from components.data_collectors.src.weather_data_collector import (
+    HourlyWeather,
+    WeatherDataCollector,
+    WeatherForecast,
+)
+from components.data_collectors.src.air_quality_data_collector import (
+    AirQualityData,
+    AirQualityDataCollector,
+)
 from components.data_analyzers.src.aqi_calculator import AQICalculator
-from typing import List, Dict, Optional
+from components.data_analyzers.src.day_ranking import (
+    DayTable,
+    WeatherDays,
+    rank_day_table,
+    rank_days,
+    rank_days_many,
+    ranking_keys,
+    score_keys,
+    select_top_k,
+)
+from components.data_analyzers.src.analyzer_result_cache import AnalyzerResultCache
+from components.data_analyzers.src.time_windows import best_time_windows
+from components.data_analyzers.src.location_search import LocationSearch
+from components.data_analyzers.src.sport_profiles import (
+    SportProfile,
+    get_sport_profile,
+)
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import pandas as pd
+import numpy as np
 import json
 import os
 from loguru import logger
@@ -17,18 +42,56 @@ class WeatherAQIAnalyzer:
     with open(_aqi_categories_path, "r") as file:
         aqi_categories = json.load(file)
 
+    _aqi_calculator = AQICalculator()
+
+    # Ranking engines, both produce identical results
+    engines = ("pandas", "numpy")
+
+    # AQI categories as arrays for vectorized categorization
+    _category_levels = [category["level"] for category in aqi_categories.values()]
+    _category_lower_bounds = np.array(
+        [category["lower_bound"] for category in aqi_categories.values()],
+        dtype=np.float64,
+    )
+    _category_upper_bounds = np.array(
+        [
+            np.inf if category["upper_bound"] is None else category["upper_bound"]
+            for category in aqi_categories.values()
+        ],
+        dtype=np.float64,
+    )
+
     def __init__(
         self,
         weather_forecast: Optional[List[WeatherForecast]] = None,
         air_quality_forecast: Optional[AirQualityData] = None,
+        aqi_calculator: Optional[AQICalculator] = None,
+        result_cache: Optional[AnalyzerResultCache] = None,
+        hourly_forecast: Optional[List[HourlyWeather]] = None,
     ):
+        if aqi_calculator:
+            self._aqi_calculator = aqi_calculator
+
+        if hourly_forecast:
+            self._hourly_forecast = hourly_forecast
+
+        self._result_cache = result_cache
+
+        # Derived state of the locations kept with update_location
+        self._locations: Dict[str, LocationState] = {}
+
         if weather_forecast:
             self._weather_forecast = weather_forecast
 
         if air_quality_forecast:
             self._air_quality_forecast = air_quality_forecast
 
-    def predict_best_outdoor_sports_day(self) -> List[datetime]:
+    def predict_best_outdoor_sports_day(
+        self,
+        engine: str = "pandas",
+        top_k: Optional[int] = None,
+        sport: Optional[str] = None,
+    ) -> List[dict]:
         """
         :return: List[dict] with Dict.keys = [date: datetime.date, aqi: float,
         aqi_category: str,
@@ -51,7 +114,34 @@ class WeatherAQIAnalyzer:
             a) Precipitation hours
             b) Temperature
             c) Sunshine hours
+
+        :engine: "pandas" ranks the days with DataFrames, "numpy" joins and sorts
+        plain arrays, which is faster for the handful of days of a forecast.
+        :top_k: Only return the k best days. None returns the full ranking.
+        :sport: Name of a sport profile in sport_profiles.json, e.g. "running".
+        Days are then ordered by suitability and the weighted score of the
+        profile instead of steps 2 and 3, and each day has a score and a
+        suitable key.
+
+        With a result cache, identical forecasts on the same day return the
+        cached ranking without running the pipeline again.
         """
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be at least 1.")
+        if engine not in self.engines:
+            raise ValueError(f"Unknown engine: {engine}. Use one of {self.engines}.")
+
+        profile = None if sport is None else get_sport_profile(sport)
+
+        cache_key = None
+
+        if self._result_cache is not None:
+            cache_key = self._result_cache_key(engine, top_k, sport)
+            result = self._result_cache.get(cache_key)
+
+            if result is not None:
+                logger.debug("Analysis results taken from the result cache")
+                return result
 
         logger.debug(
             f"Analyzing AQI and weather data for {self._air_quality_forecast['city']}"
@@ -59,30 +149,247 @@ class WeatherAQIAnalyzer:
 
         daily_aqi = self._calculate_daily_aqi(self._air_quality_forecast)
 
-        aqi_ordered = sorted(daily_aqi.items(), key=lambda item: item[1])
+        aqi_categorized = self._categorize_daily_aqi(daily_aqi)
+
+        if engine == "pandas":
+            result = self._rank_days_pandas(aqi_categorized, top_k, profile)
+        else:
+            result = rank_days(
+                aqi_categorized,
+                self._weather_forecast,
+                self._get_today(),
+                top_k,
+                profile,
+            )
 
-        aqi_categorized = []
+        logger.debug(f"Analysis results: {result}")
 
-        for date, aqi in aqi_ordered:
-            category = ""
+        if cache_key is not None:
+            self._result_cache.put(cache_key, result)
 
-            for key in self.aqi_categories:
-                lower_bound = self.aqi_categories[key]["lower_bound"]
-                upper_bound = self.aqi_categories[key]["upper_bound"]
-                if upper_bound is None and aqi >= lower_bound:
-                    category = self.aqi_categories[key]["level"]
-                    break
-                elif lower_bound <= aqi <= upper_bound:
-                    category = self.aqi_categories[key]["level"]
-                    break
+        return result
+
+    def predict_best_outdoor_sports_day_batch(
+        self,
+        forecasts: List[Tuple[List[WeatherForecast], AirQualityData]],
+        top_k: Optional[int] = None,
+        sport: Optional[str] = None,
+    ) -> List[List[dict]]:
+        """
+        :return: One list of ranked days per location, in the order of forecasts.
+        Each list is identical to predict_best_outdoor_sports_day for that location.
 
-            if isinstance(date, str):
-                date = datetime.fromisoformat(date)
+        :forecasts: (weather_forecast, air_quality_forecast) pairs of many locations
+        :top_k: Only return the k best days of every location
+        :sport: Name of a sport profile to rank the days with
 
-            aqi_categorized.append(
-                {"date": date.date(), "aqi": aqi, "category": category}
+        Instead of one DataFrame pipeline per location, the daily AQI of all
+        locations is calculated and categorized in one vectorized pass, and the
+        days of all locations are ranked with one group-wise sort.
+        """
+        profile = None if sport is None else get_sport_profile(sport)
+
+        logger.debug(f"Analyzing AQI and weather data for {len(forecasts)} locations")
+
+        locations = []
+        dates = []
+        pm25 = []
+        pm10 = []
+
+        for location, (_, air_quality_forecast) in enumerate(forecasts):
+            combined_air_quality_data = self._combine_air_quality_forecast(
+                air_quality_forecast
             )
 
+            for date, pollutant_forecasts in combined_air_quality_data.items():
+                locations.append(location)
+                dates.append(date)
+                pm25.append(pollutant_forecasts.get("pm25", np.nan))
+                pm10.append(pollutant_forecasts.get("pm10", np.nan))
+
+        aqis = self._aqi_calculator.calculate_many(
+            pm25=np.array(pm25, dtype=np.float64), pm10=np.array(pm10, dtype=np.float64)
+        )
+        categories = self._categorize_many(aqis)
+
+        # Days of each location ordered by AQI, ties keep the forecast order
+        order = np.lexsort((aqis, np.array(locations, dtype=np.int64)))
+
+        aqi_categorized = [[] for _ in forecasts]
+        aqis = aqis.tolist()
+
+        for row in order.tolist():
+            aqi_categorized[locations[row]].append(
+                {
+                    "date": self._to_date(dates[row]),
+                    "aqi": aqis[row],
+                    "category": categories[row],
+                }
+            )
+
+        return rank_days_many(
+            [
+                (location_aqi_categorized, weather_forecast)
+                for location_aqi_categorized, (weather_forecast, _) in zip(
+                    aqi_categorized, forecasts
+                )
+            ],
+            self._get_today(),
+            top_k,
+            profile,
+        )
+
+    def predict_best_time_windows(self, window_hours: int = 2) -> List[dict]:
+        """
+        :return: List[dict] with Dict.keys = [date: str, start: str, end: str,
+        aqi: float, category: int, temperature_2m: float, precipitation: float]
+
+        The best contiguous window of window_hours hours of every day, from
+        today onwards and in date order. Windows are ranked by the category of
+        their mean AQI, their total precipitation and their mean temperature.
+
+        Uses:
+        :self.hourly_forecast: Hourly temperature, precipitation and, where
+        available, PM2.5 and PM10 forecasts.
+        """
+        return self.predict_best_time_windows_batch(
+            [self._hourly_forecast], window_hours
+        )[0]
+
+    def predict_best_time_windows_batch(
+        self, hourly_forecasts: List[List[HourlyWeather]], window_hours: int = 2
+    ) -> List[List[dict]]:
+        """
+        :return: The best window of every day per location, in the order of
+        hourly_forecasts. All locations are searched in one vectorized pass.
+        """
+        logger.debug(
+            f"Searching {window_hours}-hour windows for {len(hourly_forecasts)} "
+            f"locations"
+        )
+
+        return best_time_windows(
+            hourly_forecasts,
+            window_hours,
+            self._get_today(),
+            self._aqi_calculator,
+            self._categorize_many,
+        )
+
+    async def predict_best_location_days(
+        self,
+        candidates: List[Tuple[float, float]],
+        top_k: int = 5,
+        sport: Optional[str] = None,
+        weather_collector: Optional[WeatherDataCollector] = None,
+        air_quality_collector: Optional[AirQualityDataCollector] = None,
+        max_concurrency: int = 8,
+    ) -> List[dict]:
+        """
+        :return: The top_k best (location, day) pairs over all candidates, best
+        first, as ranked days with the latitude and longitude of their location.
+
+        :candidates: (latitude, longitude) pairs, e.g. nearby parks or trailheads
+        :max_concurrency: Maximum number of concurrent collector requests
+
+        Forecasts are fetched through the collectors. Candidates whose days
+        cannot beat the current k-th result even with perfect weather are
+        pruned before their weather is fetched.
+        """
+        profile = None if sport is None else get_sport_profile(sport)
+
+        location_search = LocationSearch(
+            self, weather_collector, air_quality_collector, max_concurrency
+        )
+
+        return await location_search.search(candidates, top_k, profile)
+
+    def update_location(
+        self,
+        location: str,
+        weather_forecast: Optional[List[WeatherForecast]] = None,
+        air_quality_forecast: Optional[AirQualityData] = None,
+    ) -> "LocationState":
+        """
+        Updates the forecasts of a location that is ranked repeatedly. Only what
+        depends on the updated forecast is recomputed: the daily AQI and category
+        of the dates whose PM values changed, or the weather grouped by date.
+        """
+        state = self._locations.get(location)
+
+        if state is None:
+            state = LocationState(self)
+            self._locations[location] = state
+
+        if air_quality_forecast is not None:
+            state.update_air_quality(air_quality_forecast)
+
+        if weather_forecast is not None:
+            state.update_weather(weather_forecast)
+
+        return state
+
+    def predict_location(
+        self, location: str, top_k: Optional[int] = None, sport: Optional[str] = None
+    ) -> List[dict]:
+        """
+        :return: The ranked days of a location kept with update_location, identical
+        to predict_best_outdoor_sports_day for its latest forecasts.
+        """
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be at least 1.")
+
+        state = self._locations.get(location)
+
+        if state is None:
+            raise KeyError(f"No forecasts for location: {location}")
+
+        profile = None if sport is None else get_sport_profile(sport)
+
+        return state.rank(self._get_today(), top_k, profile)
+
+    def get_locations(self) -> List[str]:
+        return list(self._locations.keys())
+
+    def remove_location(self, location: str):
+        self._locations.pop(location, None)
+
+    def _result_cache_key(
+        self, engine: str, top_k: Optional[int], sport: Optional[str]
+    ) -> str:
+        """
+        Content hash of what the ranking reads. The air quality forecast only
+        contributes its PM2.5 and PM10 (date, average) pairs, not the time of
+        collection, the current AQI, the station or the other pollutants, so a
+        forecast collected again hits the same entry. Every weather column ends
+        up in the ranked days, so the weather forecast is hashed as a whole.
+        The breakpoints are part of the key, so changed breakpoints miss.
+        """
+        pm_forecasts = [
+            [
+                (forecast["date"], forecast["avg"])
+                for forecast in self._air_quality_forecast[pollutant_forecast]
+            ]
+            for pollutant_forecast in ["pm25_forecast", "pm10_forecast"]
+        ]
+
+        return self._result_cache.make_key(
+            self._weather_forecast,
+            pm_forecasts,
+            self._get_today(),
+            top_k,
+            sport,
+            engine,
+            self._aqi_calculator.get_pm25_breakpoints(),
+            self._aqi_calculator.get_pm10_breakpoints(),
+        )
+
+    def _rank_days_pandas(
+        self,
+        aqi_categorized: List[dict],
+        top_k: Optional[int] = None,
+        profile: Optional[SportProfile] = None,
+    ) -> List[dict]:
         aqi_df = pd.DataFrame(aqi_categorized)
         aqi_df["date"] = pd.to_datetime(aqi_df["date"])
 
@@ -106,30 +413,124 @@ class WeatherAQIAnalyzer:
 
         # data = data[data['category'] < 4]
 
-        data.sort_values(
-            by=[
+        if profile is None:
+            sort_by = [
                 "category",
                 "precipitation_hours",
                 "temperature_2m_max",
                 "sunshine_duration",
-            ],
-            ascending=[True, True, False, False],
-            inplace=True,
-        )
+            ]
+            ascending = [True, True, False, False]
+        else:
+            columns = {
+                column: data[column].to_numpy(dtype=np.float64)
+                for column in profile.columns
+                if column in data.columns
+            }
+            data["score"], data["suitable"] = profile.score(columns, len(data))
+
+            sort_by = ["suitable", "score"]
+            ascending = [False, False]
+
+        if top_k is None:
+            data.sort_values(by=sort_by, ascending=ascending, inplace=True)
+        else:
+            # Only the k best rows are selected and sorted, and only they get
+            # formatted and serialized
+            if profile is None:
+                keys = ranking_keys(
+                    {
+                        column: data[column].to_numpy(dtype=np.float64)
+                        for column in sort_by
+                    }
+                )
+            else:
+                keys = score_keys(
+                    data["score"].to_numpy(dtype=np.float64),
+                    data["suitable"].to_numpy(dtype=bool),
+                )
+
+            data = data.iloc[select_top_k(keys, top_k)].copy()
 
         data["date"] = data["date"].dt.strftime("%Y-%m-%d")
 
         data = data.replace({float("nan"): None})
 
-        result = data.to_dict(orient="records")
+        return data.to_dict(orient="records")
 
-        logger.debug(f"Analysis results: {result}")
+    def _categorize_daily_aqi(self, daily_aqi: Dict) -> List[dict]:
+        aqi_ordered = sorted(daily_aqi.items(), key=lambda item: item[1])
 
-        return result
+        aqi_categorized = []
+
+        for date, aqi in aqi_ordered:
+            category = ""
+
+            for key in self.aqi_categories:
+                lower_bound = self.aqi_categories[key]["lower_bound"]
+                upper_bound = self.aqi_categories[key]["upper_bound"]
+                if upper_bound is None and aqi >= lower_bound:
+                    category = self.aqi_categories[key]["level"]
+                    break
+                elif lower_bound <= aqi <= upper_bound:
+                    category = self.aqi_categories[key]["level"]
+                    break
+
+            aqi_categorized.append(
+                {"date": self._to_date(date), "aqi": aqi, "category": category}
+            )
+
+        return aqi_categorized
+
+    def _categorize_many(self, aqis: np.ndarray) -> list:
+        """Vectorized counterpart of _categorize_daily_aqi."""
+        index = np.searchsorted(self._category_lower_bounds, aqis, side="right") - 1
+        index = np.clip(index, 0, len(self._category_levels) - 1)
+
+        in_category = (aqis >= self._category_lower_bounds[index]) & (
+            aqis <= self._category_upper_bounds[index]
+        )
+
+        return [
+            self._category_levels[category_index] if found else ""
+            for category_index, found in zip(index.tolist(), in_category.tolist())
+        ]
+
+    @staticmethod
+    def _to_date(value):
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+
+        return value.date()
 
     def _calculate_daily_aqi(self, air_quality_forecast: AirQualityData) -> Dict:
         daily_aqi = {}
 
+        combined_air_quality_data = self._combine_air_quality_forecast(
+            air_quality_forecast
+        )
+
+        dates = list(combined_air_quality_data.keys())
+
+        # All days are scored in one pass, missing pollutants are passed as NaN
+        pm25 = np.array(
+            [combined_air_quality_data[date].get("pm25", np.nan) for date in dates],
+            dtype=np.float64,
+        )
+        pm10 = np.array(
+            [combined_air_quality_data[date].get("pm10", np.nan) for date in dates],
+            dtype=np.float64,
+        )
+
+        aqis = self._aqi_calculator.calculate_many(pm25=pm25, pm10=pm10)
+
+        for date, aqi in zip(dates, aqis.tolist()):
+            daily_aqi[date] = aqi
+
+        return daily_aqi
+
+    @staticmethod
+    def _combine_air_quality_forecast(air_quality_forecast: AirQualityData) -> Dict:
         pm25_forecast = air_quality_forecast["pm25_forecast"]
         pm10_forecast = air_quality_forecast["pm10_forecast"]
 
@@ -152,24 +553,13 @@ class WeatherAQIAnalyzer:
             # In case there are pm10 but no pm25 forecasts for a given date
             combined_air_quality_data[date]["pm10"] = pm10
 
-        for date, pollutant_forecasts in combined_air_quality_data.items():
+        if any(
+            "pm25" not in pollutant_forecasts and "pm10" not in pollutant_forecasts
+            for pollutant_forecasts in combined_air_quality_data.values()
+        ):
+            raise ValueError("No PM data found in pollutant_forecast")
 
-            if "pm25" in pollutant_forecasts and "pm10" in pollutant_forecasts:
-                aqi_calculator = AQICalculator(
-                    pm25=pollutant_forecasts["pm25"], pm10=pollutant_forecasts["pm10"]
-                )
-            elif "pm25" in pollutant_forecasts:
-                aqi_calculator = AQICalculator(pm25=pollutant_forecasts["pm25"])
-            elif "pm10" in pollutant_forecasts:
-                aqi_calculator = AQICalculator(pm10=pollutant_forecasts["pm10"])
-            else:
-                raise ValueError("No PM data found in pollutant_forecast")
-
-            aqi = aqi_calculator.calculate_aqi()
-
-            daily_aqi[date] = aqi
-
-        return daily_aqi
+        return combined_air_quality_data
 
     def _get_today(self) -> datetime.date:
         return datetime.today().date()
@@ -185,3 +575,153 @@ class WeatherAQIAnalyzer:
 
     def get_weather_forecast(self) -> List[WeatherForecast]:
         return self._weather_forecast
+
+    def set_hourly_forecast(self, hourly_forecast: List[HourlyWeather]):
+        self._hourly_forecast = hourly_forecast
+
+    def get_hourly_forecast(self) -> List[HourlyWeather]:
+        return self._hourly_forecast
+
+
+class LocationState:
+    """
+    Derived state of one location: the daily AQI and category per date, the
+    weather forecast grouped by date and the merged day table. The AQI and the
+    weather side are updated independently. The day table is updated in place
+    for the changed dates, it is only rebuilt when its rows change: the dates or
+    their order by AQI, the number of forecasts of a date, the weather columns
+    or the current date.
+    """
+
+    def __init__(self, analyzer: WeatherAQIAnalyzer):
+        self._analyzer = analyzer
+
+        # Date of the air quality forecast -> (PM2.5, PM10), missing as None
+        self._pollutants: Dict = {}
+        # Date of the air quality forecast -> categorized day
+        self._aqi_days: Dict = {}
+
+        self._aqi_categorized: Optional[List[dict]] = None
+        self._weather_days: Optional[WeatherDays] = None
+
+        self._day_table: Optional[DayTable] = None
+        self._day_table_today = None
+
+        # Number of daily AQIs calculated over the lifetime of the state
+        self.calculated_days = 0
+
+    def update_air_quality(self, air_quality_forecast: AirQualityData) -> int:
+        """:return: The number of dates whose AQI was recalculated."""
+        combined_air_quality_data = self._analyzer._combine_air_quality_forecast(
+            air_quality_forecast
+        )
+
+        pollutants = {
+            date: (pollutant_forecasts.get("pm25"), pollutant_forecasts.get("pm10"))
+            for date, pollutant_forecasts in combined_air_quality_data.items()
+        }
+
+        changed = [
+            date
+            for date, concentrations in pollutants.items()
+            if self._pollutants.get(date) != concentrations
+        ]
+
+        if changed:
+            pm25 = np.array(
+                [_nan_if_none(pollutants[date][0]) for date in changed],
+                dtype=np.float64,
+            )
+            pm10 = np.array(
+                [_nan_if_none(pollutants[date][1]) for date in changed],
+                dtype=np.float64,
+            )
+
+            aqis = self._analyzer._aqi_calculator.calculate_many(pm25=pm25, pm10=pm10)
+            categories = self._analyzer._categorize_many(aqis)
+
+            for date, aqi, category in zip(changed, aqis.tolist(), categories):
+                self._aqi_days[date] = {
+                    "date": self._analyzer._to_date(date),
+                    "aqi": aqi,
+                    "category": category,
+                }
+
+        if changed or list(pollutants) != list(self._pollutants):
+            self._aqi_days = {date: self._aqi_days[date] for date in pollutants}
+
+            previous = self._aqi_categorized
+
+            # Ordered by AQI, ties keep the forecast order
+            self._aqi_categorized = sorted(
+                self._aqi_days.values(), key=lambda day: day["aqi"]
+            )
+
+            if previous is None or [day["date"] for day in previous] != [
+                day["date"] for day in self._aqi_categorized
+            ]:
+                self._day_table = None
+            elif self._day_table is not None:
+                self._day_table.update_days(
+                    0,
+                    [self._aqi_days[date] for date in changed],
+                    self._aqi_categorized,
+                )
+
+        self._pollutants = pollutants
+        self.calculated_days += len(changed)
+
+        return len(changed)
+
+    def update_weather(self, weather_forecast: List[WeatherForecast]):
+        previous = self._weather_days
+        self._weather_days = WeatherDays(weather_forecast)
+
+        if self._day_table is None:
+            return
+
+        by_date = self._weather_days.by_date
+
+        if (
+            previous.columns != self._weather_days.columns
+            or previous.by_date.keys() != by_date.keys()
+            or any(
+                len(previous.by_date[day]) != len(forecasts)
+                for day, forecasts in by_date.items()
+            )
+        ):
+            self._day_table = None
+            return
+
+        changed = [
+            day
+            for day, forecasts in by_date.items()
+            if previous.by_date[day] != forecasts
+        ]
+
+        if changed:
+            self._day_table.update_weather(0, self._weather_days, changed)
+
+    def rank(
+        self,
+        today,
+        top_k: Optional[int] = None,
+        profile: Optional[SportProfile] = None,
+    ) -> List[dict]:
+        if self._aqi_categorized is None or self._weather_days is None:
+            raise ValueError(
+                "Both the weather and the air quality forecast are needed."
+            )
+
+        if self._day_table is None or self._day_table_today != today:
+            self._day_table = DayTable()
+            self._day_table.add_location(
+                self._aqi_categorized, self._weather_days, today
+            )
+            self._day_table_today = today
+
+        return rank_day_table(self._day_table, top_k, profile)[0]
+
+
+def _nan_if_none(value) -> float:
+    return np.nan if value is None else value
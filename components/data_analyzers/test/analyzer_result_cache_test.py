@@ -0,0 +1,86 @@
+from components.data_analyzers.src.analyzer_result_cache import AnalyzerResultCache
+from datetime import datetime, timezone
+import unittest
+import numpy as np
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestAnalyzerResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = AnalyzerResultCache(maxsize=2, ttl=60, clock=self.clock)
+
+    def test_hit_and_miss(self):
+        assert self.cache.get("a") is None
+
+        self.cache.put("a", [{"date": "2024-12-20", "aqi": 12.0}])
+
+        assert self.cache.get("a") == [{"date": "2024-12-20", "aqi": 12.0}]
+        assert self.cache.stats() == {
+            "hits": 1,
+            "misses": 1,
+            "evictions": 0,
+            "size": 1,
+            "maxsize": 2,
+        }
+
+    def test_returns_copies(self):
+        self.cache.put("a", [{"aqi": 12.0}])
+
+        self.cache.get("a")[0]["aqi"] = 300.0
+
+        assert self.cache.get("a") == [{"aqi": 12.0}]
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.put("a", [])
+        self.cache.put("b", [])
+        self.cache.get("a")
+        self.cache.put("c", [])
+
+        assert self.cache.get("b") is None
+        assert self.cache.get("a") == []
+        assert self.cache.stats()["evictions"] == 1
+        assert len(self.cache) == 2
+
+    def test_ttl(self):
+        self.cache.put("a", [])
+        self.clock.now = 59
+
+        assert self.cache.get("a") == []
+
+        self.clock.now = 60
+
+        assert self.cache.get("a") is None
+        assert len(self.cache) == 0
+
+    def test_make_key(self):
+        timestamp = datetime(2024, 12, 20, 5, tzinfo=timezone.utc)
+
+        key = AnalyzerResultCache.make_key(
+            [{"date": timestamp, "temperature_2m_max": np.float32(19.5)}]
+        )
+
+        # JSON inputs of HTTP and RabbitMQ requests hash like the Python objects
+        assert key == AnalyzerResultCache.make_key(
+            [{"temperature_2m_max": 19.5, "date": "2024-12-20T05:00:00+00:00"}]
+        )
+        assert key != AnalyzerResultCache.make_key(
+            [{"temperature_2m_max": 19.6, "date": "2024-12-20T05:00:00+00:00"}]
+        )
+
+    def test_invalid_maxsize(self):
+        with self.assertRaises(ValueError):
+            AnalyzerResultCache(maxsize=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
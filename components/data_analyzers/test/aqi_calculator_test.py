@@ -1,5 +1,10 @@
 from components.data_analyzers.src.aqi_calculator import AQICalculator
+from components.data_analyzers.src.aqi_lookup_table import get_lookup_table
+import numpy as np
 import unittest
+import tempfile
+import shutil
+import os
 
 
 class TestAQICalculator(unittest.TestCase):
@@ -18,3 +23,128 @@ class TestAQICalculator(unittest.TestCase):
     def test_no_pollutants_provided(self):
         with self.assertRaises(ValueError):
             self.aqi_calculator.calculate_aqi()
+
+    def test_calculate_aqi_single_pollutant(self):
+        aqi_calculator = AQICalculator(pm10=25)
+
+        assert aqi_calculator.calculate_aqi() == 23.15
+
+    def test_calculate_pollutant_aqi(self):
+        assert self.aqi_calculator.calculate_pollutant_aqi("pm25", 24) == 78.76
+        assert self.aqi_calculator.calculate_pollutant_aqi("pm10", 25) == 23.15
+
+        with self.assertRaises(AttributeError):
+            self.aqi_calculator.calculate_pollutant_aqi("no2", 50)
+
+    def test_calculate_many(self):
+        pm25 = np.array([24, 9.04, 35.45, 230.0, 12.3])
+        pm10 = np.array([25, 54.9, 100, 10, 500])
+
+        aqis = self.aqi_calculator.calculate_many(pm25=pm25, pm10=pm10)
+
+        for pm25_value, pm10_value, aqi in zip(pm25, pm10, aqis):
+            scalar_aqi = AQICalculator(
+                pm25=float(pm25_value), pm10=float(pm10_value)
+            ).calculate_aqi()
+
+            assert aqi == scalar_aqi
+
+    def test_calculate_many_matches_scalar_path(self):
+        rng = np.random.default_rng(0)
+        pm25 = np.round(rng.uniform(0, 300, 1000), 2)
+        pm10 = rng.uniform(0, 500, 1000)
+
+        aqis = self.aqi_calculator.calculate_many(pm25=pm25, pm10=pm10)
+
+        scalar_aqis = [
+            AQICalculator(pm25=pm25_value, pm10=pm10_value).calculate_aqi()
+            for pm25_value, pm10_value in zip(pm25.tolist(), pm10.tolist())
+        ]
+
+        np.testing.assert_array_equal(aqis, scalar_aqis)
+
+    def test_calculate_many_missing_pollutants(self):
+        pm25 = np.array([24, np.nan, np.nan])
+        pm10 = np.array([np.nan, 25, np.nan])
+
+        aqis = self.aqi_calculator.calculate_many(pm25=pm25, pm10=pm10)
+
+        assert aqis[0] == AQICalculator(pm25=24).calculate_aqi()
+        assert aqis[1] == AQICalculator(pm10=25).calculate_aqi()
+        assert np.isnan(aqis[2])
+
+    def test_calculate_many_no_pollutants_provided(self):
+        with self.assertRaises(ValueError):
+            self.aqi_calculator.calculate_many()
+
+
+class TestAQICalculatorLookupTable(unittest.TestCase):
+
+    def setUp(self):
+        self.lookup_table_directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.lookup_table_directory)
+
+    def test_lookup_table_is_memory_mapped(self):
+        aqi_calculator = AQICalculator(
+            use_lookup_table=True, lookup_table_directory=self.lookup_table_directory
+        )
+        aqi_calculator.calculate_many(pm25=np.array([24.0]))
+
+        lookup_table = get_lookup_table(
+            aqi_calculator._pollutant_breakpoints, self.lookup_table_directory
+        )
+
+        assert len(os.listdir(self.lookup_table_directory)) == 2
+        assert all(
+            isinstance(table, np.memmap) for table in lookup_table._tables.values()
+        )
+
+    def test_calculate_aqi_with_lookup_table(self):
+        aqi_calculator = AQICalculator(
+            pm25=24,
+            pm10=25,
+            use_lookup_table=True,
+            lookup_table_directory=self.lookup_table_directory,
+        )
+
+        assert aqi_calculator.calculate_aqi() == 78.76
+
+    def test_off_grid_concentrations_are_interpolated(self):
+        aqi_calculator = AQICalculator(
+            use_lookup_table=True, lookup_table_directory=self.lookup_table_directory
+        )
+        aqi_calculator.set_pm25(9.05)
+
+        assert aqi_calculator.calculate_aqi() == 301
+
+    def test_non_finite_concentrations_are_interpolated(self):
+        lookup_table = get_lookup_table(
+            AQICalculator()._pollutant_breakpoints, self.lookup_table_directory
+        )
+
+        for concentration in [float("nan"), float("inf"), float("-inf")]:
+            assert lookup_table.calculate_aqi("pm25_breakpoints", concentration) is None
+
+        aqi_calculator = AQICalculator(
+            use_lookup_table=True, lookup_table_directory=self.lookup_table_directory
+        )
+
+        assert aqi_calculator.calculate_pollutant_aqi("pm25", float("inf")) == 301
+        assert aqi_calculator.calculate_pollutant_aqi("pm10", float("-inf")) == 301
+
+    def test_calculate_many_matches_interpolation(self):
+        rng = np.random.default_rng(0)
+        pm25 = rng.uniform(-1, 300, 10000)
+        pm10 = rng.uniform(-1, 500, 10000)
+        pm25[::10] = np.nan
+
+        aqi_calculator = AQICalculator(
+            use_lookup_table=True, lookup_table_directory=self.lookup_table_directory
+        )
+
+        np.testing.assert_array_equal(
+            aqi_calculator.calculate_many(pm25=pm25, pm10=pm10),
+            AQICalculator().calculate_many(pm25=pm25, pm10=pm10),
+        )
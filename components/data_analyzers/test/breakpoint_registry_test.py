@@ -0,0 +1,96 @@
+from components.data_analyzers.src.breakpoint_registry import (
+    BreakpointRegistry,
+    BreakpointTable,
+)
+from components.data_analyzers.src.aqi_calculator import AQICalculator
+import unittest
+import tempfile
+import shutil
+import json
+import os
+import numpy as np
+
+
+class TestBreakpointRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = BreakpointRegistry()
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.breakpoints_path = os.path.join(self.temp_dir, "breakpoints.json")
+
+        shutil.copy(AQICalculator._pollutant_breakpoints_path, self.breakpoints_path)
+
+        with open(self.breakpoints_path, "r") as file:
+            self.pollutant_breakpoints = json.load(file)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_get_is_shared(self):
+        first = self.registry.get(self.breakpoints_path)
+        second = self.registry.get(self.breakpoints_path)
+
+        assert first is second
+        assert len(self.registry) == 1
+
+    def test_reload_in_place(self):
+        breakpoint_set = self.registry.get(self.breakpoints_path)
+        pm25_table = breakpoint_set["pm25_breakpoints"]
+
+        self.pollutant_breakpoints["pm25_breakpoints"]["Good"]["AQI"] = [0, 40]
+
+        with open(self.breakpoints_path, "w") as file:
+            json.dump(self.pollutant_breakpoints, file)
+
+        mtime_ns = breakpoint_set.mtime_ns + 1_000_000_000
+        os.utime(self.breakpoints_path, ns=(mtime_ns, mtime_ns))
+
+        reloaded = self.registry.get(self.breakpoints_path)
+
+        assert reloaded is breakpoint_set
+        assert reloaded["pm25_breakpoints"] is not pm25_table
+        assert reloaded["pm25_breakpoints"].calculate_aqi(9.0) == 40
+
+    def test_custom_breakpoints_path(self):
+        aqi_calculator = AQICalculator(
+            pm25=24, pm10=25, pollutant_breakpoints_path=self.breakpoints_path
+        )
+        other_aqi_calculator = AQICalculator(
+            pollutant_breakpoints_path=self.breakpoints_path
+        )
+
+        assert (
+            aqi_calculator._pollutant_breakpoints
+            is other_aqi_calculator._pollutant_breakpoints
+        )
+        assert aqi_calculator.calculate_aqi() == 78.76
+
+
+class TestBreakpointTable(unittest.TestCase):
+
+    def setUp(self):
+        with open(AQICalculator._pollutant_breakpoints_path, "r") as file:
+            pollutant_breakpoints = json.load(file)
+
+        self.pm25_table = BreakpointTable(pollutant_breakpoints["pm25_breakpoints"])
+
+    def test_calculate_aqi(self):
+        assert self.pm25_table.calculate_aqi(0.0) == 0
+        assert self.pm25_table.calculate_aqi(9.0) == 50
+        assert self.pm25_table.calculate_aqi(9.1) == 51
+        assert self.pm25_table.calculate_aqi(24) == 78.76
+        assert self.pm25_table.calculate_aqi(225.5) == 301
+
+    def test_gaps_are_hazardous(self):
+        assert self.pm25_table.calculate_aqi(9.05) == 301
+        assert self.pm25_table.calculate_aqi(-1) == 301
+
+    def test_calculate_aqi_many(self):
+        pm25 = np.array([0.0, 9.0, 9.05, 24, 225.5, -1])
+
+        aqis = self.pm25_table.calculate_aqi_many(pm25)
+
+        expected = [self.pm25_table.calculate_aqi(value) for value in pm25.tolist()]
+
+        np.testing.assert_array_equal(aqis, expected)
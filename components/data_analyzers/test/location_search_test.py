@@ -0,0 +1,151 @@
+from components.data_analyzers.src.weather_aqi_analyzer import WeatherAQIAnalyzer
+from datetime import date
+import unittest
+from unittest.mock import MagicMock
+import asyncio
+import pickle
+import json
+import os
+
+
+class FakeWeatherDataCollector:
+
+    def __init__(self, weather_forecasts: dict):
+        self.weather_forecasts = weather_forecasts
+        self.requested = []
+
+    def get_weather_data(self, latitude: float, longitude: float):
+        self.requested.append((latitude, longitude))
+        return self.weather_forecasts[(latitude, longitude)]
+
+
+class FakeAirQualityDataCollector:
+
+    def __init__(self, air_quality_forecasts: dict):
+        self.air_quality_forecasts = air_quality_forecasts
+        self.running = 0
+        self.max_running = 0
+
+    async def get_air_quality_data_by_coords(self, latitude: float, longitude: float):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.001)
+        self.running -= 1
+
+        return self.air_quality_forecasts[(latitude, longitude)]
+
+
+class TestLocationSearch(unittest.TestCase):
+
+    def setUp(self):
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+
+        with open(os.path.join(current_dir, "mock_weather_data.pkl"), "rb") as file:
+            self.mock_weather_data = pickle.load(file)
+
+        with open(os.path.join(current_dir, "mock_aqi_data.pkl"), "rb") as file:
+            self.mock_aqi_data = pickle.load(file)
+
+        self.analyzer = WeatherAQIAnalyzer()
+        self.analyzer._get_today = MagicMock(return_value=date(2024, 12, 20))
+
+        # Candidate i has its PM values scaled by 1 / (i + 1), so the last
+        # candidate has the cleanest air
+        self.candidates = [(4.0 + i, -74.0) for i in range(6)]
+
+        air_quality_forecasts = {}
+
+        for i, candidate in enumerate(self.candidates):
+            air_quality_forecasts[candidate] = {
+                **self.mock_aqi_data,
+                **{
+                    pollutant: [
+                        {**forecast, "avg": forecast["avg"] / (i + 1)}
+                        for forecast in self.mock_aqi_data[pollutant]
+                    ]
+                    for pollutant in ["pm25_forecast", "pm10_forecast"]
+                },
+            }
+
+        # No air quality station near the first candidate
+        air_quality_forecasts[self.candidates[0]] = None
+
+        self.air_quality_forecasts = air_quality_forecasts
+        self.weather_data_collector = FakeWeatherDataCollector(
+            {candidate: self.mock_weather_data for candidate in self.candidates}
+        )
+        self.air_quality_data_collector = FakeAirQualityDataCollector(
+            air_quality_forecasts
+        )
+
+    def search(self, top_k: int, **kwargs) -> list:
+        return asyncio.run(
+            self.analyzer.predict_best_location_days(
+                self.candidates,
+                top_k=top_k,
+                weather_collector=self.weather_data_collector,
+                air_quality_collector=self.air_quality_data_collector,
+                **kwargs,
+            )
+        )
+
+    def expected(self, top_k: int, sport: str = None) -> list:
+        ranked = []
+
+        for i, candidate in enumerate(self.candidates[1:], start=1):
+            analyzer = WeatherAQIAnalyzer(
+                weather_forecast=self.mock_weather_data,
+                air_quality_forecast=self.air_quality_forecasts[candidate],
+            )
+            analyzer._get_today = self.analyzer._get_today
+
+            for day in analyzer.predict_best_outdoor_sports_day(sport=sport):
+                if sport is None:
+                    key = (
+                        day["category"],
+                        day["precipitation_hours"],
+                        -day["temperature_2m_max"],
+                        -day["sunshine_duration"],
+                    )
+                else:
+                    key = (not day["suitable"], -day["score"])
+
+                ranked.append(
+                    (key, i, {"latitude": candidate[0], "longitude": -74.0, **day})
+                )
+
+        ranked.sort(key=lambda entry: entry[:2])
+
+        return [record for _, _, record in ranked[:top_k]]
+
+    def test_global_top_k(self):
+        for top_k in [1, 3, 10]:
+            for sport in [None, "running"]:
+                result = self.search(top_k, sport=sport)
+
+                assert json.dumps(result) == json.dumps(self.expected(top_k, sport))
+
+    def test_pruning(self):
+        # Weather is fetched one candidate at a time, from the best bound on
+        result = self.search(1, max_concurrency=1)
+
+        assert result[0]["latitude"] == self.candidates[-1][0]
+        # Only the cleanest candidates can hold the best day
+        assert len(self.weather_data_collector.requested) < len(self.candidates) - 1
+        assert self.candidates[0] not in self.weather_data_collector.requested
+
+    def test_bounded_concurrency(self):
+        self.search(3, max_concurrency=2)
+
+        assert self.air_quality_data_collector.max_running == 2
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.search(0)
+
+        with self.assertRaises(ValueError):
+            self.search(1, max_concurrency=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
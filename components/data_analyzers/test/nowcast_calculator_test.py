@@ -0,0 +1,144 @@
+from components.data_analyzers.src.nowcast_calculator import (
+    NowCastCalculator,
+    NowCastWindow,
+)
+from components.data_analyzers.src.aqi_calculator import AQICalculator
+from datetime import datetime, timedelta
+import unittest
+import math
+
+
+def _reference_nowcast(concentrations):
+    # Straightforward EPA NowCast over a full window, most recent hour first
+    available = [value for value in concentrations[:12] if value is not None]
+    weight = max(min(available) / max(available), 0.5)
+
+    weights = [weight**age for age in range(len(concentrations[:12]))]
+    weighted = [
+        (hour_weight * value, hour_weight)
+        for hour_weight, value in zip(weights, concentrations[:12])
+        if value is not None
+    ]
+
+    return sum(value for value, _ in weighted) / sum(w for _, w in weighted)
+
+
+class TestNowCastWindow(unittest.TestCase):
+
+    def setUp(self):
+        self.window = NowCastWindow()
+
+    def test_constant_concentrations(self):
+        for hour in range(12):
+            self.window.add(hour, 20.0)
+
+        assert self.window.nowcast() == 20.0
+
+    def test_matches_reference_after_window_rolls(self):
+        concentrations = [5.0, 8.0, 13.0, 40.0, 55.0, 21.0, 18.0, 9.0] * 3
+
+        for hour, concentration in enumerate(concentrations):
+            self.window.add(hour, concentration)
+
+        expected = _reference_nowcast(list(reversed(concentrations)))
+
+        assert math.isclose(self.window.nowcast(), expected)
+
+    def test_gaps_are_skipped(self):
+        self.window.add(0, 10.0)
+        self.window.add(1, 30.0)
+        self.window.add(3, 20.0)
+
+        expected = _reference_nowcast([20.0, None, 30.0, 10.0])
+
+        assert math.isclose(self.window.nowcast(), expected)
+
+    def test_too_few_recent_hours(self):
+        self.window.add(0, 10.0)
+        self.window.add(1, 30.0)
+        self.window.add(4, 20.0)
+
+        assert self.window.nowcast() is None
+
+    def test_late_observation(self):
+        self.window.add(0, 10.0)
+        self.window.add(2, 20.0)
+        self.window.add(1, 30.0)
+
+        expected = _reference_nowcast([20.0, 30.0, 10.0])
+
+        assert math.isclose(self.window.nowcast(), expected)
+
+
+class TestNowCastCalculator(unittest.TestCase):
+
+    def setUp(self):
+        self.nowcast_calculator = NowCastCalculator()
+        self.start = datetime(2024, 12, 20, 0, 0)
+
+    def test_add_observation(self):
+        for hour in range(12):
+            nowcast = self.nowcast_calculator.add_observation(
+                "Bogota", self.start + timedelta(hours=hour), pm25=24.0, pm10=25.0
+            )
+
+        assert nowcast["pm25"] == 24.0
+        assert nowcast["pm10"] == 25
+        assert nowcast["aqi"] == AQICalculator(pm25=24, pm10=25).calculate_aqi()
+
+    def test_locations_are_independent(self):
+        for hour in range(3):
+            timestamp = self.start + timedelta(hours=hour)
+            self.nowcast_calculator.add_observation("Bogota", timestamp, pm25=24.0)
+            self.nowcast_calculator.add_observation("Flensburg", timestamp, pm10=25.0)
+
+        assert self.nowcast_calculator.get_aqi("Bogota") == 78.76
+        assert self.nowcast_calculator.get_aqi("Flensburg") == 23.15
+        assert self.nowcast_calculator.get_locations() == ["Bogota", "Flensburg"]
+
+    def test_pollutants_of_an_hour_in_separate_observations(self):
+        for hour in range(8, 11):
+            self.nowcast_calculator.add_observation(
+                "Bogota", self.start + timedelta(hours=hour), pm25=35.0
+            )
+            self.nowcast_calculator.add_observation(
+                "Bogota", self.start + timedelta(hours=hour), pm10=90.0
+            )
+
+        merged = self.nowcast_calculator.get_nowcast("Bogota")
+
+        assert merged["pm25"] == 35.0
+        assert merged["pm10"] == 90
+        assert merged["aqi"] == AQICalculator(pm25=35.0, pm10=90).calculate_aqi()
+
+        # A later single pollutant for an hour keeps the other one
+        nowcast = self.nowcast_calculator.add_observation(
+            "Bogota", self.start + timedelta(hours=9), pm10=90.0
+        )
+
+        assert nowcast == merged
+
+    def test_single_pollutant_moves_both_windows(self):
+        for hour in range(3):
+            self.nowcast_calculator.add_observation(
+                "Bogota", self.start + timedelta(hours=hour), pm25=24.0, pm10=25.0
+            )
+
+        # Hours without PM2.5 age the PM2.5 window as well
+        nowcast = self.nowcast_calculator.add_observation(
+            "Bogota", self.start + timedelta(hours=4), pm10=25.0
+        )
+
+        assert nowcast["pm25"] is None
+        assert nowcast["pm10"] == 25
+
+    def test_unknown_location(self):
+        with self.assertRaises(KeyError):
+            self.nowcast_calculator.get_nowcast("Bogota")
+
+    def test_not_enough_observations(self):
+        nowcast = self.nowcast_calculator.add_observation(
+            "Bogota", self.start, pm25=24.0
+        )
+
+        assert nowcast["aqi"] is None
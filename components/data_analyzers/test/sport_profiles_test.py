@@ -0,0 +1,133 @@
+from components.data_analyzers.src.sport_profiles import (
+    SportProfile,
+    get_sport_profile,
+    get_sport_profiles,
+)
+import unittest
+import tempfile
+import shutil
+import json
+import os
+import numpy as np
+
+
+class TestSportProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.profile = SportProfile(
+            "test",
+            {
+                "thresholds": {
+                    "category": {"max": 3},
+                    "weather_code": {"exclude": [[95, 99]]},
+                },
+                "scores": {
+                    "category": {"weight": -2.0},
+                    "temperature_2m_max": {"weight": -0.5, "ideal": 15},
+                    "sunshine_duration": {"weight": 1.0, "unit": 3600},
+                    "weather_code": {
+                        "weight": -1.0,
+                        "penalties": [{"codes": [61, 67], "penalty": 3}],
+                    },
+                },
+            },
+        )
+
+    def test_score(self):
+        scores, suitable = self.profile.score(
+            {
+                "category": np.array([1.0, 4.0, 2.0]),
+                "temperature_2m_max": np.array([15.0, 11.0, 19.0]),
+                "sunshine_duration": np.array([7200.0, 0.0, 3600.0]),
+                "weather_code": np.array([3.0, 61.0, 95.0]),
+            },
+            3,
+        )
+
+        np.testing.assert_allclose(
+            scores, [-2.0 + 2.0, -8.0 - 2.0 - 3.0, -4.0 - 2.0 + 1.0]
+        )
+        assert suitable.tolist() == [True, False, False]
+
+    def test_missing_values(self):
+        scores, suitable = self.profile.score(
+            {
+                "category": np.array([1.0, 1.0]),
+                "temperature_2m_max": np.array([np.nan, 15.0]),
+                "weather_code": np.array([np.nan, np.nan]),
+            },
+            2,
+            absent={"weather_code": np.array([False, True])},
+        )
+
+        # Missing values score NaN, absent columns are left out of the score
+        assert np.isnan(scores[0])
+        assert scores[1] == -2.0
+        assert suitable.tolist() == [True, True]
+
+    def test_best_possible_score(self):
+        columns = {
+            "category": np.array([1.0, 2.0]),
+            "temperature_2m_max": np.array([15.0, 40.0]),
+            "sunshine_duration": np.array([86400.0, 0.0]),
+            "weather_code": np.array([0.0, 61.0]),
+        }
+
+        scores, _ = self.profile.score(columns, 2)
+        best_scores = self.profile.best_possible_score(
+            {"category": columns["category"]}, 2
+        )
+
+        # Ideal temperature, sunshine all day and no weather code penalty
+        np.testing.assert_allclose(best_scores, [-2.0 + 24.0, -4.0 + 24.0])
+        assert (best_scores >= scores).all()
+
+    def test_columns(self):
+        assert self.profile.columns == [
+            "category",
+            "temperature_2m_max",
+            "sunshine_duration",
+            "weather_code",
+        ]
+
+    def test_no_scores(self):
+        with self.assertRaises(ValueError):
+            SportProfile("test", {"thresholds": {"category": {"max": 3}}})
+
+
+class TestSportProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.profiles_path = os.path.join(self.temp_dir, "sport_profiles.json")
+
+        with open(self.profiles_path, "w") as file:
+            json.dump({"walking": {"scores": {"category": {"weight": -1}}}}, file)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_default_profiles(self):
+        assert set(get_sport_profiles()) == {"running", "cycling", "hiking"}
+
+    def test_compiled_once(self):
+        assert get_sport_profile("running") is get_sport_profile("running")
+
+    def test_recompiled_after_change(self):
+        walking = get_sport_profile("walking", self.profiles_path)
+
+        with open(self.profiles_path, "w") as file:
+            json.dump({"walking": {"scores": {"category": {"weight": -2}}}}, file)
+
+        stat = os.stat(self.profiles_path)
+        os.utime(self.profiles_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert get_sport_profile("walking", self.profiles_path) is not walking
+
+    def test_unknown_sport(self):
+        with self.assertRaises(ValueError):
+            get_sport_profile("curling")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+from components.data_analyzers.src.weather_aqi_analyzer import WeatherAQIAnalyzer
+from components.data_analyzers.src.time_windows import _best_per_group
+from datetime import date, datetime, timedelta, timezone
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+
+
+def make_hourly_forecast(start: datetime, hours: int, **overrides) -> list:
+    hourly_forecast = []
+
+    for hour in range(hours):
+        record = {
+            "date": start + timedelta(hours=hour),
+            "temperature_2m": 15.0,
+            "precipitation": 0.0,
+            "pm2_5": 5.0,
+            "pm10": 10.0,
+        }
+
+        for column, values in overrides.items():
+            if hour in values:
+                record[column] = values[hour]
+
+        hourly_forecast.append(record)
+
+    return hourly_forecast
+
+
+class TestTimeWindows(unittest.TestCase):
+
+    def setUp(self):
+        self.analyzer = WeatherAQIAnalyzer()
+        self.analyzer._get_today = MagicMock(return_value=date(2024, 12, 20))
+
+        self.local_timezone = timezone(timedelta(hours=-5))
+        self.start = datetime(2024, 12, 20, tzinfo=self.local_timezone)
+
+    def test_best_window_per_day(self):
+        hourly_forecast = make_hourly_forecast(
+            self.start,
+            48,
+            # Rain all morning of the first day, clean air at 14:00 on the second
+            precipitation={hour: 1.0 for hour in range(12)},
+            pm2_5={hour: 60.0 for hour in range(24, 48) if hour not in (38, 39)},
+        )
+        self.analyzer.set_hourly_forecast(hourly_forecast)
+
+        windows = self.analyzer.predict_best_time_windows(window_hours=2)
+
+        assert [window["date"] for window in windows] == ["2024-12-20", "2024-12-21"]
+        assert windows[0]["start"] == "2024-12-20T12:00:00-05:00"
+        assert windows[0]["end"] == "2024-12-20T14:00:00-05:00"
+        assert windows[0]["precipitation"] == 0.0
+        assert windows[1]["start"] == "2024-12-21T14:00:00-05:00"
+        assert windows[1]["category"] == 1
+
+    def test_warmest_window_breaks_ties(self):
+        hourly_forecast = make_hourly_forecast(
+            self.start, 24, temperature_2m={15: 20.0, 16: 21.0, 17: 20.0}
+        )
+
+        windows = self.analyzer.predict_best_time_windows_batch(
+            [hourly_forecast], window_hours=2
+        )
+
+        assert windows[0][0]["start"] == "2024-12-20T15:00:00-05:00"
+        assert windows[0][0]["temperature_2m"] == 20.5
+
+    def test_windows_stay_within_days_and_gaps(self):
+        # Only 18:00 to 23:00 of the first day, a gap at 20:00
+        hourly_forecast = [
+            record
+            for record in make_hourly_forecast(self.start, 24)[18:]
+            if record["date"].hour != 20
+        ]
+
+        windows = self.analyzer.predict_best_time_windows_batch(
+            [hourly_forecast], window_hours=3
+        )
+
+        assert windows[0][0]["start"] == "2024-12-20T21:00:00-05:00"
+
+        windows = self.analyzer.predict_best_time_windows_batch(
+            [hourly_forecast], window_hours=4
+        )
+
+        assert windows == [[]]
+
+    def test_many_locations(self):
+        hourly_forecasts = [
+            make_hourly_forecast(
+                self.start - timedelta(days=1),
+                72,
+                precipitation={hour: 2.0 for hour in range(72) if hour % 24 != shift},
+            )
+            for shift in range(5)
+        ]
+        # JSON encoded forecasts work alike
+        hourly_forecasts[0] = [
+            {**record, "date": record["date"].isoformat()}
+            for record in hourly_forecasts[0]
+        ]
+
+        windows = self.analyzer.predict_best_time_windows_batch(
+            hourly_forecasts, window_hours=1
+        )
+
+        for shift, location_windows in enumerate(windows):
+            # The day before today is skipped
+            assert len(location_windows) == 2
+            assert all(
+                datetime.fromisoformat(window["start"]).hour == shift
+                for window in location_windows
+            )
+
+    def test_missing_air_quality(self):
+        hourly_forecast = make_hourly_forecast(
+            self.start,
+            24,
+            pm2_5={hour: None for hour in range(24)},
+            pm10={hour: None for hour in range(24)},
+        )
+        self.analyzer.set_hourly_forecast(hourly_forecast)
+
+        windows = self.analyzer.predict_best_time_windows(window_hours=2)
+
+        assert windows[0]["aqi"] is None
+        assert windows[0]["start"] == "2024-12-20T00:00:00-05:00"
+
+    def test_invalid_window_hours(self):
+        self.analyzer.set_hourly_forecast([])
+
+        with self.assertRaises(ValueError):
+            self.analyzer.predict_best_time_windows(window_hours=0)
+
+    def test_best_per_group_matches_sorting(self):
+        rng = np.random.default_rng(0)
+
+        for _ in range(200):
+            size = int(rng.integers(1, 60))
+            groups = np.sort(rng.integers(0, 5, size))
+            candidates = np.flatnonzero(rng.random(size) < 0.8)
+
+            # Few distinct values, so many windows tie on some keys
+            keys = [rng.integers(0, 3, size).astype(np.float64) for _ in range(4)]
+
+            order = candidates[
+                np.lexsort(
+                    [candidates]
+                    + [key[candidates] for key in reversed(keys)]
+                    + [groups[candidates]]
+                )
+            ]
+            _, first = np.unique(groups[order], return_index=True)
+
+            np.testing.assert_array_equal(
+                _best_per_group(candidates, groups, keys), order[first]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,13 @@
 from components.data_analyzers.src.weather_aqi_analyzer import WeatherAQIAnalyzer
+from components.data_analyzers.src.analyzer_result_cache import AnalyzerResultCache
+from components.data_analyzers.src.aqi_calculator import AQICalculator
 import unittest
-from unittest.mock import MagicMock
+import pandas as pd
+from unittest.mock import MagicMock, patch
 import os
 import pickle
-from datetime import date
+import json
+from datetime import date, datetime
 
 
 class TestWeatherAQIAnalyzer(unittest.TestCase):
@@ -46,3 +50,317 @@ class TestWeatherAQIAnalyzer(unittest.TestCase):
         assert prediction[2]["date"] == self.mock_results[2]["date"].strftime(
             "%Y-%m-%d"
         )
+
+    def test_numpy_engine_is_identical(self):
+        pandas_prediction = self.weather_aqi_analyzer.predict_best_outdoor_sports_day(
+            engine="pandas"
+        )
+        numpy_prediction = self.weather_aqi_analyzer.predict_best_outdoor_sports_day(
+            engine="numpy"
+        )
+
+        assert json.dumps(numpy_prediction) == json.dumps(pandas_prediction)
+
+    def test_numpy_engine_missing_weather(self):
+        # Without weather for Christmas, its weather values are None
+        self.weather_aqi_analyzer.set_weather_forecast(
+            [
+                weather
+                for weather in self.mock_weather_data
+                if weather["date"].date() != date(2024, 12, 25)
+            ]
+        )
+
+        pandas_prediction = self.weather_aqi_analyzer.predict_best_outdoor_sports_day(
+            engine="pandas"
+        )
+        numpy_prediction = self.weather_aqi_analyzer.predict_best_outdoor_sports_day(
+            engine="numpy"
+        )
+
+        assert json.dumps(numpy_prediction) == json.dumps(pandas_prediction)
+        assert any(day["temperature_2m_max"] is None for day in numpy_prediction)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            self.weather_aqi_analyzer.predict_best_outdoor_sports_day(engine="polars")
+
+    def test_predict_outdoor_sports_day_batch(self):
+        other_aqi_data = {
+            **self.mock_aqi_data,
+            "pm25_forecast": [
+                {**forecast, "avg": forecast["avg"] // 2}
+                for forecast in self.mock_aqi_data["pm25_forecast"]
+            ],
+        }
+
+        predictions = self.weather_aqi_analyzer.predict_best_outdoor_sports_day_batch(
+            [
+                (self.mock_weather_data, self.mock_aqi_data),
+                (self.mock_weather_data, other_aqi_data),
+            ]
+        )
+
+        assert len(predictions) == 2
+
+        for prediction, aqi_data in zip(
+            predictions, [self.mock_aqi_data, other_aqi_data]
+        ):
+            self.weather_aqi_analyzer.set_air_quality_forecast(aqi_data)
+            expected = self.weather_aqi_analyzer.predict_best_outdoor_sports_day()
+
+            assert json.dumps(prediction) == json.dumps(expected)
+
+        assert predictions[0][0]["date"] == self.mock_results[0]["date"].strftime(
+            "%Y-%m-%d"
+        )
+
+    def test_predict_outdoor_sports_day_top_k(self):
+        prediction = self.weather_aqi_analyzer.predict_best_outdoor_sports_day()
+
+        for engine in WeatherAQIAnalyzer.engines:
+            for top_k in [1, 3, len(prediction) + 1]:
+                top_days = self.weather_aqi_analyzer.predict_best_outdoor_sports_day(
+                    engine=engine, top_k=top_k
+                )
+
+                assert json.dumps(top_days) == json.dumps(prediction[:top_k])
+
+        batch_prediction = (
+            self.weather_aqi_analyzer.predict_best_outdoor_sports_day_batch(
+                [(self.mock_weather_data, self.mock_aqi_data)], top_k=2
+            )
+        )
+
+        assert json.dumps(batch_prediction) == json.dumps([prediction[:2]])
+
+        with self.assertRaises(ValueError):
+            self.weather_aqi_analyzer.predict_best_outdoor_sports_day(top_k=0)
+
+    def test_predict_outdoor_sports_day_top_k_selects(self):
+        # Identical weather on every day, so most days tie on every key
+        self.weather_aqi_analyzer.set_weather_forecast(
+            [
+                {**weather, **self.mock_weather_data[0], "date": weather["date"]}
+                for weather in self.mock_weather_data
+            ]
+        )
+
+        for sport in [None, "running"]:
+            prediction = self.weather_aqi_analyzer.predict_best_outdoor_sports_day(
+                sport=sport
+            )
+
+            for engine in WeatherAQIAnalyzer.engines:
+                for top_k in range(1, len(prediction) + 1):
+                    # The k best days are selected without sorting all of them
+                    with patch.object(
+                        pd.DataFrame, "sort_values", side_effect=AssertionError
+                    ):
+                        top_days = (
+                            self.weather_aqi_analyzer.predict_best_outdoor_sports_day(
+                                engine=engine, top_k=top_k, sport=sport
+                            )
+                        )
+
+                    assert json.dumps(top_days) == json.dumps(prediction[:top_k])
+
+    def test_predict_outdoor_sports_day_sport(self):
+        pandas_prediction = self.weather_aqi_analyzer.predict_best_outdoor_sports_day(
+            sport="running"
+        )
+        numpy_prediction = self.weather_aqi_analyzer.predict_best_outdoor_sports_day(
+            engine="numpy", sport="running"
+        )
+
+        assert json.dumps(numpy_prediction) == json.dumps(pandas_prediction)
+
+        # Suitable days first, then by descending score
+        ranking = [(not day["suitable"], -day["score"]) for day in numpy_prediction]
+        assert ranking == sorted(ranking)
+
+        batch_prediction = (
+            self.weather_aqi_analyzer.predict_best_outdoor_sports_day_batch(
+                [(self.mock_weather_data, self.mock_aqi_data)], sport="running"
+            )
+        )
+
+        assert json.dumps(batch_prediction) == json.dumps([numpy_prediction])
+
+        with self.assertRaises(ValueError):
+            self.weather_aqi_analyzer.predict_best_outdoor_sports_day(sport="curling")
+
+    def test_predict_outdoor_sports_day_result_cache(self):
+        result_cache = AnalyzerResultCache()
+
+        analyzer = WeatherAQIAnalyzer(
+            weather_forecast=self.mock_weather_data,
+            air_quality_forecast=self.mock_aqi_data,
+            result_cache=result_cache,
+        )
+        analyzer._get_today = self.weather_aqi_analyzer._get_today
+        analyzer._rank_days_pandas = MagicMock(wraps=analyzer._rank_days_pandas)
+
+        first = analyzer.predict_best_outdoor_sports_day()
+        second = analyzer.predict_best_outdoor_sports_day()
+
+        assert json.dumps(first) == json.dumps(second)
+        assert analyzer._rank_days_pandas.call_count == 1
+        assert result_cache.stats()["hits"] == 1
+
+        # The same forecast collected again: only fields the ranking does not
+        # read differ
+        analyzer.set_air_quality_forecast(
+            {
+                **self.mock_aqi_data,
+                "datetime": datetime(2024, 12, 20, 13, 0),
+                "aqi": 1,
+                "city": "Bogotá",
+                "o3_forecast": [],
+                "uvi_forecast": [],
+            }
+        )
+        analyzer.predict_best_outdoor_sports_day()
+
+        assert analyzer._rank_days_pandas.call_count == 1
+        assert result_cache.stats()["hits"] == 2
+
+        # Other PM values, options, engines, breakpoints and days are separate
+        # entries
+        pm25_forecast = [
+            dict(forecast) for forecast in self.mock_aqi_data["pm25_forecast"]
+        ]
+        pm25_forecast[0]["avg"] += 1
+        analyzer.set_air_quality_forecast(
+            {**self.mock_aqi_data, "pm25_forecast": pm25_forecast}
+        )
+        analyzer.predict_best_outdoor_sports_day()
+        analyzer.set_air_quality_forecast(self.mock_aqi_data)
+
+        analyzer.predict_best_outdoor_sports_day(top_k=1)
+        analyzer.predict_best_outdoor_sports_day(engine="numpy")
+
+        analyzer._aqi_calculator = AQICalculator()
+        analyzer._aqi_calculator.set_pm25_breakpoints(
+            {
+                **analyzer._aqi_calculator.get_pm25_breakpoints(),
+                "Good": {"Range": [0.0, 9.0], "AQI": [0, 40]},
+            }
+        )
+        analyzer.predict_best_outdoor_sports_day()
+        analyzer._aqi_calculator = self.weather_aqi_analyzer._aqi_calculator
+
+        analyzer._get_today = MagicMock(return_value=date(2024, 12, 21))
+        analyzer.predict_best_outdoor_sports_day()
+
+        assert analyzer._rank_days_pandas.call_count == 5
+        assert result_cache.stats()["misses"] == 6
+
+    def test_update_location(self):
+        analyzer = WeatherAQIAnalyzer()
+        analyzer._get_today = self.weather_aqi_analyzer._get_today
+
+        state = analyzer.update_location(
+            "Bogota", self.mock_weather_data, self.mock_aqi_data
+        )
+        calculated_days = state.calculated_days
+
+        assert json.dumps(analyzer.predict_location("Bogota")) == json.dumps(
+            self.weather_aqi_analyzer.predict_best_outdoor_sports_day(engine="numpy")
+        )
+
+        # A new weather forecast does not recalculate any AQI
+        weather_data = [
+            {**weather, "precipitation_hours": 0.0}
+            for weather in self.mock_weather_data
+        ]
+        analyzer.update_location("Bogota", weather_forecast=weather_data)
+
+        assert state.calculated_days == calculated_days
+
+        # A changed PM value only recalculates the AQI of its date
+        pm25_forecast = [
+            dict(forecast) for forecast in self.mock_aqi_data["pm25_forecast"]
+        ]
+        pm25_forecast[0]["avg"] = 5
+        aqi_data = {**self.mock_aqi_data, "pm25_forecast": pm25_forecast}
+
+        analyzer.update_location("Bogota", air_quality_forecast=aqi_data)
+
+        assert state.calculated_days == calculated_days + 1
+
+        self.weather_aqi_analyzer.set_weather_forecast(weather_data)
+        self.weather_aqi_analyzer.set_air_quality_forecast(aqi_data)
+
+        assert json.dumps(analyzer.predict_location("Bogota", top_k=2)) == json.dumps(
+            self.weather_aqi_analyzer.predict_best_outdoor_sports_day(top_k=2)
+        )
+
+        analyzer.remove_location("Bogota")
+
+        assert analyzer.get_locations() == []
+
+        with self.assertRaises(KeyError):
+            analyzer.predict_location("Bogota")
+
+    def test_update_location_updates_day_table(self):
+        analyzer = WeatherAQIAnalyzer()
+        analyzer._get_today = self.weather_aqi_analyzer._get_today
+
+        state = analyzer.update_location(
+            "Bogota", self.mock_weather_data, self.mock_aqi_data
+        )
+        analyzer.predict_location("Bogota")
+
+        day_table = state._day_table
+
+        # New weather of one date
+        weather_data = [dict(weather) for weather in self.mock_weather_data]
+        weather_data[2]["precipitation_hours"] = 5.0
+
+        # Worse air on the worst date, which keeps the order of the dates by AQI
+        worst = state._aqi_categorized[-1]["date"]
+        pm25_forecast = [
+            (
+                {**forecast, "avg": forecast["avg"] + 50}
+                if forecast["date"].date() == worst
+                else forecast
+            )
+            for forecast in self.mock_aqi_data["pm25_forecast"]
+        ]
+        aqi_data = {**self.mock_aqi_data, "pm25_forecast": pm25_forecast}
+
+        with patch.object(
+            type(day_table), "add_location", autospec=True
+        ) as add_location:
+            analyzer.update_location("Bogota", weather_data, aqi_data)
+            prediction = analyzer.predict_location("Bogota")
+
+        add_location.assert_not_called()
+        assert state._day_table is day_table
+
+        self.weather_aqi_analyzer.set_weather_forecast(weather_data)
+        self.weather_aqi_analyzer.set_air_quality_forecast(aqi_data)
+
+        assert json.dumps(prediction) == json.dumps(
+            self.weather_aqi_analyzer.predict_best_outdoor_sports_day()
+        )
+
+        # The best date becoming the worst reorders the rows, so they are rebuilt
+        best = state._aqi_categorized[0]["date"]
+        pm25_forecast = [
+            {**forecast, "avg": 500} if forecast["date"].date() == best else forecast
+            for forecast in pm25_forecast
+        ]
+        aqi_data = {**aqi_data, "pm25_forecast": pm25_forecast}
+
+        analyzer.update_location("Bogota", air_quality_forecast=aqi_data)
+        prediction = analyzer.predict_location("Bogota")
+
+        assert state._day_table is not day_table
+
+        self.weather_aqi_analyzer.set_air_quality_forecast(aqi_data)
+
+        assert json.dumps(prediction) == json.dumps(
+            self.weather_aqi_analyzer.predict_best_outdoor_sports_day()
+        )
@@ -0,0 +1,125 @@
+"""
+Decoding of AQICN feed data: the former validation by key walks followed by
+strptime on every forecast element, against the single-pass decoding of
+AirQualityDataCollector. The test_aqicn_json_response.json fixture is scaled
+to longer forecasts by repeating its days over the following weeks.
+
+Run from the root directory with
+    python -m components.data_collectors.benchmarks.aqicn_decode_benchmark
+"""
+
+from components.data_collectors.src.air_quality_data_collector import (
+    AirQualityDataCollector,
+)
+from datetime import datetime, timedelta
+import copy
+import json
+import time
+import os
+
+SCALES = [1, 10, 100]
+REPEAT = 200
+
+_fixture_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "tests",
+    "test_aqicn_json_response.json",
+)
+
+
+def load_fixture() -> dict:
+    with open(_fixture_path, "r") as file:
+        data = json.load(file)
+
+    return data.get("data", data)
+
+
+def scale(data: dict, factor: int) -> dict:
+    """The fixture with its forecast days repeated factor times."""
+    scaled = copy.deepcopy(data)
+
+    for pollutant, elements in data["forecast"]["daily"].items():
+        scaled_elements = []
+
+        for repetition in range(factor):
+            for element in elements:
+                day = datetime.strptime(element["day"], "%Y-%m-%d")
+                day += timedelta(days=7 * repetition)
+                scaled_elements.append({**element, "day": day.strftime("%Y-%m-%d")})
+
+        scaled["forecast"]["daily"][pollutant] = scaled_elements
+
+    return scaled
+
+
+def decode_former(data: dict) -> dict:
+    """Validation and processing as AirQualityDataCollector did before."""
+    for key in ["aqi", "city", "dominentpol", "time", "forecast"]:
+        if key not in data:
+            raise ValueError(
+                "Data from AQICN does not align with excpeted data format."
+            )
+
+    for key in ["geo", "name"]:
+        if key not in data["city"]:
+            raise ValueError(
+                "Data from AQICN does not align with excpeted data format."
+            )
+
+    for key in ["o3", "pm25", "pm10", "uvi"]:
+        if key not in data["forecast"]["daily"]:
+            raise ValueError(
+                "Data from AQICN does not align with excpeted data format."
+            )
+
+    result = {
+        "city": data["city"]["name"],
+        "latitude": data["city"]["geo"][0],
+        "longitude": data["city"]["geo"][1],
+        "datetime": datetime.now(),
+        "aqi": data["aqi"],
+        "dominentpol": data["dominentpol"],
+    }
+
+    for pollutant in ["pm25", "pm10", "o3", "uvi"]:
+        result[f"{pollutant}_forecast"] = [
+            {
+                "avg": element["avg"],
+                "date": datetime.strptime(element["day"], "%Y-%m-%d"),
+            }
+            for element in data["forecast"]["daily"][pollutant]
+        ]
+
+    return result
+
+
+def measure(decode, data: dict) -> float:
+    start = time.perf_counter()
+
+    for _ in range(REPEAT):
+        decode(data)
+
+    return (time.perf_counter() - start) / REPEAT
+
+
+def main():
+    data = load_fixture()
+
+    print(f"{'days':>6} {'former/us':>10} {'single pass/us':>15} {'speedup':>8}")
+
+    for factor in SCALES:
+        scaled = scale(data, factor)
+        days = len(scaled["forecast"]["daily"]["pm25"])
+
+        former = measure(decode_former, scaled)
+        single_pass = measure(AirQualityDataCollector._process_data, scaled)
+
+        print(
+            f"{days:>6} {former * 1e6:>10.1f} {single_pass * 1e6:>15.1f} "
+            f"{former / single_pass:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Hit rate of the forecast cache for requests from points spread over a city,
+keyed by exact coordinates as the HTTP cache does against keyed by grid cell.
+Points are GPS fixes rounded to 4 decimals (about 11 m) within a square of
+city_size degrees around the city center.
+
+Run from the root directory with
+    python -m components.data_collectors.benchmarks.grid_forecast_cache_benchmark
+"""
+
+from components.data_collectors.src.grid_forecast_cache import GridForecastCache
+from components.data_collectors.src.weather_data_collector import DAILY_VARIABLES
+import random
+
+REQUESTS = 10_000
+CITY_SIZES = [0.05, 0.2, 0.5]
+CENTER = (4.6097, -74.0817)
+
+
+def hit_rate(keys: list) -> float:
+    seen = set()
+    hits = 0
+
+    for key in keys:
+        hits += key in seen
+        seen.add(key)
+
+    return hits / len(keys)
+
+
+def main():
+    rng = random.Random(0)
+    cache = GridForecastCache()
+
+    print(f"{'city size':>10} {'exact hit rate':>15} {'grid hit rate':>14}")
+
+    for city_size in CITY_SIZES:
+        points = [
+            (
+                round(CENTER[0] + rng.uniform(-city_size, city_size) / 2, 4),
+                round(CENTER[1] + rng.uniform(-city_size, city_size) / 2, 4),
+            )
+            for _ in range(REQUESTS)
+        ]
+
+        exact = hit_rate([(*point, tuple(DAILY_VARIABLES)) for point in points])
+        grid = hit_rate([cache.make_key(*point, DAILY_VARIABLES) for point in points])
+
+        print(f"{city_size:>10} {exact:>15.3f} {grid:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
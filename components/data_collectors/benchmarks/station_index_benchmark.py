@@ -0,0 +1,73 @@
+"""
+Nearest AQICN station lookups in the local StationIndex, against a linear scan
+over all stations. AQICN lists about 20000 stations worldwide, the benchmark
+indexes as many random stations over Europe.
+
+Run from the root directory with
+    python -m components.data_collectors.benchmarks.station_index_benchmark
+"""
+
+from components.data_collectors.src.station_index import (
+    Station,
+    StationIndex,
+    distance_km,
+)
+import tempfile
+import random
+import time
+import os
+
+STATIONS = 20000
+LOOKUPS = 2000
+BOUNDS = (35.0, -25.0, 72.0, 45.0)
+
+
+def main():
+    random_ = random.Random(1)
+    south, west, north, east = BOUNDS
+
+    stations = [
+        Station(uid, random_.uniform(south, north), random_.uniform(west, east), "")
+        for uid in range(STATIONS)
+    ]
+    points = [
+        (random_.uniform(40.0, 65.0), random_.uniform(-10.0, 30.0))
+        for _ in range(LOOKUPS)
+    ]
+
+    start = time.perf_counter()
+    index = StationIndex(stations, BOUNDS)
+    build = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stations.json")
+        index.save(path)
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        StationIndex.load(path)
+        load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for latitude, longitude in points:
+        index.nearest(latitude, longitude)
+    lookup = (time.perf_counter() - start) / LOOKUPS
+
+    scan_points = points[:50]
+    start = time.perf_counter()
+    for latitude, longitude in scan_points:
+        min(
+            stations,
+            key=lambda s: distance_km(latitude, longitude, s.latitude, s.longitude),
+        )
+    scan = (time.perf_counter() - start) / len(scan_points)
+
+    print(f"stations:     {STATIONS}")
+    print(f"build:        {build * 1000:.0f} ms")
+    print(f"saved index:  {size / 2**20:.1f} MiB, loaded in {load * 1000:.0f} ms")
+    print(f"lookup:       {lookup * 1e6:.1f} us")
+    print(f"linear scan:  {scan * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Concurrent daily forecast requests through the blocking WeatherDataCollector,
+as the weather collector server used to call it from its async endpoints,
+against the AsyncWeatherDataCollector. The upstream is a local HTTP server
+that answers every request with the mocked Open-Meteo response after a fixed
+latency. Besides the wall time, the worst delay of a 5 ms heartbeat task shows
+how long the event loop was blocked.
+
+Run from the root directory with
+    python -m components.data_collectors.benchmarks.weather_collector_benchmark
+"""
+
+from components.data_collectors.src.async_weather_data_collector import (
+    AsyncWeatherDataCollector,
+)
+from components.data_collectors.src.weather_data_collector import WeatherDataCollector
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import asyncio
+import pickle
+import time
+import os
+
+CONCURRENCY = [1, 10, 50]
+LATENCY = 0.05
+HEARTBEAT = 0.005
+
+_mock_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "tests",
+    "weather_api_mock_daily.pkl",
+)
+
+with open(_mock_path, "rb") as file:
+    CONTENT = pickle.load(file)[0]._tab.Bytes
+
+
+class UpstreamServer(ThreadingHTTPServer):
+
+    # Connections beyond the backlog are retried by the client after a second
+    request_queue_size = 128
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(CONTENT)))
+        self.end_headers()
+        self.wfile.write(CONTENT)
+
+    def log_message(self, *args):
+        pass
+
+
+def blocking_collector(url: str) -> WeatherDataCollector:
+    # In-memory response cache by default, like the async collector
+    collector = WeatherDataCollector()
+    collector.url = url
+
+    return collector
+
+
+async def heartbeat(stop: asyncio.Event, delays: list):
+    loop = asyncio.get_running_loop()
+
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(HEARTBEAT)
+        delays.append(loop.time() - start - HEARTBEAT)
+
+
+async def run(fetch, requests: int, offset: int):
+    stop = asyncio.Event()
+    delays = [0.0]
+    beat = asyncio.create_task(heartbeat(stop, delays))
+
+    # Distinct coordinates, so no request is answered from the cache
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[fetch(float(offset + index) / 100, 0.0) for index in range(requests)]
+    )
+    seconds = time.perf_counter() - start
+
+    stop.set()
+    await beat
+
+    return seconds, max(delays)
+
+
+async def main():
+    server = UpstreamServer(("127.0.0.1", 0), UpstreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/forecast"
+
+    blocking = blocking_collector(url)
+    collector = AsyncWeatherDataCollector()
+    collector.url = url
+
+    async def fetch_blocking(latitude: float, longitude: float):
+        return blocking.get_weather_data(latitude, longitude)
+
+    print(f"{'requests':>9} {'collector':>10} {'total/ms':>9} {'max loop lag/ms':>16}")
+
+    offset = 0
+
+    for requests in CONCURRENCY:
+        for name, fetch in [
+            ("blocking", fetch_blocking),
+            ("async", collector.get_weather_data),
+        ]:
+            seconds, lag = await run(fetch, requests, offset)
+            offset += requests
+
+            print(f"{requests:>9} {name:>10} {seconds * 1e3:>9.1f} {lag * 1e3:>16.1f}")
+
+    await collector.aclose()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Allocations and time of decoding one daily Open-Meteo response: the former
+DataFrame based decoding against the column arrays, the lazy record view and
+the records built from the columns. Allocations are the peak traced by
+tracemalloc while decoding one response.
+
+Run from the root directory with
+    python -m components.data_collectors.benchmarks.weather_decode_benchmark
+"""
+
+from components.data_collectors.src.weather_data_collector import (
+    DAILY_VARIABLES,
+    WeatherDataCollector,
+)
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+import tracemalloc
+import pickle
+import time
+import os
+import pandas as pd
+
+REPEAT = 2_000
+
+_mock_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "tests",
+    "weather_api_mock_daily.pkl",
+)
+
+with open(_mock_path, "rb") as file:
+    CONTENT = pickle.load(file)[0]._tab.Bytes
+
+
+def decode_dataframe(response: WeatherApiResponse) -> list:
+    """The decoding of WeatherDataCollector before the column arrays."""
+    daily = response.Daily()
+
+    daily_data = {
+        "date": pd.date_range(
+            start=pd.to_datetime(daily.Time(), unit="s", utc=True),
+            end=pd.to_datetime(daily.TimeEnd(), unit="s", utc=True),
+            freq=pd.Timedelta(seconds=daily.Interval()),
+            inclusive="left",
+        )
+    }
+
+    for index, variable in enumerate(DAILY_VARIABLES):
+        daily_data[variable] = daily.Variables(index).ValuesAsNumpy()
+
+    return pd.DataFrame(data=daily_data).to_dict(orient="records")
+
+
+def decode_columns(response: WeatherApiResponse):
+    return WeatherDataCollector._process_columns(response)
+
+
+def decode_lazy_records(response: WeatherApiResponse):
+    # Only the first day is turned into a dict
+    return WeatherDataCollector._process_columns(response).records()[0]
+
+
+def decode_records(response: WeatherApiResponse) -> list:
+    return WeatherDataCollector._process_response(response)
+
+
+def measure(decode) -> tuple:
+    # Warm up caches of pandas and numpy before tracing
+    decode(WeatherApiResponse.GetRootAs(CONTENT, 4))
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    decode(WeatherApiResponse.GetRootAs(CONTENT, 4))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+
+    for _ in range(REPEAT):
+        decode(WeatherApiResponse.GetRootAs(CONTENT, 4))
+
+    seconds = (time.perf_counter() - start) / REPEAT
+
+    return peak, seconds
+
+
+def main():
+    print(f"{'decoding':>14} {'peak bytes':>11} {'per response/us':>16}")
+
+    for name, decode in [
+        ("dataframe", decode_dataframe),
+        ("columns", decode_columns),
+        ("lazy records", decode_lazy_records),
+        ("records", decode_records),
+    ]:
+        peak, seconds = measure(decode)
+
+        print(f"{name:>14} {peak:>11} {seconds * 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,19 @@
-from typing import TypedDict, List
+from typing import AsyncIterator, TypedDict, List, Sequence, Tuple, Union
 from datetime import datetime
+from functools import lru_cache
+import asyncio
 import httpx
 from dotenv import load_dotenv
 import os
+from components.data_collectors.src.coordinates_collector import (
+    CoordinatesCollector,
+    normalize_city,
+)
+from components.data_collectors.src.rate_limiter import TokenBucket
+from components.data_collectors.src.station_index import StationIndex
+from components.data_gateways.src.station_resolution_gateway import (
+    StationResolutionGateway,
+)
 
 
 class AirQualityForecast(TypedDict):
@@ -23,9 +34,37 @@ class AirQualityData(TypedDict):
     uvi_forecast: List[AirQualityForecast]
 
 
+# A city name or a (latitude, longitude) point
+Location = Union[str, Tuple[float, float]]
+
+
+class AirQualityBatchResult(TypedDict):
+    index: int
+    data: AirQualityData | None
+    error: str | None
+
+
+# Pollutants with a daily forecast, in the order of the result
+_POLLUTANTS = ["pm25", "pm10", "o3", "uvi"]
+
+
+@lru_cache(maxsize=1024)
+def _parse_day(day: str) -> datetime:
+    # All pollutants of a response, and all responses of a week, share few days
+    return datetime.strptime(day, "%Y-%m-%d")
+
+
 class AirQualityDataCollector:
 
-    def __init__(self):
+    def __init__(
+        self,
+        station_resolutions: StationResolutionGateway | None = None,
+        station_index: StationIndex | None = None,
+        client: httpx.AsyncClient | None = None,
+        rate_limiter: TokenBucket | None = None,
+        max_concurrency: int = 10,
+        hedged_lookups: bool = False,
+    ):
         # Dynamically determine the absolute path to the .env file
         base_dir = os.path.dirname(os.path.abspath(__file__))
         env_path = os.path.join(base_dir, "../../../.env")
@@ -34,6 +73,27 @@ class AirQualityDataCollector:
 
         self.AQICN_TOKEN = os.getenv("AQICN_TOKEN")
 
+        self.station_resolutions = station_resolutions
+        self.station_index = station_index
+
+        # Without a client every request opens its own connection
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self._concurrency = asyncio.Semaphore(max_concurrency)
+
+        # Whether cities are geocoded while the city feed is still pending
+        self.hedged_lookups = hedged_lookups
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
     async def get_air_quality_data(self, city: str) -> AirQualityData | None:
         if not isinstance(city, str):
             raise TypeError("City must be a string.")
@@ -43,15 +103,186 @@ class AirQualityDataCollector:
         if self._check_unkown_station(data):
             return None
 
-        if not self._validate_air_quality_data(data):
-            raise ValueError(
-                "Data from AQICN does not align with excpeted data format."
-            )
-
         result = self._process_data(data, city=city)
 
         return result
 
+    async def get_air_quality_data_many(
+        self,
+        locations: Sequence[Location],
+        coordinates_collector: CoordinatesCollector | None = None,
+    ) -> AsyncIterator[AirQualityBatchResult]:
+        """
+        Air quality of many cities and points, yielded as each one completes
+        rather than in order. All requests share the concurrency bound and the
+        rate limiter of the collector. A location that fails yields its error
+        instead of failing the others.
+
+        With a coordinates_collector, cities AQICN does not know are looked up
+        by their coordinates as in get_air_quality_data_for_city.
+        """
+
+        async def collect(index: int, location: Location) -> AirQualityBatchResult:
+            try:
+                if isinstance(location, str) and coordinates_collector is not None:
+                    data = await self.get_air_quality_data_for_city(
+                        location, coordinates_collector
+                    )
+                elif isinstance(location, str):
+                    data = await self.get_air_quality_data(location)
+                else:
+                    latitude, longitude = location
+                    data = await self.get_air_quality_data_by_coords(
+                        float(latitude), float(longitude)
+                    )
+            except (httpx.HTTPError, KeyError, TypeError, ValueError) as e:
+                return {"index": index, "data": None, "error": str(e)}
+
+            return {"index": index, "data": data, "error": None}
+
+        tasks = [
+            asyncio.ensure_future(collect(index, location))
+            for index, location in enumerate(locations)
+        ]
+
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield await completed
+        finally:
+            # A consumer that stops early leaves no requests behind
+            for task in tasks:
+                task.cancel()
+
+    async def get_air_quality_data_for_city(
+        self, city: str, coordinates_collector: CoordinatesCollector
+    ) -> AirQualityData | None:
+        """
+        Air quality at the AQICN station of a city or, for a city AQICN does not
+        know, at the coordinates of the city. That takes up to three upstream
+        calls, the city feed, the geocoder and the geo feed. With
+        station_resolutions the outcome is kept per city, so a repeat takes one
+        call, and none for a city neither AQICN nor the geocoder knows. With
+        hedged_lookups a city that is not resolved yet is geocoded right away.
+        """
+        if not isinstance(city, str):
+            raise TypeError("City must be a string.")
+
+        key = normalize_city(city)
+        resolution = None
+
+        if self.station_resolutions is not None:
+            resolution = self.station_resolutions.get_resolution(key)
+
+        if resolution is not None:
+            if resolution.kind == "unknown":
+                return None
+
+            if resolution.kind == "coordinates":
+                return await self.get_air_quality_data_by_coords(
+                    resolution.latitude, resolution.longitude
+                )
+
+            data = await self._make_request(f"@{resolution.station}")
+
+            if not self._check_unkown_station(data):
+                return self._process_data(data, city=city)
+
+            # The station is gone, the city is resolved again
+
+        if self.hedged_lookups:
+            return await self._resolve_city_hedged(city, key, coordinates_collector)
+
+        result, station = await self._get_by_city_feed(city)
+
+        if result is not None:
+            self._remember_station(key, station)
+            return result
+
+        result, coords = await self._get_by_geocoding(city, coordinates_collector)
+        self._remember_coordinates(key, coords)
+
+        return result
+
+    async def _resolve_city_hedged(
+        self, city: str, key: str, coordinates_collector: CoordinatesCollector
+    ) -> AirQualityData | None:
+        """
+        Starts the geocoder and geo feed alongside the city feed instead of
+        after it, so a city AQICN does not know costs the slower of the two
+        lookups instead of three round trips in a row. The city feed still
+        decides: once it finds the station the geocoding lookup is cancelled,
+        so results are the same as without hedging. The speculative calls do
+        count against the AQICN quota.
+        """
+        city_lookup = asyncio.ensure_future(self._get_by_city_feed(city))
+        geocoding_lookup = asyncio.ensure_future(
+            self._get_by_geocoding(city, coordinates_collector)
+        )
+
+        # A lookup that failed after the other one decided is not of interest
+        for lookup in (city_lookup, geocoding_lookup):
+            lookup.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        try:
+            result, station = await city_lookup
+
+            if result is not None:
+                self._remember_station(key, station)
+                return result
+
+            result, coords = await geocoding_lookup
+            self._remember_coordinates(key, coords)
+
+            return result
+        finally:
+            city_lookup.cancel()
+            geocoding_lookup.cancel()
+
+    async def _get_by_city_feed(
+        self, city: str
+    ) -> Tuple[AirQualityData | None, str | None]:
+        """
+        The air quality and station uid of a city, None if AQICN does not know
+        the city.
+        """
+        data = await self._make_request(city)
+
+        if self._check_unkown_station(data):
+            return None, None
+
+        station = str(data["idx"]) if "idx" in data else None
+
+        return self._process_data(data, city=city), station
+
+    async def _get_by_geocoding(
+        self, city: str, coordinates_collector: CoordinatesCollector
+    ) -> Tuple[AirQualityData | None, Tuple[float, float] | None]:
+        """
+        The air quality at the coordinates of a city and the coordinates, None
+        if the geocoder does not know the city.
+        """
+        coords = await coordinates_collector.get_coordinates(city)
+
+        if not coords:
+            return None, None
+
+        latitude, longitude = coords
+
+        return await self.get_air_quality_data_by_coords(latitude, longitude), coords
+
+    def _remember_station(self, key: str, station: str | None):
+        if self.station_resolutions is not None and station is not None:
+            self.station_resolutions.set_station(key, station)
+
+    def _remember_coordinates(self, key: str, coords: Tuple[float, float] | None):
+        if self.station_resolutions is None:
+            return
+
+        if coords:
+            self.station_resolutions.set_coordinates(key, *coords)
+        else:
+            self.station_resolutions.set_unknown(key)
+
     async def get_air_quality_data_by_coords(
         self, latitude: float, longitude: float
     ) -> AirQualityData | None:
@@ -62,16 +293,20 @@ class AirQualityDataCollector:
         elif longitude > 180 or longitude < -180:
             raise ValueError("Latitude must be a float between -180 and 180.")
 
-        data = await self._make_request(latitude=latitude, longitude=longitude)
+        station = None
+
+        if self.station_index is not None:
+            station = self.station_index.nearest(latitude, longitude)
+
+        if station is not None:
+            # The station AQICN would find for the coordinates, found locally
+            data = await self._make_request(f"@{station.uid}")
+        else:
+            data = await self._make_request(latitude=latitude, longitude=longitude)
 
         if self._check_unkown_station(data):
             return None
 
-        if not self._validate_air_quality_data(data):
-            raise ValueError(
-                "Data from AQICN does not align with excpeted data format."
-            )
-
         result = self._process_data(data)
 
         return result
@@ -91,8 +326,15 @@ class AirQualityDataCollector:
                 "Either 'city' or both 'latitude' and 'longitude' must be provided"
             )
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10)
+        async with self._concurrency:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+
+            if self.client is not None:
+                response = await self.client.get(url, timeout=10)
+            else:
+                async with httpx.AsyncClient() as client:
+                    response = await client.get(url, timeout=10)
 
         if 400 <= response.status_code < 500:
             raise httpx.HTTPStatusError(
@@ -122,60 +364,41 @@ class AirQualityDataCollector:
         else:
             return False
 
-    def _validate_air_quality_data(self, data: dict) -> bool:
+    @staticmethod
+    def _process_data(data, city: str = None) -> AirQualityData:
+        """
+        Validates and converts the AQICN data in one pass. Only the fields that
+        end up in the result are read, the attributions, current readings and
+        forecast minimums and maximums are never touched.
+        """
         if not isinstance(data, dict):
             raise TypeError(
                 f"Expected 'data' to be a dictionary, got {type(data).__name__}"
             )
 
-        keys = ["aqi", "city", "dominentpol", "time", "forecast"]
-
-        for key in keys:
-            if key not in data:
-                return False
-
-        city_keys = ["geo", "name"]
-
-        for key in city_keys:
-            if key not in data["city"]:
-                return False
-
-        forecast_keys = ["o3", "pm25", "pm10", "uvi"]
-
-        for key in forecast_keys:
-            if key not in data["forecast"]["daily"]:
-                return False
-
-        return True
-
-    @staticmethod
-    def _process_data(data, city: str = None) -> AirQualityData:
-        if city is None:
-            city = data["city"]["name"]
-
-        result: AirQualityData = {
-            "city": city,  # AQICN returns cities in local script
-            "latitude": data["city"]["geo"][0],
-            "longitude": data["city"]["geo"][1],
-            "datetime": datetime.now(),
-            "aqi": data["aqi"],
-            "dominentpol": data["dominentpol"],
-        }
-
-        pollutants = ["pm25", "pm10", "o3", "uvi"]
-
-        for pollutant in pollutants:
-            forecasts = []
-
-            for element in data["forecast"]["daily"][pollutant]:
-                forecast: AirQualityForecast = {
-                    "avg": element["avg"],
-                    "date": datetime.strptime(element["day"], "%Y-%m-%d"),
-                }
-
-                forecasts.append(forecast)
-
-            result[f"{pollutant}_forecast"] = forecasts
+        try:
+            station = data["city"]
+            latitude, longitude = station["geo"][0], station["geo"][1]
+            daily = data["forecast"]["daily"]
+
+            result: AirQualityData = {
+                "city": station["name"] if city is None else city,
+                "latitude": latitude,
+                "longitude": longitude,
+                "datetime": datetime.now(),
+                "aqi": data["aqi"],
+                "dominentpol": data["dominentpol"],
+            }
+
+            for pollutant in _POLLUTANTS:
+                result[f"{pollutant}_forecast"] = [
+                    {"avg": element["avg"], "date": _parse_day(element["day"])}
+                    for element in daily[pollutant]
+                ]
+        except (KeyError, IndexError, TypeError) as e:
+            raise ValueError(
+                "Data from AQICN does not align with excpeted data format."
+            ) from e
 
         return result
 
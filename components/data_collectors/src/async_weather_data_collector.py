@@ -0,0 +1,260 @@
+from components.data_collectors.src.weather_data_collector import (
+    DAILY_VARIABLES,
+    DailyColumns,
+    HourlyWeather,
+    OpenMeteoMixin,
+    WeatherForecast,
+)
+from components.data_collectors.src.grid_forecast_cache import GridForecastCache
+from components.data_collectors.src.response_cache import (
+    MemoryResponseCache,
+    ResponseCache,
+)
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+from typing import List, Optional, Sequence, Tuple, Union
+import asyncio
+import httpx
+
+"""
+Non-blocking Open-Meteo client. Requests are built and responses decoded by the
+OpenMeteoMixin it shares with WeatherDataCollector, only the transport differs:
+a pooled httpx.AsyncClient instead of requests, retries that sleep with asyncio
+instead of blocking the event loop, and a response cache whose disk I/O runs in
+a thread.
+"""
+
+
+class AsyncWeatherDataCollector(OpenMeteoMixin):
+
+    # Status codes retried like retry_requests does for the blocking client
+    status_to_retry = (500, 502, 504)
+
+    def __init__(
+        self,
+        forecast_cache: Optional[GridForecastCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        retries: int = 5,
+        backoff_factor: float = 0.2,
+    ):
+        """
+        :response_cache: Backend for the raw responses, a MemoryResponseCache
+        if not set.
+        """
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=10,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+
+        if response_cache is None:
+            response_cache = MemoryResponseCache()
+
+        self.client = client
+        self.response_cache = response_cache
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.forecast_cache = forecast_cache
+
+    async def get_weather_data(
+        self,
+        latitude: float,
+        longitude: float,
+        current: str = "temperature_2m",
+        daily: [str] = DAILY_VARIABLES,
+        only_current: bool = False,
+        as_columns: bool = False,
+    ) -> Union[float, List[WeatherForecast], DailyColumns]:
+
+        self._validate_coordinates(latitude, longitude)
+
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "current": current,
+            "timezone": "auto",
+        }
+
+        if only_current:
+            responses = await self._make_request(params)
+
+            return responses[0].Current().Variables(0).Value()
+
+        if self.forecast_cache is not None:
+            forecasts = await self.get_weather_data_many(
+                [(latitude, longitude)], daily, as_columns
+            )
+
+            return forecasts[0]
+
+        params["daily"] = daily
+
+        responses = await self._make_request(params)
+
+        if as_columns:
+            return self._process_columns(responses[0], daily)
+
+        return self._process_data(responses, daily)
+
+    async def get_weather_data_many(
+        self,
+        coords: Sequence[Tuple[float, float]],
+        daily: [str] = DAILY_VARIABLES,
+        as_columns: bool = False,
+    ) -> Union[List[List[WeatherForecast]], List[DailyColumns]]:
+        """
+        :return: The daily forecasts of every location, in the order of coords,
+        as DailyColumns if as_columns.
+
+        The chunks of max_locations_per_request locations are fetched
+        concurrently. With a forecast cache, only grid cells that are not
+        cached are fetched.
+        """
+        for latitude, longitude in coords:
+            self._validate_coordinates(latitude, longitude)
+
+        keys, forecasts, requested = self._lookup_forecasts(coords, daily)
+        fetched = await self._fetch_columns(list(requested.values()), daily)
+
+        return self._store_forecasts(
+            keys, forecasts, dict(zip(requested, fetched)), as_columns
+        )
+
+    async def _fetch_columns(
+        self, coords: Sequence[Tuple[float, float]], daily: List[str]
+    ) -> List[DailyColumns]:
+        chunks = []
+
+        for start in range(0, len(coords), self.max_locations_per_request):
+            end = start + self.max_locations_per_request
+            chunks.append(coords[start:end])
+
+        chunk_responses = await asyncio.gather(
+            *[
+                self._make_request(
+                    {
+                        "latitude": [latitude for latitude, _ in chunk],
+                        "longitude": [longitude for _, longitude in chunk],
+                        "daily": daily,
+                        "timezone": "auto",
+                    }
+                )
+                for chunk in chunks
+            ]
+        )
+
+        results = []
+
+        for chunk, responses in zip(chunks, chunk_responses):
+            if len(responses) != len(chunk):
+                raise ValueError(
+                    f"Expected {len(chunk)} responses, got {len(responses)}."
+                )
+
+            results.extend(
+                self._process_columns(response, daily) for response in responses
+            )
+
+        return results
+
+    async def get_hourly_weather_data(
+        self,
+        latitude: float,
+        longitude: float,
+        hourly: List[str] = ["temperature_2m", "precipitation"],
+        air_quality_hourly: List[str] = ["pm2_5", "pm10"],
+        forecast_days: int = 7,
+    ) -> List[HourlyWeather]:
+        """
+        Like WeatherDataCollector.get_hourly_weather_data, with the weather and
+        the air quality requests in flight at the same time.
+        """
+        self._validate_coordinates(latitude, longitude)
+
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "hourly": hourly,
+            "timezone": "auto",
+            "forecast_days": forecast_days,
+        }
+
+        if not air_quality_hourly:
+            responses = await self._make_request(params)
+
+            return self._process_hourly_data(responses, hourly)
+
+        responses, air_quality_responses = await asyncio.gather(
+            self._make_request(params),
+            self._make_request(
+                {**params, "hourly": air_quality_hourly}, url=self.air_quality_url
+            ),
+            return_exceptions=True,
+        )
+
+        if isinstance(responses, BaseException):
+            raise responses
+
+        hourly_data = self._process_hourly_data(responses, hourly)
+
+        if isinstance(air_quality_responses, ValueError):
+            air_quality_data = []
+        elif isinstance(air_quality_responses, BaseException):
+            raise air_quality_responses
+        else:
+            air_quality_data = self._process_hourly_data(
+                air_quality_responses, air_quality_hourly
+            )
+
+        return self._merge_air_quality(
+            hourly_data, air_quality_data, air_quality_hourly
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def _make_request(
+        self, params: dict, url: Optional[str] = None
+    ) -> List[WeatherApiResponse]:
+        request_url = self._request_url(params, url)
+
+        if self.response_cache.blocking:
+            content = await asyncio.to_thread(self.response_cache.get, request_url)
+        else:
+            content = self.response_cache.get(request_url)
+
+        if content is None:
+            content = await self._fetch(request_url)
+
+            if self.response_cache.blocking:
+                await asyncio.to_thread(self.response_cache.set, request_url, content)
+            else:
+                self.response_cache.set(request_url, content)
+
+        return self._decode(content)
+
+    async def _fetch(self, url: str) -> bytes:
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+
+            try:
+                response = await self.client.get(url)
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code in (400, 429):
+                    raise ValueError("Bad request: Check your parameters.")
+
+                if response.status_code not in self.status_to_retry or last_attempt:
+                    response.raise_for_status()
+                    return response.content
+
+            # Yields to the event loop instead of blocking it
+            await asyncio.sleep(self.backoff_factor * 2**attempt)
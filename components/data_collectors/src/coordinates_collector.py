@@ -1,30 +1,58 @@
+from components.data_gateways.src.geocoding_gateway import GeocodingGateway
 from typing import Tuple
+import unicodedata
 import httpx
 
+GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+
+
+def normalize_city(city: str) -> str:
+    """Spellings of a city that differ in Unicode form, case or spacing are equal."""
+    return " ".join(unicodedata.normalize("NFKC", city).split()).casefold()
+
 
 class CoordinatesCollector:
 
-    def __init__(self):
-        pass
+    def __init__(self, cache: GeocodingGateway | None = None):
+        # Without a cache every lookup asks the geocoder
+        self.cache = cache
 
     async def get_coordinates(self, city_name: str) -> [Tuple[float, float]]:
         # API Documentation here: https://open-meteo.com/en/docs/geocoding-api
         if not isinstance(city_name, str):
             raise ValueError("City not found. Check your input.")
 
-        url = f"https://geocoding-api.open-meteo.com/v1/search?name={city_name}"
-        "&count=1&language=en&format=json"
+        key = normalize_city(city_name)
+
+        if self.cache is not None:
+            record = self.cache.get_geocoding(key)
+
+            if record is not None:
+                if record.latitude is None:
+                    return None
+
+                return (record.latitude, record.longitude)
+
+        # Only the best match is used, the geocoder has no field selection
+        params = {"name": city_name, "count": 1, "language": "en", "format": "json"}
 
         async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10)
+            response = await client.get(GEOCODING_URL, params=params, timeout=10)
 
         try:
             results = response.json()["results"][0]
-        except KeyError:
+        except (KeyError, IndexError):
+            # Only a successful answer without results means the city is unknown
+            if self.cache is not None and response.status_code == 200:
+                self.cache.set_not_found(key)
+
             return None
 
         latitude = results["latitude"]
         longitude = results["longitude"]
 
+        if self.cache is not None:
+            self.cache.set_coordinates(key, latitude, longitude)
+
         # (latitude, longitude) tuple is fairly standard
         return (latitude, longitude)
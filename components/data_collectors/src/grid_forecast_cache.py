@@ -0,0 +1,146 @@
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence, Tuple, TypedDict
+import threading
+import math
+import time
+
+"""
+Forecast cache keyed by forecast model grid cell instead of exact coordinates.
+Open-Meteo answers a point with the forecast of the grid cell around it, so
+points a few hundred meters apart get the same forecast and can share an entry.
+"""
+
+# (cell row, cell column, daily variables)
+GridKey = Tuple[int, int, Tuple[str, ...]]
+
+
+class ForecastCacheStats(TypedDict):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class GridForecastCache:
+    """
+    Size-bounded LRU cache of forecasts per grid cell and variable set.
+
+    Entries expire when the next model run becomes available instead of after
+    a fixed time, runs start every update_interval seconds from 00 UTC and are
+    available update_delay seconds later. The defaults follow the 6 hourly runs,
+    which Open-Meteo publishes about 4 hours after they start, and the ~0.1
+    degree grid of the global models it blends. Until a run is published the
+    previous one is served, so an entry must not expire at the run start.
+
+    Forecasts are requested for the center of the cell, so every point of a
+    cell gets the same forecast regardless of which point missed first.
+    """
+
+    def __init__(
+        self,
+        resolution: float = 0.1,
+        update_interval: float = 6 * 3600,
+        update_delay: float = 4 * 3600,
+        maxsize: int = 4096,
+        clock: Callable[[], float] = time.time,
+    ):
+        if resolution <= 0:
+            raise ValueError("resolution must be positive.")
+        if update_interval <= 0:
+            raise ValueError("update_interval must be positive.")
+        if update_delay < 0:
+            raise ValueError("update_delay must not be negative.")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+
+        self.resolution = resolution
+        self.update_interval = update_interval
+        self.update_delay = update_delay
+        self.maxsize = maxsize
+
+        # The clock is wall time, model runs are aligned to UTC
+        self._clock = clock
+
+        # Cells around the globe, so longitudes -180 and 180 share a cell
+        self._columns = max(round(360 / resolution), 1)
+
+        # Key -> (expiry time, forecast), least recently used first
+        self._entries: OrderedDict[GridKey, Tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = math.floor(latitude / self.resolution + 0.5)
+        column = math.floor(longitude / self.resolution + 0.5) % self._columns
+
+        return row, column
+
+    def snap(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        """The center of the cell of a point, as the coordinates to request."""
+        row, column = self.cell(latitude, longitude)
+
+        center_latitude = min(max(row * self.resolution, -90.0), 90.0)
+        center_longitude = column * self.resolution
+
+        if center_longitude >= 180:
+            center_longitude -= 360
+
+        return round(center_latitude, 6), round(center_longitude, 6)
+
+    def make_key(
+        self, latitude: float, longitude: float, variables: Sequence[str]
+    ) -> GridKey:
+        return (*self.cell(latitude, longitude), tuple(variables))
+
+    def get(self, key: GridKey) -> Optional[object]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+
+            return entry[1]
+
+    def put(self, key: GridKey, forecast):
+        """Forecasts are shared between callers and must not be modified."""
+        with self._lock:
+            self._entries[key] = (self._next_update(), forecast)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> ForecastCacheStats:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def _next_update(self) -> float:
+        runs = math.floor((self._clock() - self.update_delay) / self.update_interval)
+
+        return (runs + 1) * self.update_interval + self.update_delay
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,76 @@
+from typing import Callable, Optional, TypedDict
+import asyncio
+import time
+
+
+class RateLimiterStats(TypedDict):
+    rate: float
+    capacity: float
+    acquired: int
+    delayed: int
+    waited: float
+
+
+class TokenBucket:
+    """
+    Token bucket for an upstream request quota. The bucket holds up to capacity
+    tokens and refills at rate tokens per second, every request takes one.
+
+    A request that finds the bucket empty reserves the next token and sleeps
+    until it is due, so waiting requests are served in arrival order and no
+    window of time sees more than capacity + rate * seconds requests.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+
+        capacity = rate if capacity is None else capacity
+
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+
+        self._tokens = capacity
+        self._updated = clock()
+
+        self._acquired = 0
+        self._delayed = 0
+        self._waited = 0.0
+
+    async def acquire(self):
+        now = self._clock()
+
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+        # Negative tokens are reservations of requests that wait
+        self._tokens -= 1
+        self._acquired += 1
+
+        if self._tokens < 0:
+            wait = -self._tokens / self.rate
+
+            self._delayed += 1
+            self._waited += wait
+
+            await asyncio.sleep(wait)
+
+    def stats(self) -> RateLimiterStats:
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "acquired": self._acquired,
+            "delayed": self._delayed,
+            "waited": self._waited,
+        }
@@ -0,0 +1,477 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple, TypedDict
+import threading
+import tempfile
+import hashlib
+import struct
+import mmap
+import time
+import os
+
+"""
+Bounded caches of raw Open-Meteo response bodies. All backends share the
+interface of ResponseCache: entries live for ttl seconds, the total size of the
+bodies never exceeds max_bytes, and evictions are counted in the stats.
+"""
+
+# Expiry time of a disk entry, in front of the body
+_DISK_HEADER = struct.Struct("<d")
+
+
+class ResponseCacheStats(TypedDict):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    max_bytes: int
+
+
+class ResponseCache(ABC):
+    """
+    Base of the response cache backends. Subclasses store the entries and
+    evict when a new body does not fit into max_bytes anymore.
+
+    Times are wall clock times, as disk entries outlive the process.
+    """
+
+    # Whether get and set do I/O an event loop should not wait for
+    blocking = False
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float = 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1.")
+
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        content = self._get(key, self._clock())
+
+        with self._stats_lock:
+            if content is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+
+        return content
+
+    def set(self, key: str, content: bytes):
+        # A body larger than the whole cache would evict everything for nothing
+        if len(content) > self.max_bytes:
+            return
+
+        evictions = self._set(key, content, self._clock() + self.ttl)
+
+        with self._stats_lock:
+            self._evictions += evictions
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Removes the entry of a key, if there is one."""
+
+    @abstractmethod
+    def clear(self):
+        """Removes all entries."""
+
+    def stats(self) -> ResponseCacheStats:
+        entries, size = self._size()
+
+        with self._stats_lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+            }
+
+    @abstractmethod
+    def _get(self, key: str, now: float) -> Optional[bytes]:
+        """The body of a key that has not expired by now, else None."""
+
+    @abstractmethod
+    def _set(self, key: str, content: bytes, expiry: float) -> int:
+        """Stores a body and returns the number of evicted entries."""
+
+    @abstractmethod
+    def _size(self) -> Tuple[int, int]:
+        """The number of entries and the total size of their bodies."""
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache with a byte budget."""
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 2**20,
+        ttl: float = 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(max_bytes, ttl, clock)
+
+        # Key -> (expiry time, body), least recently used first
+        self._entries: OrderedDict[str, Tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def delete(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+            if entry is not None:
+                self._bytes -= len(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _get(self, key: str, now: float) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            if entry[0] <= now:
+                del self._entries[key]
+                self._bytes -= len(entry[1])
+                return None
+
+            self._entries.move_to_end(key)
+
+            return entry[1]
+
+    def _set(self, key: str, content: bytes, expiry: float) -> int:
+        evictions = 0
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+
+            if previous is not None:
+                self._bytes -= len(previous[1])
+
+            self._entries[key] = (expiry, content)
+            self._bytes += len(content)
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                evictions += 1
+
+        return evictions
+
+    def _size(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+class _DiskShard:
+    """One directory of a ShardedDiskResponseCache with its own lock and LRU."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+        # File name -> file size, least recently used first. Files of earlier
+        # processes are taken over oldest first.
+        self.files: OrderedDict[str, int] = OrderedDict()
+        self.bytes = 0
+
+        existing = [
+            entry
+            for entry in os.scandir(directory)
+            if entry.is_file() and entry.name.endswith(".bin")
+        ]
+
+        for entry in sorted(existing, key=lambda entry: entry.stat().st_mtime_ns):
+            self.files[entry.name] = entry.stat().st_size
+            self.bytes += entry.stat().st_size
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def forget(self, name: str):
+        size = self.files.pop(name, None)
+
+        if size is not None:
+            self.bytes -= size
+
+    def remove(self, name: str):
+        self.forget(name)
+
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+
+class ShardedDiskResponseCache(ResponseCache):
+    """
+    On-disk cache with one file per entry, spread over shard directories by the
+    hash of the key. Each shard has its own lock and an equal part of the byte
+    budget, evicting its least recently used files. Sizes include the header.
+
+    Workers can share a directory. Each one only accounts for the files it
+    wrote or read, so the budget holds per worker.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 2**20,
+        ttl: float = 3600,
+        shards: int = 16,
+        clock: Callable[[], float] = time.time,
+    ):
+        if shards < 1:
+            raise ValueError("shards must be at least 1.")
+
+        super().__init__(max_bytes, ttl, clock)
+
+        self.directory = directory
+        self._shards = [
+            _DiskShard(os.path.join(directory, f"{shard:02x}"), max_bytes // shards)
+            for shard in range(shards)
+        ]
+
+    def delete(self, key: str):
+        shard, name = self._locate(key)
+
+        with shard.lock:
+            shard.remove(name)
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                for name in list(shard.files):
+                    shard.remove(name)
+
+    def _locate(self, key: str) -> Tuple[_DiskShard, str]:
+        digest = hashlib.blake2b(key.encode(), digest_size=20).hexdigest()
+
+        return self._shards[int(digest[:8], 16) % len(self._shards)], f"{digest}.bin"
+
+    def _get(self, key: str, now: float) -> Optional[bytes]:
+        shard, name = self._locate(key)
+
+        with shard.lock:
+            try:
+                with open(shard.path(name), "rb") as file:
+                    data = file.read()
+            except FileNotFoundError:
+                shard.forget(name)
+                return None
+
+            (expiry,) = _DISK_HEADER.unpack_from(data)
+
+            if expiry <= now:
+                shard.remove(name)
+                return None
+
+            if name not in shard.files:
+                shard.bytes += len(data)
+
+            shard.files[name] = len(data)
+            shard.files.move_to_end(name)
+
+            header = _DISK_HEADER.size
+            return data[header:]
+
+    def _set(self, key: str, content: bytes, expiry: float) -> int:
+        shard, name = self._locate(key)
+        size = _DISK_HEADER.size + len(content)
+
+        # A body larger than its shard is not stored
+        if size > shard.max_bytes:
+            return 0
+
+        evictions = 0
+
+        with shard.lock:
+            shard.forget(name)
+
+            while shard.files and shard.bytes + size > shard.max_bytes:
+                shard.remove(next(iter(shard.files)))
+                evictions += 1
+
+            # Written to a temporary file first, so readers never see half a body
+            temporary = shard.path(f"{name}.{os.getpid()}.tmp")
+
+            with open(temporary, "wb") as file:
+                file.write(_DISK_HEADER.pack(expiry))
+                file.write(content)
+
+            os.replace(temporary, shard.path(name))
+
+            shard.files[name] = size
+            shard.bytes += size
+
+        return evictions
+
+    def _size(self) -> Tuple[int, int]:
+        entries = 0
+        size = 0
+
+        for shard in self._shards:
+            with shard.lock:
+                entries += len(shard.files)
+                size += shard.bytes
+
+        return entries, size
+
+
+class MmapResponseCache(ResponseCache):
+    """
+    Cache of bodies in a memory-mapped ring buffer of max_bytes, so the bodies
+    live in the page cache instead of the Python heap. Bodies are appended at
+    the head of the ring and overwrite the oldest entries, eviction is first in,
+    first out. The index is kept in memory, the file does not outlive the
+    process.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 2**20,
+        ttl: float = 3600,
+        path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(max_bytes, ttl, clock)
+
+        if path is None:
+            self._file = tempfile.TemporaryFile()
+        else:
+            self._file = open(path, "w+b")
+
+        self._file.truncate(max_bytes)
+        self._mmap = mmap.mmap(self._file.fileno(), max_bytes)
+
+        # Key -> (offset, length, expiry time), in ring order from the head on
+        self._entries: OrderedDict[str, Tuple[int, int, float]] = OrderedDict()
+        self._head = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._forget(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._head = 0
+            self._bytes = 0
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _get(self, key: str, now: float) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            offset, length, expiry = entry
+
+            if expiry <= now:
+                self._forget(key)
+                return None
+
+            # A copy, the region is overwritten once the ring comes around
+            end = offset + length
+            return self._mmap[offset:end]
+
+    def _set(self, key: str, content: bytes, expiry: float) -> int:
+        evictions = 0
+
+        with self._lock:
+            self._forget(key)
+
+            if self._head + len(content) > self.max_bytes:
+                # Entries behind the head are the oldest ones, they are dropped
+                # so the ring order of the index starts at the head again
+                for stale in [
+                    stale
+                    for stale, (offset, _, _) in self._entries.items()
+                    if offset >= self._head
+                ]:
+                    self._forget(stale)
+                    evictions += 1
+
+                self._head = 0
+
+            start = self._head
+            end = start + len(content)
+
+            while self._entries:
+                oldest, (offset, _, _) = next(iter(self._entries.items()))
+
+                if offset >= end or offset < start:
+                    break
+
+                self._forget(oldest)
+                evictions += 1
+
+            self._mmap[start:end] = content
+            self._entries[key] = (start, len(content), expiry)
+            self._head = end
+            self._bytes += len(content)
+
+        return evictions
+
+    def _size(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+def make_response_cache(
+    backend: str = "memory",
+    max_bytes: int = 64 * 2**20,
+    ttl: float = 3600,
+    path: Optional[str] = None,
+) -> ResponseCache:
+    """
+    :backend: "memory", "disk" or "mmap". The disk backend stores its shards in
+    the directory path, the mmap backend maps the file path or a temporary file.
+    """
+    if backend == "memory":
+        return MemoryResponseCache(max_bytes=max_bytes, ttl=ttl)
+    if backend == "disk":
+        if path is None:
+            raise ValueError("The disk response cache needs a directory.")
+
+        return ShardedDiskResponseCache(path, max_bytes=max_bytes, ttl=ttl)
+    if backend == "mmap":
+        return MmapResponseCache(max_bytes=max_bytes, ttl=ttl, path=path)
+
+    raise ValueError(
+        f"Unknown response cache backend: {backend}. Use memory, disk or mmap."
+    )
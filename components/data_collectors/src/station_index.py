@@ -0,0 +1,365 @@
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple
+from loguru import logger
+import httpx
+import json
+import math
+import time
+import re
+import os
+
+"""
+Local index of the AQICN stations in a bounding box. AQICN answers a geo feed
+with its nearest station, the index finds that station without a request, so
+only the feed of the station itself is fetched.
+"""
+
+MAP_BOUNDS_URL = "https://api.waqi.info/v2/map/bounds"
+
+EARTH_RADIUS_KM = 6371.0088
+
+# (south, west, north, east) in degrees
+Bounds = Tuple[float, float, float, float]
+
+_INDEX_VERSION = 1
+
+
+class Station(NamedTuple):
+    uid: int
+    latitude: float
+    longitude: float
+    name: str
+
+
+def distance_km(
+    latitude: float, longitude: float, other_latitude: float, other_longitude: float
+) -> float:
+    """Great circle distance by the haversine formula."""
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    d_phi = other_phi - phi
+    d_lambda = math.radians(other_longitude - longitude)
+
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi) * math.cos(other_phi) * math.sin(d_lambda / 2) ** 2
+    )
+
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    phi, lambda_ = math.radians(latitude), math.radians(longitude)
+
+    return (
+        math.cos(phi) * math.cos(lambda_),
+        math.cos(phi) * math.sin(lambda_),
+        math.sin(phi),
+    )
+
+
+class StationIndex:
+    """
+    KD-tree of stations on the unit sphere. Straight-line distance between
+    points of the sphere grows with their great circle distance, so the nearest
+    point of the tree is the nearest station, also across the antimeridian.
+
+    The tree is implicit: stations are kept in an order where the median of
+    every range splits it along the axis of its depth. Saving the stations in
+    that order saves the tree, loading needs no rebuild.
+    """
+
+    def __init__(
+        self,
+        stations: List[Station],
+        bounds: Bounds,
+        built_at: Optional[float] = None,
+        ordered: bool = False,
+    ):
+        south, west, north, east = bounds
+
+        if not (-90 <= south < north <= 90) or not (-180 <= west < east <= 180):
+            raise ValueError("Bounds must be south, west, north, east in degrees.")
+
+        self.bounds = bounds
+        self.built_at = time.time() if built_at is None else built_at
+
+        points = [
+            _unit_vector(station.latitude, station.longitude) for station in stations
+        ]
+        order = list(range(len(stations)))
+
+        if not ordered:
+            self._build(order, points, 0, len(order), 0)
+
+        self.stations = [stations[i] for i in order]
+        self._points = [points[i] for i in order]
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def nearest(self, latitude: float, longitude: float) -> Optional[Station]:
+        """
+        The station nearest to a point, or None if the index can not tell: the
+        point is outside the bounds, or a station outside the bounds could be
+        nearer than the nearest one inside.
+        """
+        if not self.stations:
+            return None
+
+        edge = self._distance_to_edge_km(latitude, longitude)
+
+        if edge is None:
+            return None
+
+        best = [math.inf, -1]
+        self._search(_unit_vector(latitude, longitude), 0, len(self._points), 0, best)
+
+        station = self.stations[best[1]]
+
+        if distance_km(latitude, longitude, station.latitude, station.longitude) > edge:
+            return None
+
+        return station
+
+    def save(self, path: str):
+        index = {
+            "version": _INDEX_VERSION,
+            "bounds": list(self.bounds),
+            "built_at": self.built_at,
+            "stations": [list(station) for station in self.stations],
+        }
+
+        # Written to a temporary file first, so readers never see half an index
+        temporary = f"{path}.{os.getpid()}.tmp"
+
+        with open(temporary, "w") as file:
+            json.dump(index, file, separators=(",", ":"))
+
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "StationIndex":
+        with open(path, "r") as file:
+            index = json.load(file)
+
+        if index.get("version") != _INDEX_VERSION:
+            raise ValueError(f"Unsupported station index version in {path}.")
+
+        return cls(
+            [Station(*station) for station in index["stations"]],
+            tuple(index["bounds"]),
+            built_at=index["built_at"],
+            ordered=True,
+        )
+
+    @classmethod
+    async def fetch(
+        cls,
+        bounds: Bounds,
+        token: str,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> "StationIndex":
+        """
+        Builds the index from the map bounds endpoint. The response lists every
+        station in the box and can be megabytes large, it is decoded station by
+        station as it arrives instead of being held as a whole.
+        """
+        south, west, north, east = bounds
+        params = {"latlng": f"{south},{west},{north},{east}", "token": token}
+
+        own_client = client is None
+
+        if own_client:
+            client = httpx.AsyncClient()
+
+        stations = []
+
+        try:
+            async with client.stream(
+                "GET", MAP_BOUNDS_URL, params=params, timeout=60
+            ) as response:
+                response.raise_for_status()
+
+                async for item in iter_array_items(response.aiter_text(), "data"):
+                    station = _parse_station(item)
+
+                    if station is not None:
+                        stations.append(station)
+        finally:
+            if own_client:
+                await client.aclose()
+
+        logger.info(f"Indexed {len(stations)} AQICN stations in {bounds}")
+
+        return cls(stations, bounds)
+
+    def _distance_to_edge_km(
+        self, latitude: float, longitude: float
+    ) -> Optional[float]:
+        south, west, north, east = self.bounds
+
+        if not (south <= latitude <= north and west <= longitude <= east):
+            return None
+
+        # The nearest point of a parallel is on the meridian of the point, the
+        # distance to a meridian is shorter than along the parallel
+        cos_phi = math.cos(math.radians(latitude))
+
+        def to_meridian(d_lambda: float) -> float:
+            d_lambda = math.radians(min(d_lambda, 90.0))
+            return EARTH_RADIUS_KM * math.asin(min(1.0, math.sin(d_lambda) * cos_phi))
+
+        return min(
+            EARTH_RADIUS_KM * math.radians(latitude - south),
+            EARTH_RADIUS_KM * math.radians(north - latitude),
+            to_meridian(longitude - west),
+            to_meridian(east - longitude),
+        )
+
+    @classmethod
+    def _build(cls, order: List[int], points, start: int, end: int, depth: int):
+        if end - start <= 1:
+            return
+
+        axis = depth % 3
+        order[start:end] = sorted(order[start:end], key=lambda i: points[i][axis])
+
+        middle = (start + end) // 2
+        cls._build(order, points, start, middle, depth + 1)
+        cls._build(order, points, middle + 1, end, depth + 1)
+
+    def _search(self, target, start: int, end: int, depth: int, best: list):
+        if start >= end:
+            return
+
+        middle = (start + end) // 2
+        point = self._points[middle]
+
+        squared = (
+            (point[0] - target[0]) ** 2
+            + (point[1] - target[1]) ** 2
+            + (point[2] - target[2]) ** 2
+        )
+
+        if squared < best[0]:
+            best[0] = squared
+            best[1] = middle
+
+        difference = target[depth % 3] - point[depth % 3]
+
+        if difference < 0:
+            near, far = (start, middle), (middle + 1, end)
+        else:
+            near, far = (middle + 1, end), (start, middle)
+
+        self._search(target, *near, depth + 1, best)
+
+        # The other side can only be nearer if the splitting plane is
+        if difference**2 < best[0]:
+            self._search(target, *far, depth + 1, best)
+
+
+def _parse_station(item) -> Optional[Station]:
+    try:
+        return Station(
+            int(item["uid"]),
+            float(item["lat"]),
+            float(item["lon"]),
+            item.get("station", {}).get("name", ""),
+        )
+    except (KeyError, TypeError, ValueError):
+        # Stations without a position can not be found by position
+        return None
+
+
+async def iter_array_items(chunks: AsyncIterator[str], key: str) -> AsyncIterator:
+    """
+    Yields the items of the array under key of a JSON object, each as soon as
+    it arrived completely. Only the text of the item being decoded is buffered.
+    Raises ValueError if key holds no array, with the message AQICN sent.
+    """
+    decoder = json.JSONDecoder()
+    prefix = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+
+    buffer = ""
+    in_array = False
+    done = False
+
+    async for chunk in chunks:
+        buffer += chunk
+
+        if not in_array:
+            match = prefix.search(buffer)
+
+            if match is None:
+                continue
+
+            in_array = True
+            start = match.end()
+            buffer = buffer[start:]
+
+        position = 0
+
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+
+            if position == len(buffer):
+                break
+
+            if buffer[position] == "]":
+                done = True
+                break
+
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The item has not arrived completely yet
+                break
+
+            yield item
+
+        buffer = buffer[position:]
+
+        if done:
+            return
+
+    if not in_array:
+        try:
+            message = json.loads(buffer).get(key)
+        except (json.JSONDecodeError, AttributeError):
+            message = buffer[:200]
+
+        raise ValueError(f"AQICN sent no stations: {message}")
+
+    raise ValueError("The AQICN station list ended before it was complete.")
+
+
+async def load_station_index(
+    path: Optional[str],
+    bounds: Bounds,
+    token: str,
+    max_age: float = 24 * 3600,
+    client: Optional[httpx.AsyncClient] = None,
+) -> StationIndex:
+    """
+    The index saved at path if it has the bounds and is younger than max_age
+    seconds, else a freshly fetched one, which is saved at path.
+    """
+    if path is not None and os.path.exists(path):
+        try:
+            index = StationIndex.load(path)
+
+            if (
+                tuple(index.bounds) == tuple(bounds)
+                and time.time() - index.built_at < max_age
+            ):
+                return index
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring the station index at {path}: {e}")
+
+    index = await StationIndex.fetch(bounds, token, client=client)
+
+    if path is not None:
+        index.save(path)
+
+    return index
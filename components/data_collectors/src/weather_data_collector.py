@@ -1,11 +1,29 @@
+from components.data_collectors.src.grid_forecast_cache import GridForecastCache
+from components.data_collectors.src.response_cache import (
+    MemoryResponseCache,
+    ResponseCache,
+)
 import openmeteo_requests
 from openmeteo_requests.Client import OpenMeteoRequestsError
 import requests_cache
 from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
 from retry_requests import retry
-from typing import Union, TypedDict, List
-from datetime import datetime
+from typing import (
+    Dict,
+    Hashable,
+    Iterator,
+    Union,
+    TypedDict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from collections.abc import Sequence as SequenceABC
+from datetime import datetime, timedelta, timezone
+import numpy as np
 import pandas as pd
+import httpx
 
 """
 API handling as described in https://open-meteo.com/en/docs
@@ -20,30 +38,201 @@ class WeatherForecast(TypedDict):
     precipitation_hours: float
 
 
-class WeatherDataCollector:
+class HourlyWeather(TypedDict):
+    date: datetime
+    temperature_2m: float
+    precipitation: float
+    pm2_5: Optional[float]
+    pm10: Optional[float]
+
+
+DAILY_VARIABLES = [
+    "weather_code",
+    "temperature_2m_max",
+    "sunshine_duration",
+    "precipitation_hours",
+]
+
+
+class DailyColumns:
+    """
+    Daily variables of one location as column arrays. The value arrays are
+    float32 views into the response buffer, nothing is copied on decoding.
+    """
+
+    def __init__(self, dates: np.ndarray, columns: Dict[str, np.ndarray]):
+        # UTC start of every day as datetime64[s]
+        self.dates = dates
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, variable: str) -> np.ndarray:
+        return self.columns[variable]
+
+    def records(self) -> "DailyRecords":
+        """A lazy record view, each day becomes a dict only when accessed."""
+        return DailyRecords(self)
+
+    def to_records(self) -> List[WeatherForecast]:
+        seconds = self.dates.astype(np.int64).tolist()
+        values = {
+            variable: column.tolist() for variable, column in self.columns.items()
+        }
+
+        records = []
+
+        for row, second in enumerate(seconds):
+            record = {"date": pd.Timestamp(second, unit="s", tz="UTC")}
+
+            for variable, column in values.items():
+                record[variable] = column[row]
+
+            records.append(record)
+
+        return records
+
+    def to_structured(self) -> np.ndarray:
+        """The days as a NumPy structured array with one field per variable."""
+        structured = np.empty(
+            len(self),
+            dtype=[("date", "datetime64[s]")]
+            + [(variable, column.dtype) for variable, column in self.columns.items()],
+        )
+        structured["date"] = self.dates
+
+        for variable, column in self.columns.items():
+            structured[variable] = column
+
+        return structured
+
+
+class DailyRecords(SequenceABC):
+    """Records of DailyColumns, shaped like the dicts of get_weather_data."""
+
+    def __init__(self, columns: DailyColumns):
+        self._columns = columns
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[row] for row in range(len(self))[index]]
+
+        row = range(len(self))[index]
+        second = int(self._columns.dates[row].astype(np.int64))
+
+        record = {"date": pd.Timestamp(second, unit="s", tz="UTC")}
+
+        for variable, column in self._columns.columns.items():
+            record[variable] = float(column[row])
+
+        return record
+
+    def __iter__(self) -> Iterator[WeatherForecast]:
+        return iter(self._columns.to_records())
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SequenceABC):
+            return NotImplemented
+
+        return list(self) == list(other)
+
+
+class OpenMeteoMixin:
+    """
+    Request URLs, forecast cache lookups and response decoding of the Open-Meteo
+    API. None of it does I/O, so the blocking and the asynchronous collector
+    share it and only implement the requests. Collectors set forecast_cache.
+    """
 
     url = "https://api.open-meteo.com/v1/forecast"
+    air_quality_url = "https://air-quality-api.open-meteo.com/v1/air-quality"
 
-    def __init__(self):
-        # Set up the Open-Meteo API client with cache and retry on error
-        cache_session = requests_cache.CachedSession(".cache", expire_after=3600)
-        retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-        self.openmeteo = openmeteo_requests.Client(session=retry_session)
+    # Locations per request of get_weather_data_many. Open-Meteo answers each
+    # location of a request with its own response, but every location counts
+    # towards the API limits and long coordinate lists make long URLs.
+    max_locations_per_request = 100
 
-    def get_weather_data(
+    forecast_cache: Optional[GridForecastCache] = None
+
+    def _lookup_forecasts(
+        self, coords: Sequence[Tuple[float, float]], daily: List[str]
+    ) -> Tuple[
+        List[Hashable],
+        Dict[Hashable, DailyColumns],
+        Dict[Hashable, Tuple[float, float]],
+    ]:
+        """
+        :return: The key of every location, the cached forecasts by key, and the
+        coordinates to request by key for every key that is not cached. Without
+        a forecast cache, every location is its own key and is requested.
+        """
+        if self.forecast_cache is None:
+            keys = list(range(len(coords)))
+
+            return keys, {}, dict(zip(keys, coords))
+
+        keys = []
+        forecasts = {}
+        requested = {}
+
+        for latitude, longitude in coords:
+            key = self.forecast_cache.make_key(latitude, longitude, daily)
+            keys.append(key)
+
+            # Locations in the same cell are looked up and requested once
+            if key in forecasts or key in requested:
+                continue
+
+            forecast = self.forecast_cache.get(key)
+
+            if forecast is None:
+                requested[key] = self.forecast_cache.snap(latitude, longitude)
+            else:
+                forecasts[key] = forecast
+
+        return keys, forecasts, requested
+
+    def _store_forecasts(
         self,
-        latitude: float,
-        longitude: float,
-        current: str = "temperature_2m",
-        daily: [str] = [
-            "weather_code",
-            "temperature_2m_max",
-            "sunshine_duration",
-            "precipitation_hours",
-        ],
-        only_current: bool = False,
-    ) -> Union[float, List[WeatherForecast]]:
+        keys: List[Hashable],
+        forecasts: Dict[Hashable, DailyColumns],
+        fetched: Dict[Hashable, DailyColumns],
+        as_columns: bool,
+    ) -> Union[List[List[WeatherForecast]], List[DailyColumns]]:
+        if self.forecast_cache is not None:
+            for key, forecast in fetched.items():
+                self.forecast_cache.put(key, forecast)
+
+        forecasts = {**forecasts, **fetched}
 
+        # Records are built per location, so callers can modify them
+        return [
+            forecasts[key] if as_columns else forecasts[key].to_records()
+            for key in keys
+        ]
+
+    @staticmethod
+    def _merge_air_quality(
+        hourly_data: List[dict], air_quality_data: List[dict], variables: List[str]
+    ) -> List[dict]:
+        air_quality_by_date: Dict[datetime, dict] = {
+            record["date"]: record for record in air_quality_data
+        }
+
+        for record in hourly_data:
+            air_quality = air_quality_by_date.get(record["date"], {})
+
+            for variable in variables:
+                record[variable] = air_quality.get(variable)
+
+        return hourly_data
+
+    @staticmethod
+    def _validate_coordinates(latitude: float, longitude: float):
         if not isinstance(latitude, float) or not isinstance(longitude, float):
             raise TypeError("Latitude and longitude must be a float.")
         elif latitude > 90 or latitude < -90:
@@ -51,6 +240,156 @@ class WeatherDataCollector:
         elif longitude > 180 or longitude < -180:
             raise ValueError("Latitude must be a float between -180 and 180.")
 
+    def _request_url(self, params: dict, url: Optional[str] = None) -> str:
+        # The URL is the cache key, so both collectors must build it the same way
+        return str(
+            httpx.URL(url or self.url, params={**params, "format": "flatbuffers"})
+        )
+
+    @staticmethod
+    def _decode(content: bytes) -> List[WeatherApiResponse]:
+        # Length-prefixed flatbuffers messages, one per location
+        messages = []
+        position = 0
+
+        while position < len(content):
+            start = position + 4
+            length = int.from_bytes(content[position:start], "little")
+            messages.append(WeatherApiResponse.GetRootAs(content, start))
+            position = start + length
+
+        return messages
+
+    @staticmethod
+    def _process_hourly_data(
+        data: WeatherApiResponse, variables: List[str]
+    ) -> List[dict]:
+        response = data[0]
+
+        hourly = response.Hourly()
+        local_timezone = timezone(timedelta(seconds=response.UtcOffsetSeconds()))
+
+        times = np.arange(hourly.Time(), hourly.TimeEnd(), hourly.Interval())
+        dates = [
+            datetime.fromtimestamp(time, tz=local_timezone) for time in times.tolist()
+        ]
+
+        # Variables come back in the order they were requested
+        columns = {
+            variable: hourly.Variables(index).ValuesAsNumpy().tolist()
+            for index, variable in enumerate(variables)
+        }
+
+        hourly_data = []
+
+        for row, date in enumerate(dates):
+            record = {"date": date}
+
+            for variable, values in columns.items():
+                # Missing values are NaN
+                record[variable] = None if values[row] != values[row] else values[row]
+
+            hourly_data.append(record)
+
+        return hourly_data
+
+    @staticmethod
+    def _process_data(
+        data: WeatherApiResponse, variables: List[str] = DAILY_VARIABLES
+    ) -> list[dict]:
+        # Process first location, get_weather_data_many handles multiple locations
+        return OpenMeteoMixin._process_response(data[0], variables)
+
+    @staticmethod
+    def _process_response(
+        response: WeatherApiResponse,
+        variables: List[str] = DAILY_VARIABLES,
+        as_columns: bool = False,
+    ) -> Union[list[dict], DailyColumns]:
+        columns = OpenMeteoMixin._process_columns(response, variables)
+
+        return columns if as_columns else columns.to_records()
+
+    @staticmethod
+    def _process_columns(
+        response: WeatherApiResponse, variables: List[str] = DAILY_VARIABLES
+    ) -> DailyColumns:
+        daily = response.Daily()
+
+        if daily.VariablesLength() != len(variables):
+            raise ValueError(
+                f"Expected {len(variables)} daily variables, "
+                f"got {daily.VariablesLength()}."
+            )
+
+        dates = np.arange(
+            daily.Time(), daily.TimeEnd(), daily.Interval(), dtype=np.int64
+        ).astype("datetime64[s]")
+
+        # Variables come back in the order they were requested
+        columns = {
+            variable: daily.Variables(index).ValuesAsNumpy()
+            for index, variable in enumerate(variables)
+        }
+
+        return DailyColumns(dates, columns)
+
+    def process_external_data(self, data: WeatherApiResponse) -> list[dict]:
+        return self._process_data(data)
+
+
+class WeatherDataCollector(OpenMeteoMixin):
+
+    def __init__(
+        self,
+        forecast_cache: Optional[GridForecastCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+        sqlite_cache_name: Optional[str] = None,
+    ):
+        """
+        :response_cache: Backend for the raw responses, a MemoryResponseCache
+        if not set.
+        :sqlite_cache_name: Opt-in to cache the responses with requests_cache in
+        <sqlite_cache_name>.sqlite of the working directory instead.
+        """
+        if sqlite_cache_name is None:
+            session = None
+
+            if response_cache is None:
+                response_cache = MemoryResponseCache()
+        else:
+            if response_cache is not None:
+                raise ValueError(
+                    "Either a response_cache or a sqlite_cache_name can be set."
+                )
+
+            session = requests_cache.CachedSession(sqlite_cache_name, expire_after=3600)
+
+        # Set up the Open-Meteo API client with retry on error, a session is
+        # created if none is passed
+        retry_session = retry(session, retries=5, backoff_factor=0.2)
+        self.openmeteo = openmeteo_requests.Client(session=retry_session)
+        self.response_cache = response_cache
+
+        # Daily forecasts per grid cell, in front of the HTTP cache
+        self.forecast_cache = forecast_cache
+
+    def get_weather_data(
+        self,
+        latitude: float,
+        longitude: float,
+        current: str = "temperature_2m",
+        daily: [str] = DAILY_VARIABLES,
+        only_current: bool = False,
+        as_columns: bool = False,
+    ) -> Union[float, List[WeatherForecast], DailyColumns]:
+        """
+        :return: The current temperature if only_current, else the daily
+        forecast as records, or as DailyColumns if as_columns.
+        """
+
+        self._validate_coordinates(latitude, longitude)
+
         params = {
             "latitude": latitude,
             "longitude": longitude,
@@ -70,50 +409,147 @@ class WeatherDataCollector:
 
             return current_temperature_2m
 
+        if self.forecast_cache is not None:
+            # Cached forecasts are looked up and stored per grid cell
+            return self.get_weather_data_many(
+                [(latitude, longitude)], daily, as_columns
+            )[0]
+
         params["daily"] = daily
 
         responses = self._make_request(params)
 
-        daily_dict = self._process_data(responses)
+        if as_columns:
+            return self._process_columns(responses[0], daily)
+
+        daily_dict = self._process_data(responses, daily)
 
         return daily_dict
 
-    def _make_request(self, params: dict) -> List:
+    def get_weather_data_many(
+        self,
+        coords: Sequence[Tuple[float, float]],
+        daily: [str] = DAILY_VARIABLES,
+        as_columns: bool = False,
+    ) -> Union[List[List[WeatherForecast]], List[DailyColumns]]:
+        """
+        :return: The daily forecasts of every location, in the order of coords,
+        as DailyColumns if as_columns.
+
+        :coords: (latitude, longitude) pairs. They are fetched in chunks of
+        max_locations_per_request locations, one HTTP round trip per chunk.
+        With a forecast cache, only grid cells that are not cached are fetched.
+        """
+        for latitude, longitude in coords:
+            self._validate_coordinates(latitude, longitude)
+
+        keys, forecasts, requested = self._lookup_forecasts(coords, daily)
+        fetched = self._fetch_columns(list(requested.values()), daily)
+
+        return self._store_forecasts(
+            keys, forecasts, dict(zip(requested, fetched)), as_columns
+        )
+
+    def _fetch_columns(
+        self, coords: Sequence[Tuple[float, float]], daily: List[str]
+    ) -> List[DailyColumns]:
+        results = []
+
+        for start in range(0, len(coords), self.max_locations_per_request):
+            end = start + self.max_locations_per_request
+            chunk = coords[start:end]
+
+            params = {
+                "latitude": [latitude for latitude, _ in chunk],
+                "longitude": [longitude for _, longitude in chunk],
+                "daily": daily,
+                "timezone": "auto",
+            }
+
+            responses = self._make_request(params)
+
+            if len(responses) != len(chunk):
+                raise ValueError(
+                    f"Expected {len(chunk)} responses, got {len(responses)}."
+                )
+
+            # One response per location, in the order of the request
+            results.extend(
+                self._process_columns(response, daily) for response in responses
+            )
+
+        return results
+
+    def get_hourly_weather_data(
+        self,
+        latitude: float,
+        longitude: float,
+        hourly: List[str] = ["temperature_2m", "precipitation"],
+        air_quality_hourly: List[str] = ["pm2_5", "pm10"],
+        forecast_days: int = 7,
+    ) -> List[HourlyWeather]:
+        """
+        :return: One record per forecast hour with the hourly weather variables
+        and, where the air quality API covers the location, the hourly PM2.5 and
+        PM10 concentrations. Hours without air quality data have None instead.
+
+        The date of each hour is in the local time of the location.
+        """
+        self._validate_coordinates(latitude, longitude)
+
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "hourly": hourly,
+            "timezone": "auto",
+            "forecast_days": forecast_days,
+        }
+
+        responses = self._make_request(params)
+        hourly_data = self._process_hourly_data(responses, hourly)
+
+        if not air_quality_hourly:
+            return hourly_data
+
+        try:
+            air_quality_responses = self._make_request(
+                {**params, "hourly": air_quality_hourly}, url=self.air_quality_url
+            )
+            air_quality_data = self._process_hourly_data(
+                air_quality_responses, air_quality_hourly
+            )
+        except ValueError:
+            air_quality_data = []
+
+        return self._merge_air_quality(
+            hourly_data, air_quality_data, air_quality_hourly
+        )
+
+    def _make_request(self, params: dict, url: Optional[str] = None) -> List:
+        if self.response_cache is not None:
+            return self._make_cached_request(params, url)
+
         try:
-            responses = self.openmeteo.weather_api(self.url, params=params)
+            responses = self.openmeteo.weather_api(url or self.url, params=params)
             return responses
         except OpenMeteoRequestsError as e:
             raise ValueError("Bad request: Check your parameters.") from e
 
-    @staticmethod
-    def _process_data(data: WeatherApiResponse) -> list[dict]:
-        # Process first location. Add a for-loop for multiple locations or models
-        response = data[0]
+    def _make_cached_request(
+        self, params: dict, url: Optional[str] = None
+    ) -> List[WeatherApiResponse]:
+        request_url = self._request_url(params, url)
+        content = self.response_cache.get(request_url)
 
-        daily = response.Daily()
-        daily_weather_code = daily.Variables(0).ValuesAsNumpy()
-        daily_temperature_2m_max = daily.Variables(1).ValuesAsNumpy()
-        daily_sunshine_duration = daily.Variables(2).ValuesAsNumpy()
-        daily_precipitation_hours = daily.Variables(3).ValuesAsNumpy()
-
-        daily_data = {
-            "date": pd.date_range(
-                start=pd.to_datetime(daily.Time(), unit="s", utc=True),
-                end=pd.to_datetime(daily.TimeEnd(), unit="s", utc=True),
-                freq=pd.Timedelta(seconds=daily.Interval()),
-                inclusive="left",
-            )
-        }
-        daily_data["weather_code"] = daily_weather_code
-        daily_data["temperature_2m_max"] = daily_temperature_2m_max
-        daily_data["sunshine_duration"] = daily_sunshine_duration
-        daily_data["precipitation_hours"] = daily_precipitation_hours
+        if content is None:
+            response = self.openmeteo.session.get(request_url)
 
-        daily_dataframe = pd.DataFrame(data=daily_data)
+            if response.status_code in (400, 429):
+                raise ValueError("Bad request: Check your parameters.")
 
-        daily_dict = daily_dataframe.to_dict(orient="records")
+            response.raise_for_status()
 
-        return daily_dict
+            content = response.content
+            self.response_cache.set(request_url, content)
 
-    def process_external_data(self, data: WeatherApiResponse) -> list[dict]:
-        return self._process_data(data)
+        return self._decode(content)
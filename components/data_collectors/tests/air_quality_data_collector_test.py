@@ -3,8 +3,13 @@ from components.data_collectors.src.air_quality_data_collector import (
     AirQualityDataCollector,
     AirQualityData,
 )
+from components.data_collectors.src.station_index import Station, StationIndex
+from components.data_gateways.src.station_resolution_gateway import (
+    StationResolutionGateway,
+)
 import unittest
 from unittest.mock import AsyncMock
+import asyncio
 import json
 from dotenv import load_dotenv
 import os
@@ -35,7 +40,9 @@ class TestWeatherDataCollector(unittest.IsolatedAsyncioTestCase):
             mock_request = httpx.Request("GET", "https://example.com")
             mock_response = httpx.Response(400, request=mock_request)
 
-            if city == "NonExistentCity":
+            if city == "Atlantis":
+                return "Unknown station"
+            elif city == "NonExistentCity":
                 raise ValueError(f"City {city} not found")
             elif city == "BadRequest":
                 raise httpx.HTTPStatusError(
@@ -144,6 +151,323 @@ class TestWeatherDataCollector(unittest.IsolatedAsyncioTestCase):
                 91.0, 181.0
             )  # Invalid latitude and longitude
 
+    def make_resolving_collector(self, coords=None):
+        self.now = 0.0
+
+        station_resolutions = StationResolutionGateway(
+            db_path="sqlite:///:memory:",
+            ttl=100,
+            negative_ttl=10,
+            clock=lambda: self.now,
+        )
+        station_resolutions.create()
+
+        self.air_quality_data_collector.station_resolutions = station_resolutions
+
+        coordinates_collector = AsyncMock()
+        coordinates_collector.get_coordinates.return_value = coords
+
+        return coordinates_collector
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_for_city_station(self):
+        coordinates_collector = self.make_resolving_collector()
+        collector = self.air_quality_data_collector
+
+        first = await collector.get_air_quality_data_for_city(
+            "Shanghai", coordinates_collector
+        )
+        second = await collector.get_air_quality_data_for_city(
+            " SHANGHAI ", coordinates_collector
+        )
+
+        self.assertEqual(first["city"], "Shanghai")
+        self.assertEqual(second["city"], " SHANGHAI ")
+        self.assertEqual(second["aqi"], first["aqi"])
+
+        # The repeat goes to the station of the city
+        self.assertEqual(collector._make_request.await_args_list[1].args, ("@1437",))
+        coordinates_collector.get_coordinates.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_for_city_coordinates(self):
+        coordinates_collector = self.make_resolving_collector(coords=(31.2, 121.4))
+        collector = self.air_quality_data_collector
+
+        first = await collector.get_air_quality_data_for_city(
+            "Atlantis", coordinates_collector
+        )
+        self.assertEqual(collector._make_request.await_count, 2)
+
+        second = await collector.get_air_quality_data_for_city(
+            "atlantis", coordinates_collector
+        )
+
+        self.assertEqual(second["aqi"], first["aqi"])
+
+        # One upstream call for the repeat, straight to the coordinates
+        self.assertEqual(collector._make_request.await_count, 3)
+        self.assertEqual(
+            collector._make_request.await_args.kwargs,
+            {"latitude": 31.2, "longitude": 121.4},
+        )
+        coordinates_collector.get_coordinates.assert_awaited_once_with("Atlantis")
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_for_city_unknown(self):
+        coordinates_collector = self.make_resolving_collector(coords=None)
+        collector = self.air_quality_data_collector
+
+        for _ in range(3):
+            result = await collector.get_air_quality_data_for_city(
+                "Atlantis", coordinates_collector
+            )
+            self.assertIsNone(result)
+
+        # Unknown cities are not asked for again until the negative TTL passed
+        self.assertEqual(collector._make_request.await_count, 1)
+        coordinates_collector.get_coordinates.assert_awaited_once()
+
+        self.now = 10.0
+
+        await collector.get_air_quality_data_for_city("Atlantis", coordinates_collector)
+
+        self.assertEqual(collector._make_request.await_count, 2)
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_for_city_without_resolutions(self):
+        coordinates_collector = AsyncMock()
+        coordinates_collector.get_coordinates.return_value = (31.2, 121.4)
+
+        for _ in range(2):
+            await self.air_quality_data_collector.get_air_quality_data_for_city(
+                "Atlantis", coordinates_collector
+            )
+
+        self.assertEqual(self.air_quality_data_collector._make_request.await_count, 4)
+        self.assertEqual(coordinates_collector.get_coordinates.await_count, 2)
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_by_coords_station_index(self):
+        collector = self.air_quality_data_collector
+        collector.station_index = StationIndex(
+            [Station(1437, 31.2047372, 121.4489017, "Shanghai")],
+            (30.0, 120.0, 33.0, 123.0),
+        )
+
+        result = await collector.get_air_quality_data_by_coords(31.21, 121.45)
+
+        # The nearest station is fetched directly
+        self.assertEqual(collector._make_request.await_args.args, ("@1437",))
+        self.assertEqual(result["aqi"], 74)
+
+        # Outside the index AQICN finds the nearest station
+        await collector.get_air_quality_data_by_coords(52.52, 13.41)
+
+        self.assertEqual(
+            collector._make_request.await_args.kwargs,
+            {"latitude": 52.52, "longitude": 13.41},
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_many(self):
+        locations = ["Shanghai", (31.2, 121.4), "BadRequest", "Atlantis"]
+
+        collector = self.air_quality_data_collector
+
+        results = [
+            result async for result in collector.get_air_quality_data_many(locations)
+        ]
+        results = sorted(results, key=lambda result: result["index"])
+
+        self.assertEqual([result["index"] for result in results], [0, 1, 2, 3])
+
+        self.assertEqual(results[0]["data"]["city"], "Shanghai")
+        self.assertEqual(results[1]["data"]["aqi"], 74)
+
+        # A failing location does not fail the others
+        self.assertIsNone(results[2]["data"])
+        self.assertIn("400", results[2]["error"])
+
+        # Unknown stations are no error
+        self.assertIsNone(results[3]["data"])
+        self.assertIsNone(results[3]["error"])
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_many_in_completion_order(self):
+        make_request = self.air_quality_data_collector._make_request.side_effect
+
+        async def slow_first(*args, **kwargs):
+            if args and args[0] == "Slow":
+                await asyncio.sleep(0.05)
+
+            return make_request(*args, **kwargs)
+
+        self.air_quality_data_collector._make_request.side_effect = slow_first
+
+        collector = self.air_quality_data_collector
+
+        indices = [
+            result["index"]
+            async for result in collector.get_air_quality_data_many(
+                ["Slow", "Shanghai"]
+            )
+        ]
+
+        self.assertEqual(indices, [1, 0])
+
+    def make_slow_lookups(
+        self, coords, delay: float = 0.05, geocoding_delay: float = 0.05
+    ):
+        """Every AQICN call takes delay seconds, the geocoder geocoding_delay."""
+        make_request = self.air_quality_data_collector._make_request.side_effect
+
+        async def slow_request(*args, **kwargs):
+            await asyncio.sleep(delay)
+            return make_request(*args, **kwargs)
+
+        async def slow_geocoding(city):
+            await asyncio.sleep(geocoding_delay)
+            return coords
+
+        self.air_quality_data_collector._make_request.side_effect = slow_request
+
+        coordinates_collector = AsyncMock()
+        coordinates_collector.get_coordinates.side_effect = slow_geocoding
+
+        return coordinates_collector
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_for_city_hedged_unknown_station(self):
+        coordinates_collector = self.make_slow_lookups(coords=(31.2, 121.4))
+        collector = self.air_quality_data_collector
+        collector.hedged_lookups = True
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        result = await collector.get_air_quality_data_for_city(
+            "Atlantis", coordinates_collector
+        )
+
+        # Two round trips for the geocoding lookup instead of three in a row
+        self.assertLess(loop.time() - start, 0.14)
+        self.assertEqual(result["aqi"], 74)
+        self.assertEqual(
+            collector._make_request.await_args.kwargs,
+            {"latitude": 31.2, "longitude": 121.4},
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_for_city_hedged_known_station(self):
+        coordinates_collector = self.make_slow_lookups(
+            coords=(31.2, 121.4), geocoding_delay=0.1
+        )
+        self.make_resolving_collector()
+        collector = self.air_quality_data_collector
+        collector.hedged_lookups = True
+
+        result = await collector.get_air_quality_data_for_city(
+            "Shanghai", coordinates_collector
+        )
+        await asyncio.sleep(0.15)
+
+        # The city feed decides, the geocoding lookup is cancelled before the
+        # geo feed
+        self.assertEqual(result["city"], "Shanghai")
+        coordinates_collector.get_coordinates.assert_awaited_once()
+        collector._make_request.assert_awaited_once_with("Shanghai")
+        self.assertEqual(
+            collector.station_resolutions.get_resolution("shanghai").kind, "station"
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_air_quality_data_for_city_hedged_error(self):
+        coordinates_collector = self.make_slow_lookups(coords=(31.2, 121.4))
+        collector = self.air_quality_data_collector
+        collector.hedged_lookups = True
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await collector.get_air_quality_data_for_city(
+                "ServerError", coordinates_collector
+            )
+
+    def test_process_data(self):
+        result = AirQualityDataCollector._process_data(self.test_json_response)
+
+        daily = self.test_json_response["forecast"]["daily"]
+
+        for pollutant in ["pm25", "pm10", "o3", "uvi"]:
+            forecasts = result[f"{pollutant}_forecast"]
+
+            assert [forecast["avg"] for forecast in forecasts] == [
+                element["avg"] for element in daily[pollutant]
+            ]
+            assert [
+                forecast["date"].strftime("%Y-%m-%d") for forecast in forecasts
+            ] == [element["day"] for element in daily[pollutant]]
+
+        # Forecasts keep only the fields that are used
+        assert set(result["pm25_forecast"][0]) == {"avg", "date"}
+
+        # Days are parsed once and shared between pollutants
+        assert result["pm25_forecast"][0]["date"] is result["pm10_forecast"][0]["date"]
+
+    def test_process_data_missing_pollutant(self):
+        del self.test_json_response["forecast"]["daily"]["uvi"]
+
+        with self.assertRaises(ValueError):
+            AirQualityDataCollector._process_data(self.test_json_response)
+
+    def test_process_data_missing_day(self):
+        del self.test_json_response["forecast"]["daily"]["pm25"][0]["day"]
+
+        with self.assertRaises(ValueError):
+            AirQualityDataCollector._process_data(self.test_json_response)
+
+    def test_process_data_not_a_dict(self):
+        with self.assertRaises(TypeError):
+            AirQualityDataCollector._process_data(["Unexpected"])
+
     def __load_test_data__(self, test_data: str):
         with open(test_data, "r") as file:
             return json.load(file)
+
+
+@pytest.mark.asyncio
+async def test_get_air_quality_data_many_bounded_concurrency(httpx_mock):
+    with open(
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "test_aqicn_json_response.json"
+        )
+    ) as file:
+        feed = {"status": "ok", "data": json.load(file)}
+
+    in_flight = 0
+    most_in_flight = 0
+
+    async def respond(request: httpx.Request):
+        nonlocal in_flight, most_in_flight
+
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+        return httpx.Response(200, json=feed)
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    async with AirQualityDataCollector(
+        client=httpx.AsyncClient(), max_concurrency=3
+    ) as collector:
+        results = [
+            result
+            async for result in collector.get_air_quality_data_many(
+                [(31.2, 121.4 + i / 100) for i in range(10)]
+            )
+        ]
+
+    assert len(results) == 10
+    assert all(result["data"]["aqi"] == 74 for result in results)
+    assert most_in_flight == 3
@@ -0,0 +1,172 @@
+from components.data_collectors.src.async_weather_data_collector import (
+    AsyncWeatherDataCollector,
+)
+from components.data_collectors.src.response_cache import (
+    MemoryResponseCache,
+    ShardedDiskResponseCache,
+)
+from components.data_collectors.src.weather_data_collector import (
+    OpenMeteoMixin,
+    WeatherDataCollector,
+)
+import asyncio
+import os
+import pickle
+import httpx
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+with open(os.path.join(current_dir, "weather_api_mock_daily.pkl"), "rb") as file:
+    daily_responses = pickle.load(file)
+
+# The mocked response as Open-Meteo sends it, one length-prefixed message
+DAILY_CONTENT = daily_responses[0]._tab.Bytes
+
+
+@pytest.mark.asyncio
+async def test_success_daily(httpx_mock):
+    httpx_mock.add_response(content=DAILY_CONTENT)
+
+    async with AsyncWeatherDataCollector() as collector:
+        daily_forecasts = await collector.get_weather_data(4.6097, -74.0817)
+
+    request = httpx_mock.get_request()
+
+    assert request.url.params["format"] == "flatbuffers"
+    assert request.url.params.get_list("daily") == [
+        "weather_code",
+        "temperature_2m_max",
+        "sunshine_duration",
+        "precipitation_hours",
+    ]
+    assert daily_forecasts == WeatherDataCollector._process_data(daily_responses)
+
+
+@pytest.mark.asyncio
+async def test_shares_helpers_but_not_the_blocking_interface():
+    response_cache = MemoryResponseCache()
+
+    # Constructed with the arguments of WeatherDataCollector
+    async with AsyncWeatherDataCollector(
+        forecast_cache=None, response_cache=response_cache
+    ) as collector:
+        assert collector.response_cache is response_cache
+
+    # Its coroutines do not stand in for the blocking methods of the same name
+    assert not isinstance(collector, WeatherDataCollector)
+    assert isinstance(collector, OpenMeteoMixin)
+    assert isinstance(
+        WeatherDataCollector(response_cache=response_cache), OpenMeteoMixin
+    )
+
+
+@pytest.mark.asyncio
+async def test_cached(httpx_mock):
+    # A second upstream request would fail as there is only one response
+    httpx_mock.add_response(content=DAILY_CONTENT)
+
+    async with AsyncWeatherDataCollector() as collector:
+        first = await collector.get_weather_data(4.6097, -74.0817)
+        second = await collector.get_weather_data(4.6097, -74.0817)
+
+    assert first == second
+    assert collector.response_cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_on_disk(httpx_mock, tmp_path):
+    httpx_mock.add_response(content=DAILY_CONTENT)
+
+    cache = ShardedDiskResponseCache(str(tmp_path))
+
+    async with AsyncWeatherDataCollector(response_cache=cache) as collector:
+        first = await collector.get_weather_data(4.6097, -74.0817)
+
+    # A collector of another worker shares the directory
+    cache = ShardedDiskResponseCache(str(tmp_path))
+
+    async with AsyncWeatherDataCollector(response_cache=cache) as collector:
+        second = await collector.get_weather_data(4.6097, -74.0817)
+
+    assert first == second
+
+
+@pytest.mark.asyncio
+async def test_retry(httpx_mock):
+    httpx_mock.add_response(status_code=502)
+    httpx_mock.add_exception(httpx.ConnectError("Connection refused"))
+    httpx_mock.add_response(content=DAILY_CONTENT)
+
+    async with AsyncWeatherDataCollector(backoff_factor=0) as collector:
+        daily_forecasts = await collector.get_weather_data(4.6097, -74.0817)
+
+    assert len(httpx_mock.get_requests()) == 3
+    assert len(daily_forecasts) == 7
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted(httpx_mock):
+    httpx_mock.add_response(status_code=500, is_reusable=True)
+
+    async with AsyncWeatherDataCollector(retries=2, backoff_factor=0) as collector:
+        with pytest.raises(httpx.HTTPStatusError):
+            await collector.get_weather_data(4.6097, -74.0817)
+
+    assert len(httpx_mock.get_requests()) == 3
+
+
+@pytest.mark.asyncio
+async def test_bad_request(httpx_mock):
+    httpx_mock.add_response(status_code=400, json={"error": True})
+
+    async with AsyncWeatherDataCollector() as collector:
+        with pytest.raises(ValueError):
+            await collector.get_weather_data(4.6097, -74.0817)
+
+
+@pytest.mark.asyncio
+async def test_success_many(httpx_mock):
+    httpx_mock.add_response(content=DAILY_CONTENT * 2)
+    httpx_mock.add_response(content=DAILY_CONTENT)
+
+    async with AsyncWeatherDataCollector() as collector:
+        collector.max_locations_per_request = 2
+
+        daily_forecasts = await collector.get_weather_data_many(
+            [(4.6097, -74.0817), (52.52, 13.41), (48.85, 2.35)]
+        )
+
+    assert len(httpx_mock.get_requests()) == 2
+    assert len(daily_forecasts) == 3
+    assert daily_forecasts[2] == WeatherDataCollector._process_data(daily_responses)
+
+
+@pytest.mark.asyncio
+async def test_does_not_block_event_loop(httpx_mock):
+    async def slow_response(request: httpx.Request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, content=DAILY_CONTENT)
+
+    httpx_mock.add_callback(slow_response, is_reusable=True)
+
+    async with AsyncWeatherDataCollector() as collector:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        await asyncio.gather(
+            *[
+                collector.get_weather_data(float(latitude), -74.0817)
+                for latitude in range(10)
+            ]
+        )
+
+    # Ten upstream calls in flight at once take about as long as one
+    assert loop.time() - start < 0.4
+
+
+@pytest.mark.asyncio
+async def test_invalid_coordinates():
+    async with AsyncWeatherDataCollector() as collector:
+        with pytest.raises(ValueError):
+            await collector.get_weather_data(91.0, 0.0)
@@ -1,8 +1,18 @@
-from components.data_collectors.src.coordinates_collector import CoordinatesCollector
+from components.data_collectors.src.coordinates_collector import (
+    GEOCODING_URL,
+    CoordinatesCollector,
+    normalize_city,
+)
+from components.data_gateways.src.geocoding_gateway import GeocodingGateway
 import unittest
 from unittest.mock import MagicMock
+import re
 import pytest
 
+GEOCODING_PATTERN = re.compile(re.escape(GEOCODING_URL) + r"\?.*")
+
+BOGOTA = {"results": [{"name": "Bogotá", "latitude": 4.60971, "longitude": -74.08175}]}
+
 
 class TestCoordinatesCollector(unittest.IsolatedAsyncioTestCase):
 
@@ -48,3 +58,106 @@ class TestCoordinatesCollector(unittest.IsolatedAsyncioTestCase):
         coords = await self.real_coordinates_collector.get_coordinates("FantasyCity")
 
         assert coords is None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    cache = GeocodingGateway(
+        db_path="sqlite:///:memory:", ttl=100, negative_ttl=10, clock=clock
+    )
+    cache.create()
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_request_parameters(httpx_mock):
+    httpx_mock.add_response(url=GEOCODING_PATTERN, json=BOGOTA)
+
+    coords = await CoordinatesCollector().get_coordinates("Bogotá D.C.")
+
+    params = httpx_mock.get_request().url.params
+
+    assert coords == (4.60971, -74.08175)
+    assert params["name"] == "Bogotá D.C."
+    assert params["count"] == "1"
+    assert params["format"] == "json"
+
+
+@pytest.mark.asyncio
+async def test_cached(httpx_mock, cache):
+    httpx_mock.add_response(url=GEOCODING_PATTERN, json=BOGOTA)
+
+    collector = CoordinatesCollector(cache=cache)
+
+    first = await collector.get_coordinates("Bogota")
+
+    # Spellings that normalize alike share the entry, also across collectors
+    second = await CoordinatesCollector(cache=cache).get_coordinates(" BOGOTA ")
+
+    assert first == second == (4.60971, -74.08175)
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_not_found_cached(httpx_mock, cache, clock):
+    httpx_mock.add_response(
+        url=GEOCODING_PATTERN, json={"generationtime_ms": 0.5}, is_reusable=True
+    )
+
+    collector = CoordinatesCollector(cache=cache)
+
+    assert await collector.get_coordinates("FantasyCity") is None
+    assert await collector.get_coordinates("FantasyCity") is None
+    assert len(httpx_mock.get_requests()) == 1
+
+    # Asked again once the negative entry expired
+    clock.now += 10
+
+    assert await collector.get_coordinates("FantasyCity") is None
+    assert len(httpx_mock.get_requests()) == 2
+
+
+@pytest.mark.asyncio
+async def test_error_not_cached(httpx_mock, cache):
+    httpx_mock.add_response(
+        url=GEOCODING_PATTERN,
+        status_code=400,
+        json={"error": True, "reason": "Parameter count must be between 1 and 100."},
+    )
+    httpx_mock.add_response(url=GEOCODING_PATTERN, json=BOGOTA)
+
+    collector = CoordinatesCollector(cache=cache)
+
+    assert await collector.get_coordinates("Bogota") is None
+    assert await collector.get_coordinates("Bogota") == (4.60971, -74.08175)
+
+
+@pytest.mark.asyncio
+async def test_expired(httpx_mock, cache, clock):
+    httpx_mock.add_response(url=GEOCODING_PATTERN, json=BOGOTA, is_reusable=True)
+
+    collector = CoordinatesCollector(cache=cache)
+
+    await collector.get_coordinates("Bogota")
+    clock.now += 100
+    await collector.get_coordinates("Bogota")
+
+    assert len(httpx_mock.get_requests()) == 2
+
+
+def test_normalize_city():
+    assert normalize_city("  São   Paulo ") == "são paulo"
+    assert normalize_city("ＭÜNCHEN") == normalize_city("münchen")
@@ -0,0 +1,95 @@
+from components.data_collectors.src.grid_forecast_cache import GridForecastCache
+import unittest
+
+VARIABLES = ["weather_code", "temperature_2m_max"]
+
+
+class TestGridForecastCache(unittest.TestCase):
+
+    def setUp(self):
+        # 2024-12-20 04:00 UTC
+        self.now = 1734667200.0
+        self.cache = GridForecastCache(maxsize=2, clock=lambda: self.now)
+
+    def test_nearby_points_share_key(self):
+        # A few hundred meters apart in Bogota
+        key = self.cache.make_key(4.6097, -74.0817, VARIABLES)
+
+        assert self.cache.make_key(4.6112, -74.0790, VARIABLES) == key
+        assert self.cache.make_key(4.7097, -74.0817, VARIABLES) != key
+        assert self.cache.make_key(4.6097, -74.0817, VARIABLES[:1]) != key
+
+    def test_snap(self):
+        assert self.cache.snap(4.6097, -74.0817) == (4.6, -74.1)
+        assert self.cache.snap(89.99, 179.99) == (90.0, -180.0)
+
+    def test_antimeridian(self):
+        assert self.cache.cell(10.0, 179.99) == self.cache.cell(10.0, -180.0)
+
+    def test_expires_with_next_model_run(self):
+        key = self.cache.make_key(4.6097, -74.0817, VARIABLES)
+        self.cache.put(key, "forecast")
+
+        # The 06 UTC run is published at 10 UTC and replaces the forecast
+        # stored at 04 UTC
+        self.now += 6 * 3600 - 1
+        assert self.cache.get(key) == "forecast"
+
+        self.now += 1
+        assert self.cache.get(key) is None
+
+    def test_fetched_after_run_start_is_not_pinned(self):
+        key = self.cache.make_key(4.6097, -74.0817, VARIABLES)
+
+        # At 06:05 UTC Open-Meteo still serves the 00 UTC run, so the entry
+        # expires when the 06 UTC run is published, not with the 12 UTC run
+        self.now += 2 * 3600 + 300
+        self.cache.put(key, "00 UTC run")
+
+        self.now += 4 * 3600 - 300 - 1
+        assert self.cache.get(key) == "00 UTC run"
+
+        self.now += 1
+        assert self.cache.get(key) is None
+
+    def test_update_delay(self):
+        cache = GridForecastCache(update_delay=3 * 3600, clock=lambda: self.now)
+        key = cache.make_key(4.6097, -74.0817, VARIABLES)
+        cache.put(key, "forecast")
+
+        # At 04 UTC, the 00 UTC run is available and the 06 UTC run at 09 UTC
+        self.now += 5 * 3600 - 1
+        assert cache.get(key) == "forecast"
+
+        self.now += 1
+        assert cache.get(key) is None
+
+    def test_eviction_and_stats(self):
+        keys = [self.cache.make_key(float(row), 0.0, VARIABLES) for row in range(3)]
+
+        self.cache.put(keys[0], "first")
+        self.cache.put(keys[1], "second")
+        self.cache.get(keys[0])
+        self.cache.put(keys[2], "third")
+
+        assert self.cache.get(keys[1]) is None
+        assert self.cache.get(keys[0]) == "first"
+        assert self.cache.stats() == {
+            "hits": 2,
+            "misses": 1,
+            "evictions": 1,
+            "size": 2,
+            "maxsize": 2,
+        }
+
+    def test_invalid_resolution(self):
+        with self.assertRaises(ValueError):
+            GridForecastCache(resolution=0)
+
+    def test_invalid_update_delay(self):
+        with self.assertRaises(ValueError):
+            GridForecastCache(update_delay=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+from components.data_collectors.src.rate_limiter import TokenBucket
+import asyncio
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_burst_up_to_capacity():
+    bucket = TokenBucket(rate=1000, capacity=5, clock=FakeClock())
+
+    for _ in range(5):
+        await bucket.acquire()
+
+    assert bucket.stats()["delayed"] == 0
+
+    await bucket.acquire()
+
+    stats = bucket.stats()
+    assert stats["acquired"] == 6
+    assert stats["delayed"] == 1
+    assert stats["waited"] == pytest.approx(0.001)
+
+
+@pytest.mark.asyncio
+async def test_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1000, capacity=2, clock=clock)
+
+    for _ in range(2):
+        await bucket.acquire()
+
+    # Refilled, but never beyond the capacity
+    clock.now += 10
+
+    for _ in range(2):
+        await bucket.acquire()
+
+    assert bucket.stats()["delayed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiting_requests_are_spaced():
+    bucket = TokenBucket(rate=100, capacity=1)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    await asyncio.gather(*[bucket.acquire() for _ in range(11)])
+
+    # One immediately, ten at 10 ms intervals
+    assert loop.time() - start >= 0.095
+    assert bucket.stats()["waited"] == pytest.approx(0.55, abs=0.01)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, capacity=0.5)
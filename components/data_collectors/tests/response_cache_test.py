@@ -0,0 +1,164 @@
+from components.data_collectors.src.response_cache import (
+    MemoryResponseCache,
+    ResponseCache,
+    MmapResponseCache,
+    ShardedDiskResponseCache,
+    make_response_cache,
+)
+from abc import ABC, abstractmethod
+import unittest
+import tempfile
+import shutil
+import pytest
+
+
+class ResponseCacheTests(ABC):
+    """Behaviour every backend shares, budgets are 100 bytes of bodies."""
+
+    @abstractmethod
+    def make_cache(self, clock):
+        """A backend with a budget of 100 bytes that reads time from clock."""
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = self.make_cache(lambda: self.now)
+
+    def test_get_set(self):
+        assert self.cache.get("a") is None
+
+        self.cache.set("a", b"x" * 10)
+        self.cache.set("a", b"y" * 10)
+
+        assert self.cache.get("a") == b"y" * 10
+        assert self.cache.stats()["entries"] == 1
+        assert self.cache.stats()["hits"] == 1
+        assert self.cache.stats()["misses"] == 1
+
+    def test_expiry(self):
+        self.cache.set("a", b"x")
+
+        self.now += 3599
+        assert self.cache.get("a") == b"x"
+
+        self.now += 1
+        assert self.cache.get("a") is None
+        assert self.cache.stats()["entries"] == 0
+
+    def test_byte_budget(self):
+        for index in range(6):
+            self.cache.set(str(index), bytes([index]) * 30)
+
+        stats = self.cache.stats()
+
+        assert stats["bytes"] <= stats["max_bytes"]
+        assert stats["evictions"] == 6 - stats["entries"]
+        assert self.cache.get("0") is None
+        assert self.cache.get("5") == bytes([5]) * 30
+
+    def test_too_large(self):
+        self.cache.set("a", b"x" * 101)
+
+        assert self.cache.get("a") is None
+
+    def test_delete_and_clear(self):
+        self.cache.set("a", b"x")
+        self.cache.set("b", b"y")
+
+        self.cache.delete("a")
+        assert self.cache.get("a") is None
+
+        self.cache.clear()
+        assert self.cache.get("b") is None
+        assert self.cache.stats()["bytes"] == 0
+
+
+class TestMemoryResponseCache(ResponseCacheTests, unittest.TestCase):
+
+    def make_cache(self, clock):
+        return MemoryResponseCache(max_bytes=100, clock=clock)
+
+    def test_least_recently_used(self):
+        self.cache.set("a", b"a" * 40)
+        self.cache.set("b", b"b" * 40)
+        self.cache.get("a")
+        self.cache.set("c", b"c" * 40)
+
+        assert self.cache.get("b") is None
+        assert self.cache.get("a") == b"a" * 40
+
+
+class TestShardedDiskResponseCache(ResponseCacheTests, unittest.TestCase):
+
+    def make_cache(self, clock):
+        # One shard, so the budget is not split, plus the 8 byte headers
+        self.directory = tempfile.mkdtemp()
+        return ShardedDiskResponseCache(
+            self.directory, max_bytes=100 + 3 * 8, shards=1, clock=clock
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared_directory(self):
+        self.cache.set("a", b"x")
+
+        other = ShardedDiskResponseCache(
+            self.directory, max_bytes=124, shards=1, clock=lambda: self.now
+        )
+
+        assert other.get("a") == b"x"
+        assert other.stats()["entries"] == 1
+
+    def test_too_large(self):
+        self.cache.set("a", b"x" * 125)
+
+        assert self.cache.get("a") is None
+
+
+class TestMmapResponseCache(ResponseCacheTests, unittest.TestCase):
+
+    def make_cache(self, clock):
+        return MmapResponseCache(max_bytes=100, clock=clock)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_ring_wraps_around(self):
+        for index in range(10):
+            self.cache.set(str(index), bytes([index]) * 30)
+
+            # Every stored body is intact after the ring wrapped
+            for stored in range(index + 1):
+                content = self.cache.get(str(stored))
+                assert content is None or content == bytes([stored]) * 30
+
+        assert self.cache.get("9") == bytes([9]) * 30
+
+
+class TestMakeResponseCache(unittest.TestCase):
+
+    def test_backends(self):
+        assert isinstance(make_response_cache("memory"), MemoryResponseCache)
+
+        with self.assertRaises(ValueError):
+            make_response_cache("disk")
+
+        with self.assertRaises(ValueError):
+            make_response_cache("redis")
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+def test_base_is_abstract():
+    with pytest.raises(TypeError):
+        ResponseCache(max_bytes=100)
+
+    class IncompleteResponseCache(ResponseCache):
+        def _get(self, key, now):
+            return None
+
+    # A backend missing methods fails when it is created, not when it is used
+    with pytest.raises(TypeError):
+        IncompleteResponseCache(max_bytes=100)
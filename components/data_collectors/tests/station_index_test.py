@@ -0,0 +1,202 @@
+from components.data_collectors.src.station_index import (
+    MAP_BOUNDS_URL,
+    Station,
+    StationIndex,
+    distance_km,
+    iter_array_items,
+    load_station_index,
+)
+from pytest_httpx import IteratorStream
+import random
+import json
+import re
+import pytest
+
+BOUNDS = (40.0, -10.0, 60.0, 30.0)
+
+MAP_BOUNDS_PATTERN = re.compile(re.escape(MAP_BOUNDS_URL) + r"\?.*")
+
+
+def make_stations(count: int, seed: int = 1):
+    random_ = random.Random(seed)
+
+    return [
+        Station(uid, random_.uniform(40, 60), random_.uniform(-10, 30), f"S{uid}")
+        for uid in range(count)
+    ]
+
+
+def map_bounds_body(stations) -> bytes:
+    return json.dumps(
+        {
+            "status": "ok",
+            "data": [
+                {
+                    "lat": station.latitude,
+                    "lon": station.longitude,
+                    "uid": station.uid,
+                    "aqi": "42",
+                    "station": {"name": station.name, "time": "2025-01-01T00:00:00"},
+                }
+                for station in stations
+            ],
+        }
+    ).encode()
+
+
+async def chunked(text: str, size: int):
+    for start in range(0, len(text), size):
+        end = start + size
+        yield text[start:end]
+
+
+def test_nearest_matches_brute_force():
+    stations = make_stations(500)
+    index = StationIndex(stations, BOUNDS)
+
+    random_ = random.Random(2)
+
+    for _ in range(200):
+        latitude, longitude = random_.uniform(45, 55), random_.uniform(0, 20)
+
+        expected = min(
+            stations,
+            key=lambda s: distance_km(latitude, longitude, s.latitude, s.longitude),
+        )
+
+        assert index.nearest(latitude, longitude) == expected
+
+
+def test_nearest_outside_bounds():
+    index = StationIndex(make_stations(50), BOUNDS)
+
+    assert index.nearest(35.0, 0.0) is None
+    assert index.nearest(50.0, 31.0) is None
+
+
+def test_nearest_closer_to_edge_than_station():
+    # A station outside the bounds could be nearer than the only one inside
+    index = StationIndex([Station(1, 50.0, 10.0, "Center")], BOUNDS)
+
+    assert index.nearest(50.0, 10.5) == Station(1, 50.0, 10.0, "Center")
+    assert index.nearest(59.9, 10.0) is None
+
+
+def test_nearest_empty():
+    assert StationIndex([], BOUNDS).nearest(50.0, 10.0) is None
+
+
+def test_invalid_bounds():
+    with pytest.raises(ValueError):
+        StationIndex([], (60.0, -10.0, 40.0, 30.0))
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "stations.json")
+
+    index = StationIndex(make_stations(300), BOUNDS)
+    index.save(path)
+
+    loaded = StationIndex.load(path)
+
+    assert loaded.bounds == BOUNDS
+    assert loaded.built_at == index.built_at
+    assert loaded.stations == index.stations
+    assert loaded.nearest(50.0, 10.0) == index.nearest(50.0, 10.0)
+
+
+@pytest.mark.asyncio
+async def test_iter_array_items_across_chunks():
+    text = map_bounds_body(make_stations(20)).decode()
+
+    for size in [1, 7, 64, len(text)]:
+        items = [item async for item in iter_array_items(chunked(text, size), "data")]
+
+        assert [item["uid"] for item in items] == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_iter_array_items_error_status():
+    text = json.dumps({"status": "error", "data": "Invalid key"})
+
+    with pytest.raises(ValueError, match="Invalid key"):
+        [item async for item in iter_array_items(chunked(text, 5), "data")]
+
+
+@pytest.mark.asyncio
+async def test_iter_array_items_truncated():
+    text = map_bounds_body(make_stations(5)).decode()[:-40]
+
+    with pytest.raises(ValueError):
+        [item async for item in iter_array_items(chunked(text, 16), "data")]
+
+
+@pytest.mark.asyncio
+async def test_fetch(httpx_mock):
+    stations = make_stations(100)
+    body = map_bounds_body(stations)
+
+    # Served in small chunks, as a large response arrives
+    chunks = []
+
+    for start in range(0, len(body), 100):
+        end = start + 100
+        chunks.append(body[start:end])
+
+    httpx_mock.add_response(url=MAP_BOUNDS_PATTERN, stream=IteratorStream(chunks))
+
+    index = await StationIndex.fetch(BOUNDS, token="token")
+
+    request = httpx_mock.get_request()
+    assert request.url.params["latlng"] == "40.0,-10.0,60.0,30.0"
+    assert request.url.params["token"] == "token"
+
+    assert len(index) == 100
+    assert sorted(index.stations) == sorted(stations)
+
+
+@pytest.mark.asyncio
+async def test_fetch_skips_stations_without_position(httpx_mock):
+    body = {
+        "status": "ok",
+        "data": [
+            {"lat": 50.0, "lon": 10.0, "uid": 1, "station": {"name": "A"}},
+            {"lat": "-", "lon": 10.0, "uid": 2, "station": {"name": "B"}},
+        ],
+    }
+    httpx_mock.add_response(url=MAP_BOUNDS_PATTERN, json=body)
+
+    index = await StationIndex.fetch(BOUNDS, token="token")
+
+    assert index.stations == [Station(1, 50.0, 10.0, "A")]
+
+
+@pytest.mark.asyncio
+async def test_load_station_index(httpx_mock, tmp_path):
+    path = str(tmp_path / "stations.json")
+    httpx_mock.add_response(
+        url=MAP_BOUNDS_PATTERN, content=map_bounds_body(make_stations(10))
+    )
+
+    fetched = await load_station_index(path, BOUNDS, token="token")
+
+    # Saved by the first call, so the second one makes no request
+    loaded = await load_station_index(path, BOUNDS, token="token")
+
+    assert len(httpx_mock.get_requests()) == 1
+    assert loaded.stations == fetched.stations
+
+
+@pytest.mark.asyncio
+async def test_load_station_index_stale(httpx_mock, tmp_path):
+    path = str(tmp_path / "stations.json")
+    StationIndex(make_stations(10), BOUNDS, built_at=0.0).save(path)
+
+    httpx_mock.add_response(
+        url=MAP_BOUNDS_PATTERN, content=map_bounds_body(make_stations(20))
+    )
+
+    index = await load_station_index(path, BOUNDS, token="token")
+
+    assert len(index) == 20
+    assert len(StationIndex.load(path)) == 20
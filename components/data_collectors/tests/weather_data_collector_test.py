@@ -1,8 +1,12 @@
 from components.data_collectors.src.weather_data_collector import WeatherDataCollector
+from components.data_collectors.src.grid_forecast_cache import GridForecastCache
+from components.data_collectors.src.response_cache import MemoryResponseCache
 import unittest
+import tempfile
 from unittest.mock import MagicMock
 import os
 import pickle
+import numpy as np
 
 
 class TestWeatherDataCollector(unittest.TestCase):
@@ -60,6 +64,130 @@ class TestWeatherDataCollector(unittest.TestCase):
         assert round(forecast_day_after["sunshine_duration"], 2) == 38368.69
         assert forecast_day_after["precipitation_hours"] == 0.0
 
+    def test_success_many(self):
+        expected = self.weather_data_collector.get_weather_data(4.6097, -74.0817)
+        daily_response = self.weather_data_collector._make_request({"daily": []})[0]
+        self.weather_data_collector._make_request.side_effect = lambda params: [
+            daily_response
+        ] * len(params["latitude"])
+        self.weather_data_collector.max_locations_per_request = 2
+
+        coords = [(4.6097, -74.0817), (52.52, 13.41), (48.85, 2.35)]
+        daily_forecasts = self.weather_data_collector.get_weather_data_many(coords)
+
+        # Three locations in two requests of at most two locations, after the
+        # two requests for the expected forecast
+        assert self.weather_data_collector._make_request.call_count == 4
+        requested = self.weather_data_collector._make_request.call_args_list
+        assert requested[2].args[0]["latitude"] == [4.6097, 52.52]
+        assert requested[3].args[0]["longitude"] == [2.35]
+
+        assert len(daily_forecasts) == 3
+        assert all(forecasts == expected for forecasts in daily_forecasts)
+
+    def test_success_columns(self):
+        daily_columns = self.weather_data_collector.get_weather_data(
+            4.6097, -74.0817, as_columns=True
+        )
+
+        assert len(daily_columns) == 7
+        assert daily_columns["weather_code"][1] == 45.0
+        assert daily_columns.dates[1] == np.datetime64("2024-12-13T05:00:00")
+
+        # Columns are views into the response, not copies
+        assert not daily_columns["temperature_2m_max"].flags["OWNDATA"]
+
+        structured = daily_columns.to_structured()
+        assert structured["temperature_2m_max"].tolist() == (
+            daily_columns["temperature_2m_max"].tolist()
+        )
+
+    def test_columns_records(self):
+        daily_forecasts = self.weather_data_collector.get_weather_data(4.6097, -74.0817)
+        records = self.weather_data_collector.get_weather_data(
+            4.6097, -74.0817, as_columns=True
+        ).records()
+
+        assert len(records) == 7
+        assert records[-1] == daily_forecasts[-1]
+        assert records[1:3] == daily_forecasts[1:3]
+        assert records == daily_forecasts
+
+    def test_daily_variables_mismatch(self):
+        # The mocked response has four daily variables
+        with self.assertRaises(ValueError):
+            self.weather_data_collector.get_weather_data(
+                4.6097, -74.0817, daily=["weather_code", "temperature_2m_max"]
+            )
+
+    def test_forecast_cache(self):
+        expected = self.weather_data_collector.get_weather_data(4.6097, -74.0817)
+        self.weather_data_collector._make_request.reset_mock()
+
+        self.weather_data_collector.forecast_cache = GridForecastCache()
+
+        first = self.weather_data_collector.get_weather_data(4.6097, -74.0817)
+        nearby = self.weather_data_collector.get_weather_data_many(
+            [(4.6112, -74.0790), (4.6080, -74.0830)]
+        )
+
+        # One request for the center of the grid cell
+        self.weather_data_collector._make_request.assert_called_once()
+        params = self.weather_data_collector._make_request.call_args.args[0]
+        assert (params["latitude"], params["longitude"]) == ([4.6], [-74.1])
+
+        assert first == expected
+        assert nearby == [expected, expected]
+
+        # Every location gets its own records
+        assert nearby[0] is not nearby[1]
+        assert nearby[0][0] is not nearby[1][0]
+
+    def test_response_cache(self):
+        expected = self.weather_data_collector.get_weather_data(4.6097, -74.0817)
+        content = self.weather_data_collector._make_request({"daily": []})[0]._tab.Bytes
+
+        collector = WeatherDataCollector(response_cache=MemoryResponseCache())
+        collector.openmeteo.session = MagicMock()
+        collector.openmeteo.session.get.return_value = MagicMock(
+            status_code=200, content=content
+        )
+
+        assert collector.get_weather_data(4.6097, -74.0817) == expected
+        assert collector.get_weather_data(4.6097, -74.0817) == expected
+
+        collector.openmeteo.session.get.assert_called_once()
+        assert collector.response_cache.stats()["hits"] == 1
+
+    def test_default_response_cache(self):
+        working_dir = os.getcwd()
+        os.chdir(tempfile.mkdtemp())
+
+        try:
+            collector = WeatherDataCollector()
+
+            # Bounded and in memory, nothing is written to the working directory
+            assert isinstance(collector.response_cache, MemoryResponseCache)
+            assert os.listdir(".") == []
+
+            collector = WeatherDataCollector(sqlite_cache_name="weather")
+
+            assert collector.response_cache is None
+            assert os.path.exists("weather.sqlite")
+        finally:
+            os.chdir(working_dir)
+
+        with self.assertRaises(ValueError):
+            WeatherDataCollector(
+                response_cache=MemoryResponseCache(), sqlite_cache_name="weather"
+            )
+
+    def test_many_invalid_coordinates(self):
+        with self.assertRaises(ValueError):
+            self.weather_data_collector.get_weather_data_many(
+                [(4.6, -74.0), (91.0, 0.0)]
+            )
+
     def test_get_air_quality_data_by_coords_invalid_latitude_type(self):
         # Check if ValueError is raised when providing wrong input
         with self.assertRaises(TypeError):
@@ -92,3 +220,77 @@ class TestWeatherDataCollector(unittest.TestCase):
                 91.0, 181.0
             )  # Invalid latitude and longitude
         self.assertIn("90", str(context.exception))
+
+
+def make_hourly_response(start: int, variables: list, utc_offset_seconds: int = 0):
+    response = MagicMock()
+    response.UtcOffsetSeconds.return_value = utc_offset_seconds
+
+    hourly = response.Hourly.return_value
+    hourly.Time.return_value = start
+    hourly.TimeEnd.return_value = start + 3600 * len(variables[0])
+    hourly.Interval.return_value = 3600
+    hourly.Variables.side_effect = lambda index: MagicMock(
+        **{"ValuesAsNumpy.return_value": np.array(variables[index], dtype=np.float32)}
+    )
+
+    return [response]
+
+
+class TestWeatherDataCollectorHourly(unittest.TestCase):
+
+    def setUp(self):
+        self.weather_data_collector = WeatherDataCollector()
+        self.weather_data_collector._make_request = MagicMock()
+
+        # 2024-12-20 05:00 UTC is midnight in Bogota
+        start = 1734670800
+
+        weather_response = make_hourly_response(
+            start, [[12.5, 13.0, 14.5], [0.0, 0.2, 0.0]], utc_offset_seconds=-18000
+        )
+        air_quality_response = make_hourly_response(
+            start, [[8.0, np.nan, 9.5], [20.0, 21.0, 22.0]], utc_offset_seconds=-18000
+        )
+
+        def mock_side_effect(params: dict, url: str = None):
+            if url == WeatherDataCollector.air_quality_url:
+                return air_quality_response
+            return weather_response
+
+        self.weather_data_collector._make_request.side_effect = mock_side_effect
+
+    def test_success_hourly(self):
+        hourly_forecasts = self.weather_data_collector.get_hourly_weather_data(
+            4.6097, -74.0817
+        )
+
+        assert len(hourly_forecasts) == 3
+        assert hourly_forecasts[0]["date"].isoformat() == "2024-12-20T00:00:00-05:00"
+        assert hourly_forecasts[1]["temperature_2m"] == 13.0
+        assert round(hourly_forecasts[1]["precipitation"], 1) == 0.2
+        assert hourly_forecasts[1]["pm2_5"] is None
+        assert hourly_forecasts[2]["pm10"] == 22.0
+
+    def test_air_quality_unavailable(self):
+        side_effect = self.weather_data_collector._make_request.side_effect
+
+        def mock_side_effect(params: dict, url: str = None):
+            if url == WeatherDataCollector.air_quality_url:
+                raise ValueError("Bad request: Check your parameters.")
+            return side_effect(params)
+
+        self.weather_data_collector._make_request.side_effect = mock_side_effect
+
+        hourly_forecasts = self.weather_data_collector.get_hourly_weather_data(
+            4.6097, -74.0817
+        )
+
+        assert all(
+            forecast["pm2_5"] is None and forecast["pm10"] is None
+            for forecast in hourly_forecasts
+        )
+
+    def test_hourly_invalid_latitude(self):
+        with self.assertRaises(ValueError):
+            self.weather_data_collector.get_hourly_weather_data(91.0, -74.0817)
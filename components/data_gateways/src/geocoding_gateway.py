@@ -0,0 +1,75 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from components.database_support.geocoding_record import GeocodingRecord
+from typing import Callable, Optional
+import time
+
+
+class GeocodingGateway:
+    """
+    Persistent cache of geocoding results. Coordinates of a city are kept for
+    ttl seconds, cities the geocoder does not know for negative_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "sqlite:///geocoding.db",
+        ttl: float = 30 * 24 * 3600,
+        negative_ttl: float = 24 * 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.engine = create_engine(db_path, echo=True)
+        self.db_path = db_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+
+    def create(self):
+        GeocodingRecord.metadata.create_all(self.engine)
+
+    def get_geocoding(self, city: str) -> Optional[GeocodingRecord]:
+        with Session(self.engine) as session:
+            record = session.get(GeocodingRecord, city)
+
+            if record is None:
+                return None
+
+            if record.expires_at <= self._clock():
+                session.delete(record)
+                session.commit()
+                return None
+
+            return record
+
+    def set_coordinates(self, city: str, latitude: float, longitude: float):
+        self._set(city, latitude, longitude, ttl=self.ttl)
+
+    def set_not_found(self, city: str):
+        self._set(city, None, None, ttl=self.negative_ttl)
+
+    def delete_geocoding(self, city: str):
+        with Session(self.engine) as session:
+            record = session.get(GeocodingRecord, city)
+
+            if record is not None:
+                session.delete(record)
+                session.commit()
+
+    def _set(
+        self,
+        city: str,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        ttl: float,
+    ):
+        record = GeocodingRecord(
+            city=city,
+            latitude=latitude,
+            longitude=longitude,
+            expires_at=self._clock() + ttl,
+        )
+
+        with Session(self.engine) as session:
+            # Replaces an expired or outdated result for the city
+            session.merge(record)
+            session.commit()
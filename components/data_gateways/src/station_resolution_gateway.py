@@ -0,0 +1,91 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from components.database_support.station_resolution_record import (
+    StationResolutionRecord,
+)
+from typing import Callable, Optional
+import time
+
+
+class StationResolutionGateway:
+    """
+    Persistent cache of station resolutions. Cities AQICN knows are kept for
+    ttl seconds, cities it does not know, whether the geocoder knows them or
+    not, for negative_ttl seconds, as AQICN adds stations over time.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "sqlite:///air_quality.db",
+        ttl: float = 7 * 24 * 3600,
+        negative_ttl: float = 24 * 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.engine = create_engine(db_path, echo=True)
+        self.db_path = db_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+
+    def create(self):
+        StationResolutionRecord.metadata.create_all(self.engine)
+
+    def get_resolution(self, city: str) -> Optional[StationResolutionRecord]:
+        with Session(self.engine) as session:
+            record = session.get(StationResolutionRecord, city)
+
+            if record is None:
+                return None
+
+            if record.expires_at <= self._clock():
+                session.delete(record)
+                session.commit()
+                return None
+
+            return record
+
+    def set_station(self, city: str, station: str):
+        self._set(city, kind="station", station=station, ttl=self.ttl)
+
+    def set_coordinates(self, city: str, latitude: float, longitude: float):
+        self._set(
+            city,
+            kind="coordinates",
+            latitude=latitude,
+            longitude=longitude,
+            ttl=self.negative_ttl,
+        )
+
+    def set_unknown(self, city: str):
+        self._set(city, kind="unknown", ttl=self.negative_ttl)
+
+    def delete_resolution(self, city: str):
+        with Session(self.engine) as session:
+            record = session.get(StationResolutionRecord, city)
+
+            if record is not None:
+                session.delete(record)
+                session.commit()
+
+    def _set(
+        self,
+        city: str,
+        kind: str,
+        ttl: float,
+        station: Optional[str] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ):
+        record = StationResolutionRecord(
+            city=city,
+            kind=kind,
+            station=station,
+            latitude=latitude,
+            longitude=longitude,
+            expires_at=self._clock() + ttl,
+        )
+
+        with Session(self.engine) as session:
+            # Replaces an expired or outdated resolution of the city
+            session.merge(record)
+            session.commit()
@@ -0,0 +1,78 @@
+from components.data_gateways.src.geocoding_gateway import GeocodingGateway
+from sqlalchemy import inspect
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def gateway(clock):
+    gateway = GeocodingGateway(
+        db_path="sqlite:///:memory:", ttl=100, negative_ttl=10, clock=clock
+    )
+    gateway.create()
+    return gateway
+
+
+def test_create_geocoding_table(gateway):
+    inspector = inspect(gateway.engine)
+    assert "geocoding_results" in inspector.get_table_names()
+
+
+def test_coordinates(gateway, clock):
+    gateway.set_coordinates("bogota", 4.60971, -74.08175)
+
+    record = gateway.get_geocoding("bogota")
+
+    assert (record.latitude, record.longitude) == (4.60971, -74.08175)
+    assert record.expires_at == clock.now + 100
+
+
+def test_not_found(gateway, clock):
+    gateway.set_not_found("fantasycity")
+
+    record = gateway.get_geocoding("fantasycity")
+
+    assert record.latitude is None
+    assert record.expires_at == clock.now + 10
+
+
+def test_missing(gateway):
+    assert gateway.get_geocoding("bogota") is None
+
+
+def test_expiry(gateway, clock):
+    gateway.set_coordinates("bogota", 4.60971, -74.08175)
+    gateway.set_not_found("fantasycity")
+
+    clock.now += 10
+    assert gateway.get_geocoding("fantasycity") is None
+    assert gateway.get_geocoding("bogota") is not None
+
+    clock.now += 90
+    assert gateway.get_geocoding("bogota") is None
+
+
+def test_overwrite(gateway):
+    gateway.set_not_found("bogota")
+    gateway.set_coordinates("bogota", 4.60971, -74.08175)
+
+    assert gateway.get_geocoding("bogota").latitude == 4.60971
+
+
+def test_delete_geocoding(gateway):
+    gateway.set_coordinates("bogota", 4.60971, -74.08175)
+    gateway.delete_geocoding("bogota")
+
+    assert gateway.get_geocoding("bogota") is None
@@ -0,0 +1,88 @@
+from components.data_gateways.src.station_resolution_gateway import (
+    StationResolutionGateway,
+)
+from sqlalchemy import inspect
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def gateway(clock):
+    gateway = StationResolutionGateway(
+        db_path="sqlite:///:memory:", ttl=100, negative_ttl=10, clock=clock
+    )
+    gateway.create()
+    return gateway
+
+
+def test_create_station_resolution_table(gateway):
+    inspector = inspect(gateway.engine)
+    assert "station_resolutions" in inspector.get_table_names()
+
+
+def test_station(gateway, clock):
+    gateway.set_station("shanghai", "1437")
+
+    record = gateway.get_resolution("shanghai")
+
+    assert record.kind == "station"
+    assert record.station == "1437"
+    assert record.expires_at == clock.now + 100
+
+
+def test_coordinates(gateway):
+    gateway.set_coordinates("atlantis", 31.2, 121.4)
+
+    record = gateway.get_resolution("atlantis")
+
+    assert record.kind == "coordinates"
+    assert (record.latitude, record.longitude) == (31.2, 121.4)
+
+
+def test_unknown(gateway):
+    gateway.set_unknown("atlantis")
+
+    assert gateway.get_resolution("atlantis").kind == "unknown"
+
+
+def test_missing(gateway):
+    assert gateway.get_resolution("atlantis") is None
+
+
+def test_expiry(gateway, clock):
+    gateway.set_station("shanghai", "1437")
+    gateway.set_unknown("atlantis")
+
+    # Unknown cities expire after the negative TTL
+    clock.now += 10
+    assert gateway.get_resolution("atlantis") is None
+    assert gateway.get_resolution("shanghai") is not None
+
+    clock.now += 90
+    assert gateway.get_resolution("shanghai") is None
+
+
+def test_overwrite(gateway):
+    gateway.set_unknown("atlantis")
+    gateway.set_coordinates("atlantis", 31.2, 121.4)
+
+    assert gateway.get_resolution("atlantis").kind == "coordinates"
+
+
+def test_delete_resolution(gateway):
+    gateway.set_station("shanghai", "1437")
+    gateway.delete_resolution("shanghai")
+
+    assert gateway.get_resolution("shanghai") is None
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Float
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class GeocodingRecord(Base):
+    """
+    Coordinates of a city as the geocoder returned them. A record without
+    coordinates is a city the geocoder does not know.
+    """
+
+    __tablename__ = "geocoding_results"
+
+    # Normalized city name
+    city = Column(String, primary_key=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+
+    # Wall clock time in seconds since the epoch
+    expires_at = Column(Float, nullable=False)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Float
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class StationResolutionRecord(Base):
+    """
+    How AQICN data for a city is found. kind is "station" for a city AQICN
+    knows, with its station uid, "coordinates" for a city AQICN does not know
+    but the geocoder does, and "unknown" for a city neither knows.
+    """
+
+    __tablename__ = "station_resolutions"
+
+    # Normalized city name
+    city = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    station = Column(String, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+
+    # Wall clock time in seconds since the epoch
+    expires_at = Column(Float, nullable=False)